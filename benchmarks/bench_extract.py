@@ -0,0 +1,76 @@
+"""
+Fused extraction vs. separate accessors. Run with
+
+    pytest benchmarks/bench_extract.py --benchmark-json=bench_output.json
+
+`parses_per_row` in extra_info records how many times each row is parsed, as counted by the
+kernel stats (see polars_istr.stats) in one more run after the timed ones.
+"""
+
+import polars as pl
+import polars_istr as pi
+import pytest
+from conftest import record
+
+# The accessors that return the same parts as the family's *_extract_all.
+SEPARATE = {
+    "iban": [
+        pi.iban_country_code,
+        pi.iban_check_digits,
+        pi.iban_bban,
+        pi.iban_bank_id,
+        pi.iban_branch_id,
+    ],
+    "isin": [pi.isin_country_code, pi.isin_security_id, pi.isin_check_digit],
+    "cusip": [
+        pi.cusip_country_code,
+        pi.cusip_issuer_num,
+        pi.cusip_issue_num,
+        pi.cusip_check_digit,
+    ],
+    "url": [pi.url_host, pi.url_path, pi.url_query, pi.url_fragment],
+}
+
+FUSED = {
+    "iban": {"iban": ["country_code", "check_digits", "bban", "bank_id", "branch_id"]},
+    "isin": {"isin": ["country_code", "security_id", "check_digit"]},
+    "cusip": {"cusip": ["country_code", "issuer", "issue", "check_digit"]},
+    "url": {"url": ["host", "path", "query", "fragment"]},
+}
+
+
+def parses_per_row(df: pl.DataFrame, run) -> float:
+    """
+    Runs `run` once with the kernel counters on and returns the rows parsed by all the kernels
+    it called per row of df. The counters are off while the benchmark is timed.
+    """
+    pi.stats_reset()
+    pi.stats_enable()
+    try:
+        run()
+    finally:
+        pi.stats_disable()
+    parsed = sum(s.rows for s in pi.stats().values())
+    pi.stats_reset()
+    return parsed / len(df)
+
+
+@pytest.mark.parametrize("family", list(SEPARATE))
+def test_separate(benchmark, frames: dict, family: str):
+    benchmark.group = f"{family}_extract"
+    df = frames[family]
+    exprs = [f(pl.col(family)).alias(f.__name__) for f in SEPARATE[family]]
+    out = benchmark(df.with_columns, exprs)
+    record(benchmark, df, out)
+    benchmark.extra_info["parses_per_row"] = parses_per_row(df, lambda: df.with_columns(exprs))
+
+
+@pytest.mark.parametrize("family", list(FUSED))
+def test_fused(benchmark, frames: dict, family: str):
+    benchmark.group = f"{family}_extract"
+    df = frames[family]
+    out = benchmark(pi.extract, df, family, FUSED[family])
+    record(benchmark, df, out)
+    benchmark.extra_info["parses_per_row"] = parses_per_row(
+        df, lambda: pi.extract(df, family, FUSED[family])
+    )
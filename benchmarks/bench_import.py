@@ -0,0 +1,75 @@
+"""
+Checks that importing polars_istr stays cheap, with `python -X importtime` in a fresh
+interpreter for every case. Run with
+
+    pytest benchmarks/bench_import.py
+
+Only the time spent in polars_istr's own modules counts, not polars or the standard library.
+The first use of the package after its import, which builds the Enum dtypes and the first
+expressions, is timed separately, with polars already imported. The budget of both can be
+changed with POLARS_ISTR_IMPORT_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+BUDGET_MS = float(os.environ.get("POLARS_ISTR_IMPORT_BUDGET_MS", "20"))
+
+CASES = {
+    "import": "import polars_istr",
+    # First access of every public name, which imports all the submodules. It builds the
+    # Enums too, but outside of any import, so test_first_use_time covers them.
+    "load_all": "import polars_istr as pi; [getattr(pi, n) for n in pi.__all__]",
+}
+
+# Builds every Enum dtype and the expressions that use them, after polars is imported.
+FIRST_USE = """
+import time
+import polars as pl
+start = time.perf_counter()
+import polars_istr as pi
+[getattr(pi, n) for n in pi.__all__]
+pi.isin_country_code(pl.col("x"), as_enum=True)
+pi.isin_check(pl.col("x"), code=True)
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def _import_times(code: str) -> dict:
+    """
+    Self import time in microseconds of every module imported by `code`.
+    """
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_import_time(case: str):
+    times = _import_times(CASES[case])
+    own_ms = sum(t for name, t in times.items() if name.split(".")[0] == "polars_istr") / 1000
+    assert own_ms < BUDGET_MS, f"{case} spent {own_ms:.1f} ms in polars_istr"
+    if case == "import":
+        # Polars is only imported on first use.
+        assert "polars" not in times
+
+
+def test_first_use_time():
+    out = subprocess.run(
+        [sys.executable, "-c", FIRST_USE], capture_output=True, text=True, check=True
+    )
+    ms = float(out.stdout)
+    assert ms < BUDGET_MS, f"first use spent {ms:.1f} ms in polars_istr"
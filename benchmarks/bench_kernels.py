@@ -0,0 +1,51 @@
+"""
+Times every polars_istr expression. Run with
+
+    pytest benchmarks/bench_kernels.py --benchmark-json=bench_output.json
+"""
+
+import inspect
+
+import polars as pl
+import polars_istr as pi
+import pytest
+from conftest import FAMILIES, record
+
+
+def _expressions() -> list:
+    """
+    (family, name, kwargs) of every public expression that only needs the input column.
+    """
+    out = []
+    for name in sorted(pi.__all__):
+        f = getattr(pi, name)
+        family = name.split("_")[0]
+        if family not in FAMILIES or not inspect.isfunction(f):
+            continue
+        params = list(inspect.signature(f).parameters.values())[1:]
+        if any(p.default is inspect.Parameter.empty for p in params):
+            continue
+        out.append((family, name, {}))
+        for option, value in (
+            ("as_enum", True),
+            ("dedup", True),
+            ("strict", False),
+            ("normalize", True),
+            ("approx", False),
+        ):
+            if any(p.name == option for p in params):
+                out.append((family, name, {option: value}))
+    return out
+
+
+@pytest.mark.parametrize(
+    "family, name, kwargs",
+    _expressions(),
+    ids=lambda x: ",".join(f"{k}={v}" for k, v in x.items()) if isinstance(x, dict) else x,
+)
+def test_kernel(benchmark, frames: dict, family: str, name: str, kwargs: dict):
+    benchmark.group = family
+    df = frames[family]
+    expr = getattr(pi, name)(pl.col(family), **kwargs)
+    out = benchmark(df.select, expr)
+    record(benchmark, df, out)
@@ -0,0 +1,46 @@
+"""
+Data for the benchmarks. The columns can be tuned with environment variables:
+
+- POLARS_ISTR_BENCH_ROWS: comma separated row counts, e.g. "1000000,100000000"
+- POLARS_ISTR_BENCH_NULL_RATE, POLARS_ISTR_BENCH_INVALID_RATE: fractions of rows
+- POLARS_ISTR_BENCH_CARDINALITY: number of distinct valid values
+"""
+
+import os
+
+import polars as pl
+import pytest
+from generators import make_column
+
+ROWS = [int(n) for n in os.environ.get("POLARS_ISTR_BENCH_ROWS", "1000000").split(",")]
+NULL_RATE = float(os.environ.get("POLARS_ISTR_BENCH_NULL_RATE", "0.01"))
+INVALID_RATE = float(os.environ.get("POLARS_ISTR_BENCH_INVALID_RATE", "0.05"))
+CARDINALITY = os.environ.get("POLARS_ISTR_BENCH_CARDINALITY")
+
+FAMILIES = ("iban", "isin", "cusip", "url")
+
+
+@pytest.fixture(scope="session", params=ROWS, ids=lambda n: f"rows={n}")
+def frames(request) -> dict:
+    n = request.param
+    return {
+        family: make_column(
+            family,
+            n,
+            null_rate=NULL_RATE,
+            invalid_rate=INVALID_RATE,
+            cardinality=None if CARDINALITY is None else int(CARDINALITY),
+        ).to_frame()
+        for family in FAMILIES
+    }
+
+
+def record(benchmark, df: pl.DataFrame, out: pl.DataFrame) -> None:
+    """
+    Adds rows per second and the size of the output to the benchmark's extra_info.
+    """
+    benchmark.extra_info["rows"] = len(df)
+    benchmark.extra_info["null_rate"] = NULL_RATE
+    benchmark.extra_info["invalid_rate"] = INVALID_RATE
+    benchmark.extra_info["rows_per_second"] = len(df) / benchmark.stats.stats.mean
+    benchmark.extra_info["output_bytes"] = out.estimated_size()
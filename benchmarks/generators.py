@@ -0,0 +1,144 @@
+"""
+Synthetic identifier generators for the benchmarks.
+"""
+
+import random
+import string
+from typing import List, Optional
+
+import polars as pl
+
+_ALNUM = string.digits + string.ascii_uppercase
+
+
+def _char_value(c: str) -> int:
+    # 0-9 are themselves, A-Z are 10-35
+    return int(c, 36)
+
+
+def isin_check_digit(payload: str) -> str:
+    digits = "".join(str(_char_value(c)) for c in payload)
+    total = 0
+    for i, d in enumerate(reversed(digits)):
+        d = int(d) * (2 if i % 2 == 0 else 1)
+        total += d - 9 if d > 9 else d
+    return str((10 - total % 10) % 10)
+
+
+def cusip_check_digit(payload: str) -> str:
+    total = 0
+    for i, c in enumerate(payload):
+        v = _char_value(c) * (2 if i % 2 == 1 else 1)
+        total += v // 10 + v % 10
+    return str((10 - total % 10) % 10)
+
+
+def iban_check_digits(country_code: str, bban: str) -> str:
+    rearranged = "".join(str(_char_value(c)) for c in bban + country_code) + "00"
+    return f"{98 - int(rearranged) % 97:02d}"
+
+
+def random_isins(n: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    countries = ["US", "CA", "GB", "DE", "FR", "JP", "XS"]
+    out = []
+    for _ in range(n):
+        payload = rng.choice(countries) + "".join(rng.choices(_ALNUM, k=9))
+        out.append(payload + isin_check_digit(payload))
+    return out
+
+
+def random_cusips(n: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        # About a quarter of them are CINS, which start with a letter.
+        first = rng.choice(string.ascii_uppercase if rng.random() < 0.25 else string.digits)
+        payload = first + "".join(rng.choices(_ALNUM, k=7))
+        out.append(payload + cusip_check_digit(payload))
+    return out
+
+
+# BBAN formats as (number of characters, alphabet) pieces.
+_BBAN_FORMATS = {
+    "DE": [(18, string.digits)],
+    "GB": [(4, string.ascii_uppercase), (14, string.digits)],
+    "NL": [(4, string.ascii_uppercase), (10, string.digits)],
+    "ES": [(20, string.digits)],
+}
+
+
+def random_ibans(n: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    countries = list(_BBAN_FORMATS)
+    out = []
+    for _ in range(n):
+        cc = rng.choice(countries)
+        bban = "".join("".join(rng.choices(chars, k=k)) for k, chars in _BBAN_FORMATS[cc])
+        out.append(cc + iban_check_digits(cc, bban) + bban)
+    return out
+
+
+_DOMAINS = ["example.com", "www.google.com", "news.bbc.co.uk", "cdn.shop.io", "127.0.0.1"]
+_WORDS = ["products", "data", "index.html", "search", "api", "v1", "items", "about"]
+
+
+def random_urls(n: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        path = "/".join(rng.choices(_WORDS, k=rng.randint(0, 4)))
+        query = f"?page={rng.randint(1, 100)}&utm_source=mail" if rng.random() < 0.5 else ""
+        fragment = "#top" if rng.random() < 0.1 else ""
+        out.append(f"https://{rng.choice(_DOMAINS)}/{path}{query}{fragment}")
+    return out
+
+
+_GENERATORS = {
+    "iban": random_ibans,
+    "isin": random_isins,
+    "cusip": random_cusips,
+    "url": random_urls,
+}
+
+
+def _corrupt(family: str, s: pl.Expr) -> pl.Expr:
+    if family == "url":
+        # Without a scheme, it is a relative URL without a base.
+        return s.str.replace("https://", "", literal=True)
+    # A letter where the last check digit should be.
+    return s.str.slice(0, s.str.len_bytes() - 1) + pl.lit("X")
+
+
+def make_column(
+    family: str,
+    n: int,
+    null_rate: float = 0.0,
+    invalid_rate: float = 0.0,
+    cardinality: Optional[int] = None,
+    seed: int = 42,
+) -> pl.Series:
+    """
+    A column of n identifiers of the family (iban, isin, cusip or url), drawn from a pool of
+    `cardinality` distinct valid values (at most 1M by default), where exactly
+    round(n * null_rate) rows are null and round(n * invalid_rate) rows are invalid.
+    """
+    n_null, n_invalid = round(n * null_rate), round(n * invalid_rate)
+    if n_null + n_invalid > n:
+        raise ValueError("null_rate + invalid_rate must be at most 1.")
+    cardinality = min(n, 1_000_000) if cardinality is None else min(n, cardinality)
+    pool = pl.Series(family, _GENERATORS[family](cardinality, seed))
+    values = pool.sample(n, with_replacement=True, seed=seed)
+    # One permutation for both masks, so null and invalid rows do not overlap: the first
+    # n_null positions are null and the next n_invalid are invalid.
+    rank = pl.int_range(0, n, eager=True).shuffle(seed + 1)
+    is_null = rank < n_null
+    is_invalid = (rank >= n_null) & (rank < n_null + n_invalid)
+    return pl.select(
+        pl.when(is_null)
+        .then(None)
+        .when(is_invalid)
+        .then(_corrupt(family, pl.lit(values)))
+        .otherwise(pl.lit(values))
+        .alias(family)
+    ).to_series()
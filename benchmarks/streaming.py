@@ -0,0 +1,104 @@
+"""
+Peak RSS and throughput of the polars_istr struct outputs on the streaming engines vs. eager
+collect(). "streaming" sinks with the default streaming engine and "new_streaming" collects
+with the new one, which runs the kernels on morsels. Run with
+
+    python benchmarks/streaming.py --rows 10000000 --out streaming.json
+
+Every mode runs in a fresh process, since peak RSS cannot be reset within one.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import polars as pl
+import polars_istr as pi
+from generators import random_cusips, random_ibans, random_isins, random_urls
+
+MODES = ("eager", "lazy", "streaming", "new_streaming")
+
+
+def exprs() -> list:
+    return [
+        pi.iban_extract_all("iban").alias("iban_parts"),
+        pi.isin_extract_all("isin").alias("isin_parts"),
+        pi.cusip_extract_all("cusip").alias("cusip_parts"),
+        pi.url_extract_all("url").alias("url_parts"),
+    ]
+
+
+def write_input(path: str, rows: int) -> None:
+    pl.DataFrame(
+        {
+            "iban": random_ibans(rows),
+            "isin": random_isins(rows),
+            "cusip": random_cusips(rows),
+            "url": random_urls(rows),
+        }
+    ).write_parquet(path)
+
+
+def run(mode: str, src: str, dst: str) -> None:
+    if mode == "eager":
+        pl.read_parquet(src).with_columns(exprs()).write_parquet(dst)
+    elif mode == "lazy":
+        pl.scan_parquet(src).with_columns(exprs()).collect().write_parquet(dst)
+    elif mode == "new_streaming":
+        pl.scan_parquet(src).with_columns(exprs()).collect(new_streaming=True).write_parquet(dst)
+    else:
+        pl.scan_parquet(src).with_columns(exprs()).sink_parquet(dst)
+
+
+def peak_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", default=None, help="Path of the JSON report.")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--src", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode is not None:  # child process
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            run(args.mode, args.src, os.path.join(tmp, "out.parquet"))
+            elapsed = time.perf_counter() - start
+        print(json.dumps({"seconds": elapsed, "peak_rss_bytes": peak_rss_bytes()}))
+        return
+
+    results = {"rows": args.rows, "polars": pl.__version__, "modes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "in.parquet")
+        write_input(src, args.rows)
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--src", src],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            res = json.loads(out.stdout)
+            res["rows_per_second"] = args.rows / res["seconds"]
+            results["modes"][mode] = res
+
+    report = json.dumps(results, indent=2)
+    if args.out is None:
+        print(report)
+    else:
+        with open(args.out, "w") as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,145 @@
-from .iban import *  # noqa: E402, F403
-from .isin import *  # noqa: E402, F403
-from .cusip import *  # noqa: E402, F403
-from .url import *  # noqa: E402, F403
+from __future__ import annotations
+
+import sys
 
 __version__ = "0.1.2"
+
+# Public names of each submodule. A submodule is only imported when one of its names is first
+# accessed, so importing polars_istr imports neither polars nor the submodules.
+_SUBMODULE_NAMES = {
+    "iban": (
+        "iban_country_code",
+        "iban_country_counts",
+        "iban_check_digits",
+        "iban_bban",
+        "iban_bank_id",
+        "iban_branch_id",
+        "iban_is_valid",
+        "iban_check",
+        "iban_extract_all",
+        "iban_expected_length",
+        "iban_country_name",
+        "iban_is_sepa",
+        "iban_normalize",
+        "iban_find_all",
+    ),
+    "isin": (
+        "isin_country_code",
+        "isin_check_digit",
+        "isin_security_id",
+        "isin_is_valid",
+        "isin_check",
+        "isin_extract_all",
+        "isin_to_u64",
+        "isin_from_u64",
+        "isin_to_cusip",
+        "isin_compute_check_digit",
+        "isin_normalize",
+        "isin_find_all",
+    ),
+    "cusip": (
+        "cusip_check",
+        "cusip_extract_all",
+        "cusip_issue_num",
+        "cusip_issuer_num",
+        "cusip_check_digit",
+        "cusip_country_code",
+        "cusip_payload",
+        "cusip_is_valid",
+        "cusip_is_private_issue",
+        "cusip_has_private_issuer",
+        "cusip_is_private_use",
+        "cusip_is_cins",
+        "cusip_is_cins_base",
+        "cusip_is_cins_extended",
+        "cusip_to_u64",
+        "cusip_from_u64",
+        "cusip_to_isin",
+        "cusip_normalize",
+        "cusip_find_all",
+    ),
+    "url": (
+        "url_is_special",
+        "url_host",
+        "url_host_n_unique",
+        "url_host_hll",
+        "hll_merge",
+        "hll_count",
+        "url_path",
+        "url_domain",
+        "url_registered_domain",
+        "url_public_suffix",
+        "url_fragment",
+        "url_query",
+        "url_query_params",
+        "url_query_param",
+        "url_normalize",
+        "url_fingerprint",
+        "url_is_valid",
+        "url_check",
+        "url_extract_all",
+        "url_find_all",
+    ),
+    "fused": ("extract",),
+    "cache": ("CacheInfo", "cache_enable", "cache_disable", "cache_clear", "cache_info"),
+    "metrics": ("KernelStats", "stats_enable", "stats_disable", "stats", "stats_reset"),
+    # The Enum dtypes of the as_enum and code outputs.
+    "_utils": (
+        "COUNTRY_CODE_ENUM",
+        "CINS_COUNTRY_CODE_ENUM",
+        "CHECK_DIGIT_ENUM",
+        "CHECK_DIGITS_ENUM",
+        "ISIN_CHECK_ENUM",
+        "CUSIP_CHECK_ENUM",
+        "IBAN_CHECK_ENUM",
+        "URL_CHECK_ENUM",
+    ),
+}
+_SUBMODULE_OF = {name: module for module, names in _SUBMODULE_NAMES.items() for name in names}
+
+__all__ = list(_SUBMODULE_OF)
+
+# typing and importlib take longer to import than the rest of this module, so they are left
+# to the type checkers and __import__ is used instead.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, List
+
+    from ._utils import (  # noqa: F401
+        CHECK_DIGIT_ENUM,
+        CHECK_DIGITS_ENUM,
+        CINS_COUNTRY_CODE_ENUM,
+        COUNTRY_CODE_ENUM,
+        CUSIP_CHECK_ENUM,
+        IBAN_CHECK_ENUM,
+        ISIN_CHECK_ENUM,
+        URL_CHECK_ENUM,
+    )
+    from .cache import *  # noqa: F403
+    from .cusip import *  # noqa: F403
+    from .fused import *  # noqa: F403
+    from .iban import *  # noqa: F403
+    from .isin import *  # noqa: F403
+    from .metrics import *  # noqa: F403
+    from .url import *  # noqa: F403
+
+
+def _import(module: str) -> Any:
+    __import__(f"{__name__}.{module}")
+    return sys.modules[f"{__name__}.{module}"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULE_NAMES:
+        return _import(name)
+    module = _SUBMODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(_import(module), name)
+    # Later accesses find the name in the module and do not come here.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
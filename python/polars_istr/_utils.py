@@ -1,30 +1,67 @@
-import os
-import re
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
 
 import polars as pl
+from polars.plugins import register_plugin_function
 
 from .type_alias import StrOrExpr
 
-_POLARS_LEGACY_SUPPORT = tuple(int(re.sub("[^0-9]", "", x)) for x in pl.__version__.split(".")) < (
-    0,
-    20,
-    16,
-)
-_IS_POLARS_V1 = pl.__version__.startswith("1")
-
+# Polars finds the shared library in this directory on first use and caches its path.
 _PLUGIN_PATH = Path(__file__).parent
 
-_PLUGIN_LIB_LEGACY = os.path.join(
-    os.path.dirname(__file__),
-    next(
-        filter(
-            lambda file: file.endswith((".so", ".dll", ".pyd")),
-            os.listdir(os.path.dirname(__file__)),
-        )
-    ),
-)
+# Categories of the Enum outputs. The *_enum kernels return the position of the value in
+# these lists, so the order must not change. The Enums are only built on first use, by the
+# module __getattr__ below.
+_LETTERS = [chr(i) for i in range(ord("A"), ord("Z") + 1)]
+_ENUM_CATEGORIES: Dict[str, Callable[[], List[str]]] = {
+    "COUNTRY_CODE_ENUM": lambda: [a + b for a in _LETTERS for b in _LETTERS],
+    "CINS_COUNTRY_CODE_ENUM": lambda: _LETTERS,
+    "CHECK_DIGIT_ENUM": lambda: [str(i) for i in range(10)],
+    "CHECK_DIGITS_ENUM": lambda: [f"{i:02d}" for i in range(100)],
+    # Reasons returned by the *_check functions, in the order of the code lists in the kernels.
+    "ISIN_CHECK_ENUM": lambda: [
+        "ok",
+        "Invalid length",
+        "Invalid country code",
+        "Invalid character",
+        "Invalid checksum",
+    ],
+    "CUSIP_CHECK_ENUM": lambda: ["ok", "Invalid length", "Invalid character", "Invalid checksum"],
+    "IBAN_CHECK_ENUM": lambda: [
+        "ok",
+        "Invalid format (len/char)",
+        "Invalid checksum",
+        "Invalid Bban",
+        "Invalid country code",
+    ],
+    "URL_CHECK_ENUM": lambda: [
+        "ok",
+        "empty host",
+        "invalid international domain name",
+        "invalid port number",
+        "invalid IPv4 address",
+        "invalid IPv6 address",
+        "invalid domain character",
+        "relative URL without a base",
+        "relative URL with a cannot-be-a-base base",
+        "a cannot-be-a-base URL doesn’t have a host to set",
+        "URLs more than 4 GB are not supported",
+        "unknown error",
+    ],
+}
+
+
+def __getattr__(name: str) -> pl.Enum:
+    """
+    Builds the Enum dtype `name` on first access and keeps it as a module attribute, so later
+    accesses do not come here.
+    """
+    if name not in _ENUM_CATEGORIES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    dtype = pl.Enum(_ENUM_CATEGORIES[name]())
+    globals()[name] = dtype
+    return dtype
 
 
 def str_to_expr(x: StrOrExpr) -> pl.Expr:
@@ -36,6 +73,54 @@ def str_to_expr(x: StrOrExpr) -> pl.Expr:
         raise ValueError("Can only parse str (column name) or Polars expressions.")
 
 
+def dictionary_input(
+    x: Union[str, pl.Series, pl.Expr], dedup: bool
+) -> Union[str, pl.Series, pl.Expr]:
+    """
+    Casts x to Categorical if dedup. The plugins only parse the categories of Categorical
+    and Enum inputs, so each distinct value is parsed once. Binary inputs, which cannot be cast
+    to Categorical, are first read as strings.
+    """
+    if not dedup:
+        return x
+    x = pl_plugin(args=[x], symbol="pl_binary_to_string", is_elementwise=True)
+    return x.cast(pl.Categorical)
+
+
+def check_struct(fields: Sequence[str], check_enum: pl.Enum) -> pl.Struct:
+    """
+    The dtype of a *_extract_all struct with string `fields` followed by the is_valid and
+    check fields of with_check. The kernels return the check as a code, which is cast to
+    check_enum.
+    """
+    return pl.Struct(
+        {**{f: pl.String for f in fields}, "is_valid": pl.Boolean, "check": check_enum}
+    )
+
+
+@lru_cache(maxsize=None)
+def _plugin_factory(
+    symbol: str,
+    is_elementwise: bool,
+    returns_scalar: bool,
+    changes_length: bool,
+    cast_to_supertype: bool,
+) -> Callable[..., pl.Expr]:
+    """
+    register_plugin_function with everything but the args and kwargs of a call bound. It is
+    built once per kernel and set of flags, on first use.
+    """
+    return partial(
+        register_plugin_function,
+        plugin_path=_PLUGIN_PATH,
+        function_name=symbol,
+        is_elementwise=is_elementwise,
+        returns_scalar=returns_scalar,
+        changes_length=changes_length,
+        cast_to_supertype=cast_to_supertype,
+    )
+
+
 def pl_plugin(
     *,
     symbol: str,
@@ -46,28 +131,7 @@ def pl_plugin(
     changes_length: bool = False,
     cast_to_supertype: bool = False,
 ) -> pl.Expr:
-    if _POLARS_LEGACY_SUPPORT:
-        # This will eventually be deprecated, yes
-        return args[0].register_plugin(
-            lib=_PLUGIN_LIB_LEGACY,
-            symbol=symbol,
-            args=args[1:],
-            kwargs=kwargs,
-            is_elementwise=is_elementwise,
-            returns_scalar=returns_scalar,
-            changes_length=changes_length,
-            cast_to_supertypes=cast_to_supertype,
-        )
-
-    from polars.plugins import register_plugin_function
-
-    return register_plugin_function(
-        plugin_path=_PLUGIN_PATH,
-        args=args,
-        function_name=symbol,
-        kwargs=kwargs,
-        is_elementwise=is_elementwise,
-        returns_scalar=returns_scalar,
-        changes_length=changes_length,
-        cast_to_supertype=cast_to_supertype,
+    factory = _plugin_factory(
+        symbol, is_elementwise, returns_scalar, changes_length, cast_to_supertype
     )
+    return factory(args=args, kwargs=kwargs)
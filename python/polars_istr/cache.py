@@ -0,0 +1,54 @@
+from __future__ import annotations
+from typing import NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    max_bytes: int
+    bytes: int
+    entries: int
+
+
+def cache_enable(max_bytes: int = 64 * 2**20) -> None:
+    """
+    Turns on the process-wide cache of parsed URLs, which keeps up to about max_bytes of
+    parsed URLs and evicts the least recently used ones. Repeated values, e.g. the same
+    domains on every refresh of a dashboard, then skip the full URL parser in all the url_*
+    functions. It is off by default. The cache is split into 16 shards with their own locks
+    and a 16th of max_bytes each, so threads parsing different values rarely wait for each
+    other.
+    """
+    from ._polars_istr import cache_enable as _cache_enable
+
+    if max_bytes < 0:
+        raise ValueError("max_bytes must be non-negative.")
+    _cache_enable(max_bytes)
+
+
+def cache_disable() -> None:
+    """
+    Turns off the cache of parsed URLs and frees its entries.
+    """
+    from ._polars_istr import cache_enable as _cache_enable
+
+    _cache_enable(0)
+
+
+def cache_clear() -> None:
+    """
+    Removes all entries from the cache of parsed URLs and resets its hit and miss counts.
+    """
+    from ._polars_istr import cache_clear as _cache_clear
+
+    _cache_clear()
+
+
+def cache_info() -> CacheInfo:
+    """
+    Returns the hits, misses, maximum size, current size (in bytes) and number of entries of
+    the cache of parsed URLs, like functools.lru_cache.
+    """
+    from ._polars_istr import cache_info as _cache_info
+
+    return CacheInfo(*_cache_info())
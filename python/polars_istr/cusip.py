@@ -1,109 +1,266 @@
 from __future__ import annotations
 import polars as pl
-from ._utils import pl_plugin
+from . import _utils
+from ._utils import check_struct, dictionary_input, pl_plugin
 
+# Fields of the struct returned by cusip_extract_all, in order.
+_CUSIP_FIELDS = (
+    "country_code",
+    "issuer",
+    "issue",
+    "check_digit",
+)
 
-def cusip_extract_all(x: pl.Series | pl.Expr) -> pl.Expr:
+
+def cusip_check(
+    x: pl.Series | pl.Expr, *, code: bool = False, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
+    """
+    Returns a string that explains whether the CUSIP string is valid or not.
+
+    If code, returns a pl.Enum of the reasons instead of strings, which takes much less
+    memory.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
+    """
+    if code:
+        return pl_plugin(
+            args=[dictionary_input(x, dedup)],
+            symbol="pl_cusip_check_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.CUSIP_CHECK_ENUM)
+
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_check",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def cusip_extract_all(
+    x: pl.Series | pl.Expr,
+    dedup: bool = False,
+    normalize: bool = False,
+    with_check: bool = False,
+) -> pl.Expr:
     """
     Returns a struct containing country_code, issue_num, issuer_num, check_digit,
     or null, if it cannot be parsed.
 
     Country Code is null for valid CUSIPs which are not (extended) CINS
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
+
+    If with_check, the struct also has an is_valid field and a check field with the reason as
+    in cusip_check(code=True), which come from the same parse as the parts.
     """
-    return pl_plugin(
-        args=[x],
+    out = pl_plugin(
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_full",
+        kwargs={"with_check": with_check, "normalize": normalize},
         is_elementwise=True,
     )
+    if with_check:
+        return out.cast(check_struct(_CUSIP_FIELDS, _utils.CUSIP_CHECK_ENUM))
+    return out
 
 
-def cusip_issue_num(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_issue_num(
+    x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns the issue number from the CUSIP, or null if it cannot be parsed.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_issue_num",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def cusip_issuer_num(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_issuer_num(
+    x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns the issuer number from the CUSIP, or null if it cannot be parsed.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_issuer_num",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def cusip_check_digit(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_check_digit(
+    x: pl.Series | pl.Expr,
+    as_enum: bool = False,
+    dedup: bool = False,
+    numeric: bool = False,
+    normalize: bool = False,
+) -> pl.Expr:
     """
     Returns check digit from the CUSIP, or null if it cannot be parsed.
+
+    If as_enum, returns a pl.Enum of the digits instead of strings. If numeric, returns the
+    digit as a pl.UInt8.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
+    if as_enum and numeric:
+        raise ValueError("Only one of as_enum and numeric can be set.")
+    # The value of a check digit is also its position in the Enum.
+    if as_enum or numeric:
+        return pl_plugin(
+            args=[dictionary_input(x, dedup)],
+            symbol="pl_cusip_check_digit_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.CHECK_DIGIT_ENUM if as_enum else pl.UInt8)
+
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_check_digit",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def cusip_country_code(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_country_code(
+    x: pl.Series | pl.Expr, as_enum: bool = False, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns the country code from the CUSIP, or null if it cannot be parsed.
+
+    If as_enum, returns a pl.Enum of the letters A to Z instead of strings, which takes
+    much less memory and is faster to group by or join on.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
+    if as_enum:
+        return pl_plugin(
+            args=[dictionary_input(x, dedup)],
+            symbol="pl_cusip_country_code_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.CINS_COUNTRY_CODE_ENUM)
+
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_country_code",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def cusip_payload(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_payload(x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False) -> pl.Expr:
     """
     Returns the payload (CUSIP ex. check digit) from the CUSIP, or null if it
     cannot be parsed.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_payload",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def cusip_is_valid(x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False) -> pl.Expr:
+    """
+    Returns a boolean indicating whether the string is a valid CUSIP string.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_is_valid",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def cusip_is_private_issue(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_is_private_issue(
+    x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns true if the issue number is reserved for private use.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_is_private_issue",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def cusip_has_private_issuer(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_has_private_issuer(
+    x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns true if the issuer is reserved for private use.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_cusip_has_private_issuer",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def cusip_is_private_use(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_is_private_use(
+    x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns True if either the issuer or issue number is reserved for
     private use.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
-    return pl_plugin(args=[x], symbol="pl_cusip_is_private_use", is_elementwise=True)
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_is_private_use",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
 
 
-def cusip_is_cins(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_is_cins(x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False) -> pl.Expr:
     """
     Returns true if this CUSIP number is actually a
     CUSIP International Numbering System (CINS) number,
@@ -111,11 +268,22 @@ def cusip_is_cins(x: pl.Series | pl.Expr) -> pl.Expr:
     See also is_cins_base() and is_cins_extended().
 
     Null if unable to parse.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
-    return pl_plugin(args=[x], symbol="pl_cusip_is_cins", is_elementwise=True)
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_is_cins",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
 
 
-def cusip_is_cins_base(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_is_cins_base(
+    x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns true if this CUSIP identifier is actually a CUSIP International
     Numbering System (CINS) identifier (with the further restriction that
@@ -123,11 +291,22 @@ def cusip_is_cins_base(x: pl.Series | pl.Expr) -> pl.Expr:
     See also is_cins() and is_cins_extended().
 
     Null if unable to parse.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
-    return pl_plugin(args=[x], symbol="pl_cusip_is_cins_base", is_elementwise=True)
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_is_cins_base",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
 
 
-def cusip_is_cins_extended(x: pl.Series | pl.Expr) -> pl.Expr:
+def cusip_is_cins_extended(
+    x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns true if this CUSIP identifier is actually a CUSIP International
     Numbering System (CINS) identifier (with the further restriction that
@@ -135,5 +314,92 @@ def cusip_is_cins_extended(x: pl.Series | pl.Expr) -> pl.Expr:
     See also is_cins() and is_cins_extended().
 
     Null if unable to parse.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
     """
-    return pl_plugin(args=[x], symbol="pl_cusip_is_cins_extended", is_elementwise=True)
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_is_cins_extended",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def cusip_to_u64(x: pl.Series | pl.Expr, dedup: bool = False, normalize: bool = False) -> pl.Expr:
+    """
+    Packs each valid CUSIP into a pl.UInt64 key, or null if it is not valid. Joins and group
+    bys on the keys are much faster than on the strings. The check digit is not stored since
+    it follows from the rest, and cusip_from_u64 restores it.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_to_u64",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def cusip_from_u64(x: pl.Series | pl.Expr) -> pl.Expr:
+    """
+    Returns the CUSIP packed by cusip_to_u64, or null if the value is not a packed CUSIP.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_cusip_from_u64",
+        is_elementwise=True,
+    )
+
+
+def cusip_to_isin(
+    x: pl.Series | pl.Expr, country: str = "US", dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
+    """
+    Returns the ISIN of the CUSIP, which is the two-letter country code, the CUSIP and a
+    check digit. Null if the CUSIP is not valid or has characters that ISINs do not allow
+    (`*`, `@`, `#`).
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by cusip_normalize while it is parsed.
+    """
+    if not (len(country) == 2 and country.isascii() and country.isalpha() and country.isupper()):
+        raise ValueError(f"Invalid country code: {country}. Must be two uppercase letters.")
+
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_cusip_to_isin",
+        kwargs={"country": country, "normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def cusip_normalize(x: pl.Series | pl.Expr) -> pl.Expr:
+    """
+    Removes whitespace and dashes and uppercases the letters, e.g. "30307-510-5" becomes
+    "303075105". Null if the result is too long to be a valid CUSIP.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_cusip_normalize",
+        is_elementwise=True,
+    )
+
+
+def cusip_find_all(x: pl.Series | pl.Expr) -> pl.Expr:
+    """
+    Returns the valid CUSIPs in free text as a list of strings in the order they appear. CUSIPs
+    are found as whole words of 9 letters and digits and their check digits are verified while
+    the text is scanned once. CUSIPs with `*`, `@` or `#` are not found, since these characters
+    often separate words, as in "CUSIP#303075105".
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_cusip_find_all",
+        is_elementwise=True,
+    )
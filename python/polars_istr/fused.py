@@ -0,0 +1,78 @@
+from __future__ import annotations
+import polars as pl
+from typing import Dict, List, TypeVar
+from ._utils import str_to_expr
+from .type_alias import StrOrExpr
+from .cusip import _CUSIP_FIELDS, cusip_extract_all
+from .iban import _IBAN_FIELDS, iban_extract_all
+from .isin import _ISIN_FIELDS, isin_extract_all
+from .url import _URL_FIELDS, url_extract_all
+
+FrameT = TypeVar("FrameT", pl.DataFrame, pl.LazyFrame)
+
+_FAMILIES = {
+    "isin": _ISIN_FIELDS,
+    "cusip": _CUSIP_FIELDS,
+    "iban": _IBAN_FIELDS,
+    "url": _URL_FIELDS,
+}
+# Fields added by with_check, which all families but url have.
+_CHECK_FIELDS = ("is_valid", "check")
+
+
+def _fused_expr(family: str, x: pl.Expr, fields: List[str], with_check: bool) -> pl.Expr:
+    if family == "isin":
+        return isin_extract_all(x, with_check=with_check)
+    elif family == "cusip":
+        return cusip_extract_all(x, with_check=with_check)
+    elif family == "iban":
+        return iban_extract_all(x, with_check=with_check)
+    else:  # url, which can skip the fields that are not requested
+        return url_extract_all(x, fields=fields)
+
+
+def extract(df: FrameT, col: StrOrExpr, parts: Dict[str, List[str]]) -> FrameT:
+    """
+    Extracts the requested parts of the identifiers in `col` and adds them to the frame as
+    columns named `{family}_{part}`, e.g. `isin_country_code`. Each family is parsed only
+    once per row, instead of once per accessor.
+
+    `parts` maps a family (isin, cusip, iban or url) to the names of the fields of the
+    struct returned by the family's `*_extract_all`, e.g.
+    `{"isin": ["country_code", "check_digit"]}`. Except for url, the fields can also be
+    is_valid and check, which come from the same parse (see with_check).
+    """
+    x = str_to_expr(col)
+    for family, fields in parts.items():
+        if family not in _FAMILIES:
+            raise ValueError(f"Unknown family: {family}. Must be one of {tuple(_FAMILIES)}.")
+        all_fields = _FAMILIES[family]
+        if family != "url":
+            all_fields = all_fields + _CHECK_FIELDS
+        for f in fields:
+            if f not in all_fields:
+                raise ValueError(f"Unknown {family} field: {f}. Must be one of {all_fields}.")
+
+        fields = list(dict.fromkeys(fields))
+        if len(fields) == 0:
+            continue
+
+        with_check = any(f in _CHECK_FIELDS for f in fields)
+        if family == "url":
+            out_fields = fields
+        elif with_check:
+            out_fields = list(all_fields)
+        else:
+            out_fields = list(_FAMILIES[family])
+        tmp = f"__polars_istr_{family}__"
+        df = (
+            df.with_columns(
+                _fused_expr(family, x, fields, with_check)
+                .struct.rename_fields([f"{family}_{f}" for f in out_fields])
+                .alias(tmp)
+            )
+            .unnest(tmp)
+            .drop([f"{family}_{f}" for f in out_fields if f not in fields])
+        )
+
+    return df
@@ -1,94 +1,265 @@
 from __future__ import annotations
 import polars as pl
-from ._utils import pl_plugin
+from . import _utils
+from ._utils import check_struct, pl_plugin
 
+# Fields of the struct returned by iban_extract_all, in order.
+_IBAN_FIELDS = (
+    "country_code",
+    "check_digits",
+    "bban",
+    "bank_id",
+    "branch_id",
+)
 
-def iban_country_code(x: pl.Series | pl.Expr) -> pl.Expr:
+
+def iban_country_code(
+    x: pl.Series | pl.Expr, as_enum: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns country code from the IBAN, or null if it cannot be parsed.
+
+    If as_enum, returns a pl.Enum of all two-letter codes instead of strings, which takes
+    much less memory and is faster to group by or join on.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
     """
+    if as_enum:
+        return pl_plugin(
+            args=[x],
+            symbol="pl_iban_country_code_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.COUNTRY_CODE_ENUM)
+
     return pl_plugin(
         args=[x],
         symbol="pl_iban_country_code",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def iban_check_digits(x: pl.Series | pl.Expr) -> pl.Expr:
+def iban_country_counts(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
+    """
+    Returns the number of valid IBANs of each country, as a struct with a country_code field
+    (a pl.Enum of all two-letter codes) and a pl.UInt32 count field, like value_counts. The
+    IBANs are counted while parsing, without building the country code column. Countries
+    without valid IBANs are left out, and the rest are sorted by country code. Works as an
+    aggregation in group_by.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_iban_country_counts",
+        kwargs={"normalize": normalize},
+        changes_length=True,
+    ).cast(pl.Struct({"country_code": _utils.COUNTRY_CODE_ENUM, "count": pl.UInt32}))
+
+
+def iban_check_digits(
+    x: pl.Series | pl.Expr, as_enum: bool = False, numeric: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns check digits from the IBAN, or null if it cannot be parsed.
+
+    If as_enum, returns a pl.Enum of "00" to "99" instead of strings. If numeric, returns the
+    check digits as a pl.UInt8.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
     """
+    if as_enum and numeric:
+        raise ValueError("Only one of as_enum and numeric can be set.")
+    # The value of a check digit is also its position in the Enum.
+    if as_enum or numeric:
+        return pl_plugin(
+            args=[x],
+            symbol="pl_iban_check_digits_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.CHECK_DIGITS_ENUM if as_enum else pl.UInt8)
+
     return pl_plugin(
         args=[x],
         symbol="pl_iban_check_digits",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def iban_bban(x: pl.Series | pl.Expr) -> pl.Expr:
+def iban_bban(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
     """
     Returns BBAN string from the IBAN, or null if it cannot be parsed.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_iban_bban",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def iban_bank_id(x: pl.Series | pl.Expr) -> pl.Expr:
+def iban_bank_id(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
     """
     Returns bank identifier from the BBAN portion of the IBAN string,
     or null if it cannot be parsed.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_iban_bank_identifier",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def iban_branch_id(x: pl.Series | pl.Expr) -> pl.Expr:
+def iban_branch_id(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
     """
     Returns branch identifier from the BBAN portion of the IBAN string,
     or null if it cannot be parsed.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_iban_branch_identifier",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def iban_is_valid(x: pl.Series | pl.Expr) -> pl.Expr:
+def iban_is_valid(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
     """
     Returns a boolean indicating whether the string is a valid IBAN string.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_iban_is_valid",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def iban_check(x: pl.Series | pl.Expr) -> pl.Expr:
+def iban_check(x: pl.Series | pl.Expr, *, code: bool = False, normalize: bool = False) -> pl.Expr:
     """
     Returns a string that explains whether the IBAN string is valid or not.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
+
+    If code, returns a pl.Enum of the reasons instead of strings, which takes much less
+    memory.
     """
+    if code:
+        return pl_plugin(
+            args=[x],
+            symbol="pl_iban_check_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.IBAN_CHECK_ENUM)
+
     return pl_plugin(
         args=[x],
         symbol="pl_iban_check",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def iban_extract_all(x: pl.Series | pl.Expr) -> pl.Expr:
+def iban_extract_all(
+    x: pl.Series | pl.Expr, normalize: bool = False, with_check: bool = False
+) -> pl.Expr:
     """
     Returns all information from IBAN and return as a struct. Running this can be
     faster than running the corresponding single queries together.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
+
+    If with_check, the struct also has an is_valid field and a check field with the reason as
+    in iban_check(code=True), which come from the same parse as the parts.
     """
-    return pl_plugin(
+    out = pl_plugin(
         args=[x],
         symbol="pl_iban_extract_all",
+        kwargs={"with_check": with_check, "normalize": normalize},
+        is_elementwise=True,
+    )
+    if with_check:
+        return out.cast(check_struct(_IBAN_FIELDS, _utils.IBAN_CHECK_ENUM))
+    return out
+
+
+def iban_expected_length(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
+    """
+    Returns the length of the IBANs of the country the value starts with, as a pl.UInt8. The
+    value can be an IBAN or a country code. Null if the country is not in the registry.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_iban_expected_length",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def iban_country_name(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
+    """
+    Returns the name of the country the value starts with. The value can be an IBAN or a
+    country code. Null if the country is not in the registry.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_iban_country_name",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def iban_is_sepa(x: pl.Series | pl.Expr, normalize: bool = False) -> pl.Expr:
+    """
+    Returns whether the country the value starts with is in the SEPA scheme. The value can be
+    an IBAN or a country code. Null if the country is not in the registry.
+
+    If normalize, each value is cleaned as by iban_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_iban_is_sepa",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def iban_normalize(x: pl.Series | pl.Expr) -> pl.Expr:
+    """
+    Removes whitespace and dashes and uppercases the letters, e.g. "de44 5001 0517 5407 3249 31"
+    becomes "DE44500105175407324931". Null if the result is too long to be a valid IBAN.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_iban_normalize",
+        is_elementwise=True,
+    )
+
+
+def iban_find_all(x: pl.Series | pl.Expr) -> pl.Expr:
+    """
+    Returns the valid IBANs in free text as a list of strings in the order they appear, in
+    electronic or print format (e.g. "DE44 5001 0517 5407 3249 31") as written. IBANs are found
+    from a country code and check digits at the start of a word and verified while the text is
+    scanned once. The IBAN length of the country tells where one in print format ends.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_iban_find_all",
         is_elementwise=True,
     )
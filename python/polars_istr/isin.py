@@ -1,60 +1,255 @@
 from __future__ import annotations
 import polars as pl
-from ._utils import pl_plugin
+from . import _utils
+from ._utils import check_struct, dictionary_input, pl_plugin
 
+# Fields of the struct returned by isin_extract_all, in order.
+_ISIN_FIELDS = (
+    "country_code",
+    "security_id",
+    "check_digit",
+)
 
-def isin_country_code(x: pl.Expr | pl.Series) -> pl.Expr:
+
+def isin_country_code(
+    x: pl.Expr | pl.Series, as_enum: bool = False, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns country code from the ISIN, or null if it cannot be parsed.
+
+    If as_enum, returns a pl.Enum of all two-letter codes instead of strings, which takes
+    much less memory and is faster to group by or join on.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
     """
+    if as_enum:
+        return pl_plugin(
+            args=[dictionary_input(x, dedup)],
+            symbol="pl_isin_country_code_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.COUNTRY_CODE_ENUM)
+
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_isin_country_code",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def isin_check_digit(x: pl.Expr | pl.Series) -> pl.Expr:
+def isin_check_digit(
+    x: pl.Expr | pl.Series,
+    as_enum: bool = False,
+    dedup: bool = False,
+    numeric: bool = False,
+    normalize: bool = False,
+) -> pl.Expr:
     """
     Returns check digits from the ISIN, or null if it cannot be parsed.
+
+    If as_enum, returns a pl.Enum of the digits instead of strings. If numeric, returns the
+    digit as a pl.UInt8.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
     """
+    if as_enum and numeric:
+        raise ValueError("Only one of as_enum and numeric can be set.")
+    # The value of a check digit is also its position in the Enum.
+    if as_enum or numeric:
+        return pl_plugin(
+            args=[dictionary_input(x, dedup)],
+            symbol="pl_isin_check_digit_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.CHECK_DIGIT_ENUM if as_enum else pl.UInt8)
+
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_isin_check_digit",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def isin_security_id(x: pl.Expr | pl.Series) -> pl.Expr:
+def isin_security_id(
+    x: pl.Expr | pl.Series, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
     """
     Returns the 9-digit security identifier of the ISIN, or null if it cannot
     be parsed.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
     """
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_isin_security_id",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def isin_is_valid(x: pl.Expr | pl.Series) -> pl.Expr:
+def isin_is_valid(x: pl.Expr | pl.Series, dedup: bool = False, normalize: bool = False) -> pl.Expr:
     """
     Returns a boolean indicating whether the string is a valid ISIN string.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
     """
     return pl_plugin(
-        args=[x],
+        args=[dictionary_input(x, dedup)],
         symbol="pl_isin_is_valid",
+        kwargs={"normalize": normalize},
         is_elementwise=True,
     )
 
 
-def isin_extract_all(x: pl.Expr | pl.Series) -> pl.Expr:
+def isin_check(
+    x: pl.Expr | pl.Series, *, code: bool = False, dedup: bool = False, normalize: bool = False
+) -> pl.Expr:
+    """
+    Returns a string that explains whether the ISIN string is valid or not.
+
+    If code, returns a pl.Enum of the reasons instead of strings, which takes much less
+    memory.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
+    """
+    if code:
+        return pl_plugin(
+            args=[dictionary_input(x, dedup)],
+            symbol="pl_isin_check_enum",
+            kwargs={"normalize": normalize},
+            is_elementwise=True,
+        ).cast(_utils.ISIN_CHECK_ENUM)
+
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_isin_check",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def isin_extract_all(
+    x: pl.Expr | pl.Series,
+    dedup: bool = False,
+    normalize: bool = False,
+    with_check: bool = False,
+) -> pl.Expr:
     """
     Returns all information from ISIN and return as a struct. Empty string means the part cannot
     be extracted. Running this can be faster than running the corresponding single queries together.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
+
+    If with_check, the struct also has an is_valid field and a check field with the reason as
+    in isin_check(code=True), which come from the same parse as the parts.
+    """
+    out = pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_isin_full",
+        kwargs={"with_check": with_check, "normalize": normalize},
+        is_elementwise=True,
+    )
+    if with_check:
+        return out.cast(check_struct(_ISIN_FIELDS, _utils.ISIN_CHECK_ENUM))
+    return out
+
+
+def isin_to_u64(x: pl.Expr | pl.Series, dedup: bool = False, normalize: bool = False) -> pl.Expr:
+    """
+    Packs each valid ISIN into a pl.UInt64 key, or null if it is not valid. Joins and group
+    bys on the keys are much faster than on the strings. The check digit is not stored since
+    it follows from the rest, and isin_from_u64 restores it.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_isin_to_u64",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def isin_from_u64(x: pl.Expr | pl.Series) -> pl.Expr:
+    """
+    Returns the ISIN packed by isin_to_u64, or null if the value is not a packed ISIN.
     """
     return pl_plugin(
         args=[x],
-        symbol="pl_isin_full",
+        symbol="pl_isin_from_u64",
+        is_elementwise=True,
+    )
+
+
+def isin_to_cusip(x: pl.Expr | pl.Series, dedup: bool = False, normalize: bool = False) -> pl.Expr:
+    """
+    Returns the CUSIP inside the ISIN, which is its security id for countries that number
+    securities with CUSIPs (e.g. US and CA). Null if the ISIN is not valid or its security
+    id is not a valid CUSIP.
+
+    If dedup, each distinct value is only parsed once.
+
+    If normalize, each value is cleaned as by isin_normalize while it is parsed.
+    """
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_isin_to_cusip",
+        kwargs={"normalize": normalize},
+        is_elementwise=True,
+    )
+
+
+def isin_compute_check_digit(x: pl.Expr | pl.Series, dedup: bool = False) -> pl.Expr:
+    """
+    Computes the check digit of an ISIN payload, i.e. the 11 characters of the country code
+    and the security id. Null if the payload is not valid.
+
+    If dedup, each distinct value is only parsed once.
+    """
+    return pl_plugin(
+        args=[dictionary_input(x, dedup)],
+        symbol="pl_isin_compute_check_digit",
+        is_elementwise=True,
+    )
+
+
+def isin_normalize(x: pl.Expr | pl.Series) -> pl.Expr:
+    """
+    Removes whitespace and dashes and uppercases the letters, e.g. "us0378331005" becomes
+    "US0378331005". Null if the result is too long to be a valid ISIN.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_isin_normalize",
+        is_elementwise=True,
+    )
+
+
+def isin_find_all(x: pl.Expr | pl.Series) -> pl.Expr:
+    """
+    Returns the valid ISINs in free text, e.g. a trade confirmation, as a list of strings in
+    the order they appear. ISINs are found as whole words of 12 letters and digits and their
+    check digits are verified while the text is scanned once, so this replaces
+    str.extract_all followed by isin_is_valid.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_isin_find_all",
         is_elementwise=True,
     )
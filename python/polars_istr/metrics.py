@@ -0,0 +1,57 @@
+from __future__ import annotations
+from typing import Dict, NamedTuple
+
+
+class KernelStats(NamedTuple):
+    calls: int
+    rows: int
+    nulls: int
+    failures: int
+    output_bytes: int
+    nanos: int
+
+
+def stats_enable() -> None:
+    """
+    Turns on the counters of the work done by each kernel, which stats returns. They are off
+    by default, and can also be turned on by setting the POLARS_ISTR_STATS environment
+    variable to 1 before the first expression runs.
+    """
+    from ._polars_istr import stats_enable as _stats_enable
+
+    _stats_enable(True)
+
+
+def stats_disable() -> None:
+    """
+    Turns off the kernel counters. They keep their values until stats_reset.
+    """
+    from ._polars_istr import stats_enable as _stats_enable
+
+    _stats_enable(False)
+
+
+def stats() -> Dict[str, KernelStats]:
+    """
+    Returns the counters of every kernel called while they were on, by kernel name, e.g.
+    pl_url_host for url_host. Each call adds its rows, null rows, failures, estimated output
+    size in bytes and wall time in nanoseconds.
+
+    Failures are the non-null rows that could not be parsed: rows with a null output for most
+    kernels, which includes values without the part a kernel returns (e.g. a URL without a
+    fragment), false for is_valid, anything but "ok" for check and null parts for
+    *_extract_all. For find_all, they are the texts in which nothing was found. url_extract_all
+    counts them once per distinct value of a Categorical input.
+    """
+    from ._polars_istr import stats as _stats
+
+    return {name: KernelStats(*counts) for name, *counts in _stats()}
+
+
+def stats_reset() -> None:
+    """
+    Removes the counters of all kernels.
+    """
+    from ._polars_istr import stats_reset as _stats_reset
+
+    _stats_reset()
@@ -1,70 +1,267 @@
 from __future__ import annotations
 import polars as pl
+from typing import List, Optional
+from . import _utils
 from ._utils import pl_plugin
 
+_URL_FIELDS = (
+    "scheme",
+    "username",
+    "password",
+    "host",
+    "domain",
+    "registered_domain",
+    "public_suffix",
+    "port",
+    "path",
+    "query",
+    "fragment",
+    "is_special",
+)
 
-def url_is_special(x: pl.Expr | pl.Series) -> pl.Expr:
+
+def url_is_special(x: pl.Expr | pl.Series, strict: bool = True) -> pl.Expr:
     """
-    Returns a boolean indicating whether the URL has a special scheme or not.
+    Returns a boolean indicating whether the URL has a special scheme or not. If not strict,
+    plain http(s) URLs are split by a faster, allocation-free parser and only the others are
+    fully parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_url_is_special",
+        kwargs={"strict": strict},
         is_elementwise=True,
     )
 
 
-def url_host(x: pl.Expr | pl.Series) -> pl.Expr:
+def url_host(x: pl.Expr | pl.Series, as_categorical: bool = False, strict: bool = True) -> pl.Expr:
     """
-    Returns the host of the URL, if possible.
+    Returns the host of the URL, if possible. If as_categorical, the output is interned into a
+    Categorical. If not strict, plain http(s) URLs are split by a faster, allocation-free parser
+    and only the others are fully parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_url_host",
+        kwargs={"categorical": as_categorical, "strict": strict},
         is_elementwise=True,
     )
 
 
-def url_path(x: pl.Expr | pl.Series) -> pl.Expr:
+def url_host_n_unique(x: pl.Expr | pl.Series, approx: bool = True, strict: bool = True) -> pl.Expr:
+    """
+    Returns the number of distinct hosts as a pl.UInt64 scalar, counted while the URLs are
+    parsed without building the host column. URLs without a host are not counted. Works as
+    an aggregation in group_by.
+
+    If approx, the count is estimated with a HyperLogLog sketch of 16 KiB, with a standard
+    error of about 0.8%. Otherwise the hosts are kept in a hash set.
+
+    If not strict, plain http(s) URLs are split by a faster, allocation-free parser and only the
+    others are fully parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_host_n_unique",
+        kwargs={"approx": approx, "strict": strict},
+        returns_scalar=True,
+    )
+
+
+def url_host_hll(x: pl.Expr | pl.Series, strict: bool = True) -> pl.Expr:
+    """
+    Returns the HyperLogLog sketch that url_host_n_unique counts with approx, as a pl.Binary
+    scalar of 16 KiB. Works as an aggregation in group_by. Sketches of partitions, files or
+    days can be stored and combined later by hll_merge and hll_count, without keeping the
+    hosts. The hosts are hashed by a fixed function, so sketches of different versions of
+    polars_istr can be merged.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_host_hll",
+        kwargs={"strict": strict},
+        returns_scalar=True,
+    )
+
+
+def hll_merge(x: pl.Expr | pl.Series) -> pl.Expr:
     """
-    Returns the path part of the URL, if possible.
+    Merges a column of sketches from url_host_hll into one sketch of the union of their
+    values, as a pl.Binary scalar. Nulls are skipped. Works as an aggregation in group_by.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_hll_merge",
+        returns_scalar=True,
+    )
+
+
+def hll_count(x: pl.Expr | pl.Series) -> pl.Expr:
+    """
+    Returns the estimated number of distinct values of each sketch from url_host_hll or
+    hll_merge, as a pl.UInt64.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_hll_count",
+        is_elementwise=True,
+    )
+
+
+def url_path(x: pl.Expr | pl.Series, strict: bool = True) -> pl.Expr:
+    """
+    Returns the path part of the URL, if possible. If not strict, plain http(s) URLs are split
+    by a faster, allocation-free parser and only the others are fully parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_url_path",
+        kwargs={"strict": strict},
         is_elementwise=True,
     )
 
 
-def url_domain(x: pl.Expr | pl.Series) -> pl.Expr:
+def url_domain(
+    x: pl.Expr | pl.Series, as_categorical: bool = False, strict: bool = True
+) -> pl.Expr:
     """
-    Returns the domain of the URL, if possible.
+    Returns the domain of the URL, if possible. If as_categorical, the output is interned into a
+    Categorical. If not strict, plain http(s) URLs are split by a faster, allocation-free parser
+    and only the others are fully parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_url_domain",
+        kwargs={"categorical": as_categorical, "strict": strict},
         is_elementwise=True,
     )
 
 
-def url_fragment(x: pl.Expr | pl.Series) -> pl.Expr:
+def url_registered_domain(
+    x: pl.Expr | pl.Series, as_categorical: bool = False, strict: bool = True
+) -> pl.Expr:
     """
-    Returns the fragment of the URL, if possible.
+    Returns the registered domain (eTLD+1) of the URL, e.g. bbc.co.uk for news.bbc.co.uk, if
+    possible. If as_categorical, the output is interned into a Categorical. If not strict, plain
+    http(s) URLs are split by a faster, allocation-free parser and only the others are fully
+    parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_registered_domain",
+        kwargs={"categorical": as_categorical, "strict": strict},
+        is_elementwise=True,
+    )
+
+
+def url_public_suffix(
+    x: pl.Expr | pl.Series, as_categorical: bool = False, strict: bool = True
+) -> pl.Expr:
+    """
+    Returns the public suffix (eTLD) of the URL, e.g. co.uk for news.bbc.co.uk, if possible. If
+    as_categorical, the output is interned into a Categorical. If not strict, plain http(s) URLs
+    are split by a faster, allocation-free parser and only the others are fully parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_public_suffix",
+        kwargs={"categorical": as_categorical, "strict": strict},
+        is_elementwise=True,
+    )
+
+
+def url_fragment(x: pl.Expr | pl.Series, strict: bool = True) -> pl.Expr:
+    """
+    Returns the fragment of the URL, if possible. If not strict, plain http(s) URLs are split by
+    a faster, allocation-free parser and only the others are fully parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_url_fragment",
+        kwargs={"strict": strict},
         is_elementwise=True,
     )
 
 
-def url_query(x: pl.Expr | pl.Series) -> pl.Expr:
+def url_query(x: pl.Expr | pl.Series, strict: bool = True) -> pl.Expr:
     """
-    Returns the query part of the URL, if possible.
+    Returns the query part of the URL, if possible. If not strict, plain http(s) URLs are split
+    by a faster, allocation-free parser and only the others are fully parsed.
     """
     return pl_plugin(
         args=[x],
         symbol="pl_url_query",
+        kwargs={"strict": strict},
+        is_elementwise=True,
+    )
+
+
+def url_query_params(x: pl.Expr | pl.Series, strict: bool = True) -> pl.Expr:
+    """
+    Returns the percent-decoded key-value pairs of the URL's query as a list of structs with
+    fields key and value. Null if the string is not a valid URL. If not strict, plain http(s)
+    URLs are split by a faster, allocation-free parser and only the others are fully parsed.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_query_params",
+        kwargs={"strict": strict},
+        is_elementwise=True,
+    )
+
+
+def url_query_param(x: pl.Expr | pl.Series, key: str | List[str], strict: bool = True) -> pl.Expr:
+    """
+    Returns the percent-decoded value of the first occurrence of `key` in the URL's query. If
+    `key` is a list of keys, returns a struct with one field per key. All keys are read in a
+    single pass over the query. If not strict, plain http(s) URLs are split by a faster,
+    allocation-free parser and only the others are fully parsed.
+    """
+    keys = [key] if isinstance(key, str) else list(dict.fromkeys(key))
+    if len(keys) == 0:
+        raise ValueError("At least one query key must be requested.")
+
+    out = pl_plugin(
+        args=[x],
+        symbol="pl_url_query_param",
+        kwargs={"keys": keys, "strict": strict},
+        is_elementwise=True,
+    )
+    return out.struct.field(key) if isinstance(key, str) else out
+
+
+def url_normalize(
+    x: pl.Expr | pl.Series, sort_query: bool = True, drop_fragment: bool = True
+) -> pl.Expr:
+    """
+    Returns the URL in a canonical form for deduplication, or null if it is not a valid URL.
+    Like all URLs parsed here, the host of http(s) and the other special schemes is lowercased,
+    their default port is dropped, and dots in the path are resolved. If sort_query, the
+    query's pairs are sorted by key (without being decoded), the pairs of a repeated key keep
+    their order, and empty pairs are dropped. If drop_fragment, the fragment is dropped.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_normalize",
+        kwargs={"sort_query": sort_query, "drop_fragment": drop_fragment},
+        is_elementwise=True,
+    )
+
+
+def url_fingerprint(
+    x: pl.Expr | pl.Series, sort_query: bool = True, drop_fragment: bool = True
+) -> pl.Expr:
+    """
+    Returns a pl.UInt64 hash (64-bit FNV-1a) of the URL's url_normalize form, or null if it is
+    not a valid URL. It is computed while parsing, without building a column of normalized
+    strings, and is the same across versions and platforms, which makes it a compact key for
+    joins and deduplication. Distinct URLs may collide, with a probability of about n^2 / 2^65 for
+    n distinct URLs.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_fingerprint",
+        kwargs={"sort_query": sort_query, "drop_fragment": drop_fragment},
         is_elementwise=True,
     )
 
@@ -80,12 +277,66 @@ def url_is_valid(x: pl.Expr | pl.Series) -> pl.Expr:
     )
 
 
-def url_check(x: pl.Expr | pl.Series) -> pl.Expr:
+def url_check(x: pl.Expr | pl.Series, *, code: bool = False) -> pl.Expr:
     """
     Returns a string that explains whether the URL string is valid or not.
+
+    If code, returns a pl.Enum of the reasons instead of strings, which takes much less
+    memory.
     """
+    if code:
+        return pl_plugin(
+            args=[x],
+            symbol="pl_url_check_enum",
+            is_elementwise=True,
+        ).cast(_utils.URL_CHECK_ENUM)
+
     return pl_plugin(
         args=[x],
         symbol="pl_url_check",
         is_elementwise=True,
     )
+
+
+def url_extract_all(
+    x: pl.Expr | pl.Series, fields: Optional[List[str]] = None, strict: bool = True
+) -> pl.Expr:
+    """
+    Returns the requested parts of the URL as a struct. Each URL is only parsed once, so running
+    this can be faster than running the corresponding single queries together.
+
+    Fields can be any of scheme, username, password, host, domain, registered_domain,
+    public_suffix, port, path, query, fragment and is_special. If None, all of them will be
+    extracted. If not strict, plain http(s) URLs are split by a faster, allocation-free parser
+    and only the others are fully parsed.
+    """
+    if fields is None:
+        fields = list(_URL_FIELDS)
+    else:
+        fields = list(dict.fromkeys(fields))
+
+    if len(fields) == 0:
+        raise ValueError("At least one URL field must be requested.")
+    for f in fields:
+        if f not in _URL_FIELDS:
+            raise ValueError(f"Unknown URL field: {f}. Must be one of {_URL_FIELDS}.")
+
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_extract_all",
+        kwargs={"fields": fields, "strict": strict},
+        is_elementwise=True,
+    )
+
+
+def url_find_all(x: pl.Expr | pl.Series) -> pl.Expr:
+    """
+    Returns the http(s) URLs with a host in free text as a list of strings in the order they
+    appear. Punctuation right after a URL, e.g. the period at the end of a sentence, is not part
+    of it.
+    """
+    return pl_plugin(
+        args=[x],
+        symbol="pl_url_find_all",
+        is_elementwise=True,
+    )
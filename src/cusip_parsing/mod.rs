@@ -1,316 +1,592 @@
+use crate::isin_parsing::isin_check_digit_of;
+use crate::utils::stats::Failures;
+use crate::utils::{
+    check_columns, check_fields, dictionary_apply, digit_index, find_all, find_all_output,
+    letter_index, normalize, stats, substring_views, token_ranges, validate_inline, Cleaner,
+    NormalizeKwargs,
+};
 use cusip::CUSIP;
 use polars::prelude::*;
 use pyo3_polars::derive::polars_expr;
+use serde::Deserialize;
 
-fn cusip_full_output(_: &[Field]) -> PolarsResult<Field> {
+#[derive(Deserialize)]
+struct ExtractKwargs {
+    with_check: bool,
+    normalize: bool,
+}
+
+fn cusip_full_output(_: &[Field], kwargs: ExtractKwargs) -> PolarsResult<Field> {
     let cc = Field::new("country_code".into(), DataType::String);
     let issuer = Field::new("issuer".into(), DataType::String);
     let issue = Field::new("issue".into(), DataType::String);
     let cd = Field::new("check_digit".into(), DataType::String);
 
-    let v: Vec<Field> = vec![cc, issuer, issue, cd];
+    let mut v: Vec<Field> = vec![cc, issuer, issue, cd];
+    if kwargs.with_check {
+        v.extend(check_fields());
+    }
     Ok(Field::new("".into(), DataType::Struct(v)))
 }
 
-#[polars_expr(output_type_func=cusip_full_output)]
-fn pl_cusip_full(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-
-    let mut cc_builder = StringChunkedBuilder::new("country_code".into(), ca.len());
-    let mut ir_builder = StringChunkedBuilder::new("issuer".into(), ca.len());
-    let mut is_builder = StringChunkedBuilder::new("issue".into(), ca.len());
-    let mut cd_builder = StringChunkedBuilder::new("check_digit".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                if let Some(cins) = cusip.as_cins() {
-                    cc_builder.append_value(cins.country_code().to_string());
-                    ir_builder.append_value(cusip.issuer_num());
-                    is_builder.append_value(cusip.issue_num());
-                    cd_builder.append_value(cusip.check_digit().to_string());
-                } else {
-                    cc_builder.append_null();
-                    ir_builder.append_value(cusip.issuer_num());
-                    is_builder.append_value(cusip.issue_num());
-                    cd_builder.append_value(cusip.check_digit().to_string());
-                }
-            } else {
-                cc_builder.append_null();
-                ir_builder.append_null();
-                is_builder.append_null();
-                cd_builder.append_null();
-            }
-        } else {
-            cc_builder.append_null();
-            ir_builder.append_null();
-            is_builder.append_null();
-            cd_builder.append_null();
+// Check digit contribution (sum of the digits of the value) of each CUSIP payload
+// character, depending on whether its value is doubled. Letters are 10 to 35, and `*`, `@`,
+// `#` are 36, 37, 38. 0xFF marks characters that are not allowed.
+const fn cusip_table(doubled: bool) -> [u8; 256] {
+    let mut table = [0xFF; 256];
+    let mut c: usize = 0;
+    while c < 256 {
+        let v = match c as u8 {
+            b'0'..=b'9' => c as u8 - b'0',
+            b'A'..=b'Z' => c as u8 - b'A' + 10,
+            b'*' => 36,
+            b'@' => 37,
+            b'#' => 38,
+            _ => 0xFF,
+        };
+        if v != 0xFF {
+            let v = if doubled { 2 * v } else { v };
+            table[c] = v / 10 + v % 10;
         }
-    });
-    let cc = cc_builder.finish().into_series().into_column();
-    let ir = ir_builder.finish().into_series().into_column();
-    let is = is_builder.finish().into_series().into_column();
-    let cd = cd_builder.finish().into_series().into_column();
-
-    let out = StructChunked::from_columns("cusip".into(), cc.len(), &[cc, ir, is, cd])?;
-    Ok(out.into_series())
+        c += 1;
+    }
+    table
 }
 
-#[polars_expr(output_type=String)]
-fn pl_cusip_issue_num(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-
-    let mut s_builder = StringChunkedBuilder::new("issue_num".into(), ca.len());
+static CUSIP_SUM: [[u8; 256]; 2] = [cusip_table(false), cusip_table(true)];
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                s_builder.append_value(cusip.issue_num());
-            } else {
-                s_builder.append_null();
-            }
-        } else {
-            s_builder.append_null();
+// Modulus 10 double-add-double check digit of a CUSIP payload (the first 8 characters), or
+// None if it has characters that are not allowed.
+fn cusip_check_digit_of(payload: &[u8]) -> Option<u8> {
+    let mut sum = 0u32;
+    for (i, &c) in payload.iter().enumerate() {
+        let v = CUSIP_SUM[i & 1][c as usize];
+        if v == 0xFF {
+            return None;
         }
-    });
-
-    let out = s_builder.finish();
-    Ok(out.into_series())
+        sum += v as u32;
+    }
+    Some(((10 - sum % 10) % 10) as u8)
 }
 
-#[polars_expr(output_type=String)]
-fn pl_cusip_issuer_num(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+// Validates the format and the check digit of a CUSIP with lookup tables, without
+// constructing a CUSIP.
+pub(crate) fn cusip_is_valid_bytes(b: &[u8; 9]) -> bool {
+    cusip_check_digit_of(&b[..8]) == Some(b[8].wrapping_sub(b'0'))
+}
 
-    let mut s_builder = StringChunkedBuilder::new("issuer_num".into(), ca.len());
+// A valid CUSIP is exactly 9 ASCII characters: issuer (0..6), issue (6..8) and check
+// digit (8..9). For a CINS, the first character of the issuer is a letter, which is the
+// country code. Returns whether the CUSIP is a CINS, or None if it is not valid.
+fn cusip_kind(s: &str) -> Option<bool> {
+    let b: &[u8; 9] = s.as_bytes().try_into().ok()?;
+    cusip_is_valid_bytes(b).then(|| b[0].is_ascii_uppercase())
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                if let Some(cins) = cusip.as_cins() {
-                    s_builder.append_value(cins.issuer_num());
-                } else {
-                    s_builder.append_value(cusip.issuer_num());
-                }
-            } else {
-                s_builder.append_null();
+#[polars_expr(output_type_func_with_kwargs=cusip_full_output)]
+fn pl_cusip_full(inputs: &[Series], kwargs: ExtractKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_cusip_full",
+        Failures::Field("issuer"),
+        &inputs[0],
+        |ca| {
+            // Check codes of the non-null rows, in order, when the parts are split by the check.
+            let mut codes: Vec<u32> = Vec::new();
+            let [cc, ir, is, cd] = substring_views(
+                ca,
+                Cleaner::new(kwargs.normalize, 9),
+                ["country_code", "issuer", "issue", "check_digit"],
+                |s| {
+                    let kind = if kwargs.with_check {
+                        let code = cusip_check_code(s);
+                        codes.push(code);
+                        (code == 0).then(|| s.as_bytes()[0].is_ascii_uppercase())
+                    } else {
+                        cusip_kind(s)
+                    };
+                    match kind {
+                        Some(is_cins) => [
+                            is_cins.then_some((0, 1)),
+                            Some((0, 6)),
+                            Some((6, 8)),
+                            Some((8, 9)),
+                        ],
+                        None => [None; 4],
+                    }
+                },
+            );
+
+            let mut columns = vec![
+                cc.into_series().into_column(),
+                ir.into_series().into_column(),
+                is.into_series().into_column(),
+                cd.into_series().into_column(),
+            ];
+            if kwargs.with_check {
+                columns.extend(check_columns(ca, codes));
             }
-        } else {
-            s_builder.append_null();
-        }
-    });
 
-    let out = s_builder.finish();
-    Ok(out.into_series())
+            let out = StructChunked::from_columns("cusip".into(), ca.len(), &columns)?;
+            Ok(out.into_series())
+        },
+    )
 }
 
 #[polars_expr(output_type=String)]
-fn pl_cusip_country_code(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+fn pl_cusip_issue_num(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_issue_num", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 9);
+        let [out] = substring_views(ca, cleaner, ["issue_num"], |s| {
+            [cusip_kind(s).map(|_| (6, 8))]
+        });
+        Ok(out.into_series())
+    })
+}
 
-    let mut s_builder = StringChunkedBuilder::new("country_code".into(), ca.len());
+#[polars_expr(output_type=String)]
+fn pl_cusip_issuer_num(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_issuer_num", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 9);
+        // The issuer number of a CINS does not include the country code.
+        let [out] = substring_views(ca, cleaner, ["issuer_num"], |s| {
+            [cusip_kind(s).map(|is_cins| if is_cins { (1, 6) } else { (0, 6) })]
+        });
+        Ok(out.into_series())
+    })
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                if let Some(cins) = cusip.as_cins() {
-                    s_builder.append_value(cins.country_code().to_string());
-                } else {
-                    s_builder.append_null();
-                }
-            } else {
-                s_builder.append_null();
-            }
-        } else {
-            s_builder.append_null();
-        }
-    });
+#[polars_expr(output_type=String)]
+fn pl_cusip_country_code(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_country_code", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 9);
+        let [out] = substring_views(ca, cleaner, ["country_code"], |s| {
+            [cusip_kind(s).and_then(|is_cins| is_cins.then_some((0, 1)))]
+        });
+        Ok(out.into_series())
+    })
+}
 
-    let out = s_builder.finish();
-    Ok(out.into_series())
+#[polars_expr(output_type=String)]
+fn pl_cusip_check_digit(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_check_digit", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 9);
+        let [out] = substring_views(ca, cleaner, ["check_digit"], |s| {
+            [cusip_kind(s).map(|_| (8, 9))]
+        });
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=String)]
-fn pl_cusip_check_digit(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+fn pl_cusip_payload(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_payload", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 9);
+        let [out] = substring_views(
+            ca,
+            cleaner,
+            ["payload"],
+            |s| [cusip_kind(s).map(|_| (0, 8))],
+        );
+        Ok(out.into_series())
+    })
+}
 
-    let mut s_builder = StringChunkedBuilder::new("check_digit".into(), ca.len());
+// The *_enum kernels return the position of the value in the categories of the
+// corresponding Enum, which is cast on the Python side.
+#[polars_expr(output_type=UInt32)]
+fn pl_cusip_country_code_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_cusip_country_code_enum",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+            let out = UInt32Chunked::from_iter_options(
+                "country_code".into(),
+                ca.into_iter().map(|op_s| {
+                    op_s.map(|s| cleaner.clean(s))
+                        .filter(|s| cusip_kind(s) == Some(true))
+                        .and_then(|s| letter_index(s.as_bytes()[0]))
+                }),
+            );
+            Ok(out.into_series())
+        },
+    )
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                s_builder.append_value(cusip.check_digit().to_string());
-            } else {
-                s_builder.append_null();
-            }
-        } else {
-            s_builder.append_null();
-        }
-    });
+#[polars_expr(output_type=UInt32)]
+fn pl_cusip_check_digit_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_cusip_check_digit_enum",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+            let out = UInt32Chunked::from_iter_options(
+                "check_digit".into(),
+                ca.into_iter().map(|op_s| {
+                    op_s.map(|s| cleaner.clean(s))
+                        .filter(|s| cusip_kind(s).is_some())
+                        .and_then(|s| digit_index(s.as_bytes()[8]))
+                }),
+            );
+            Ok(out.into_series())
+        },
+    )
+}
 
-    let out = s_builder.finish();
-    Ok(out.into_series())
+#[polars_expr(output_type=Boolean)]
+fn pl_cusip_is_valid(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_is_valid", Failures::NotTrue, &inputs[0], |ca| {
+        Ok(validate_inline(ca, kwargs.normalize, cusip_is_valid_bytes).into_series())
+    })
 }
 
-#[polars_expr(output_type=String)]
-fn pl_cusip_payload(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+#[polars_expr(output_type=Boolean)]
+fn pl_cusip_is_private_issue(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_cusip_is_private_issue",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut b_builder = BooleanChunkedBuilder::new("is_private_issue".into(), ca.len());
+            let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+
+            ca.into_iter().for_each(|op_s| {
+                if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                    if let Ok(cusip) = CUSIP::parse(s) {
+                        b_builder.append_value(cusip.is_private_issue());
+                    } else {
+                        b_builder.append_null()
+                    }
+                } else {
+                    b_builder.append_null();
+                }
+            });
 
-    let mut s_builder = StringChunkedBuilder::new("check_digit".into(), ca.len());
+            let out = b_builder.finish();
+            Ok(out.into_series())
+        },
+    )
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                s_builder.append_value(cusip.payload());
-            } else {
-                s_builder.append_null();
-            }
-        } else {
-            s_builder.append_null();
-        }
-    });
+#[polars_expr(output_type=Boolean)]
+fn pl_cusip_has_private_issuer(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_cusip_has_private_issuer",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut b_builder = BooleanChunkedBuilder::new("has_private_issuer".into(), ca.len());
+            let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+
+            ca.into_iter().for_each(|op_s| {
+                if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                    if let Ok(cusip) = CUSIP::parse(s) {
+                        b_builder.append_value(cusip.has_private_issuer());
+                    } else {
+                        b_builder.append_null()
+                    }
+                } else {
+                    b_builder.append_null();
+                }
+            });
 
-    let out = s_builder.finish();
-    Ok(out.into_series())
+            let out = b_builder.finish();
+            Ok(out.into_series())
+        },
+    )
 }
 
 #[polars_expr(output_type=Boolean)]
-fn pl_cusip_is_private_issue(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+fn pl_cusip_is_private_use(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_cusip_is_private_use",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut b_builder = BooleanChunkedBuilder::new("is_private_use".into(), ca.len());
+            let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+
+            ca.into_iter().for_each(|op_s| {
+                if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                    if let Ok(cusip) = CUSIP::parse(s) {
+                        b_builder.append_value(cusip.is_private_use());
+                    } else {
+                        b_builder.append_null()
+                    }
+                } else {
+                    b_builder.append_null();
+                }
+            });
 
-    let mut b_builder = BooleanChunkedBuilder::new("is_private_issue".into(), ca.len());
+            let out = b_builder.finish();
+            Ok(out.into_series())
+        },
+    )
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                b_builder.append_value(cusip.is_private_issue());
+#[polars_expr(output_type=Boolean)]
+fn pl_cusip_is_cins(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_is_cins", Failures::Null, &inputs[0], |ca| {
+        let mut b_builder = BooleanChunkedBuilder::new("is_cins".into(), ca.len());
+        let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                if let Ok(cusip) = CUSIP::parse(s) {
+                    b_builder.append_value(cusip.is_cins());
+                } else {
+                    b_builder.append_null()
+                }
             } else {
-                b_builder.append_null()
+                b_builder.append_null();
             }
-        } else {
-            b_builder.append_null();
-        }
-    });
+        });
 
-    let out = b_builder.finish();
-    Ok(out.into_series())
+        let out = b_builder.finish();
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=Boolean)]
-fn pl_cusip_has_private_issuer(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-
-    let mut b_builder = BooleanChunkedBuilder::new("has_private_issuer".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                b_builder.append_value(cusip.has_private_issuer());
+fn pl_cusip_is_cins_base(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_is_cins_base", Failures::Null, &inputs[0], |ca| {
+        let mut b_builder = BooleanChunkedBuilder::new("is_cins_base".into(), ca.len());
+        let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                if let Ok(cusip) = CUSIP::parse(s) {
+                    if let Some(cins) = cusip.as_cins() {
+                        b_builder.append_value(cins.is_base());
+                    } else {
+                        b_builder.append_null();
+                    }
+                } else {
+                    b_builder.append_null();
+                }
             } else {
-                b_builder.append_null()
+                b_builder.append_null();
             }
-        } else {
-            b_builder.append_null();
-        }
-    });
+        });
 
-    let out = b_builder.finish();
-    Ok(out.into_series())
+        let out = b_builder.finish();
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=Boolean)]
-fn pl_cusip_is_private_use(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+fn pl_cusip_is_cins_extended(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_cusip_is_cins_extended",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut b_builder = BooleanChunkedBuilder::new("is_cins_extended".into(), ca.len());
+            let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+
+            ca.into_iter().for_each(|op_s| {
+                if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                    if let Ok(cusip) = CUSIP::parse(s) {
+                        if let Some(cins) = cusip.as_cins() {
+                            b_builder.append_value(cins.is_extended());
+                        } else {
+                            b_builder.append_null();
+                        }
+                    } else {
+                        b_builder.append_null()
+                    }
+                } else {
+                    b_builder.append_null();
+                }
+            });
 
-    let mut b_builder = BooleanChunkedBuilder::new("is_private_use".into(), ca.len());
+            let out = b_builder.finish();
+            Ok(out.into_series())
+        },
+    )
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                b_builder.append_value(cusip.is_private_use());
-            } else {
-                b_builder.append_null()
-            }
-        } else {
-            b_builder.append_null();
-        }
+const CUSIP_ALPHABET: &[u8; 39] = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ*@#";
+// Number of distinct payloads.
+const PAYLOAD_RADIX: u64 = 39u64.pow(8);
+
+// Packs a valid CUSIP into an integer: the payload in base 39, with the characters valued
+// as for the check digit. The check digit follows from the payload, so it is not stored.
+fn cusip_encode(s: &str) -> Option<u64> {
+    let b: &[u8; 9] = s.as_bytes().try_into().ok()?;
+    if !cusip_is_valid_bytes(b) {
+        return None;
+    }
+    let payload = b[..8].iter().fold(0u64, |acc, &c| {
+        let v = match c {
+            b'0'..=b'9' => c - b'0',
+            b'A'..=b'Z' => c - b'A' + 10,
+            b'*' => 36,
+            b'@' => 37,
+            _ => 38,
+        };
+        acc * 39 + v as u64
     });
-
-    let out = b_builder.finish();
-    Ok(out.into_series())
+    Some(payload)
 }
 
-#[polars_expr(output_type=Boolean)]
-fn pl_cusip_is_cins(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+fn cusip_decode(v: u64) -> Option<[u8; 9]> {
+    if v >= PAYLOAD_RADIX {
+        return None;
+    }
+    let mut payload = v;
+    let mut b = [0u8; 9];
+    for c in b[..8].iter_mut().rev() {
+        *c = CUSIP_ALPHABET[(payload % 39) as usize];
+        payload /= 39;
+    }
+    b[8] = b'0' + cusip_check_digit_of(&b[..8])?;
+    Some(b)
+}
 
-    let mut b_builder = BooleanChunkedBuilder::new("is_cins".into(), ca.len());
+#[polars_expr(output_type=UInt64)]
+fn pl_cusip_to_u64(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_to_u64", Failures::Null, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+        let out = UInt64Chunked::from_iter_options(
+            "cusip".into(),
+            ca.into_iter()
+                .map(|op_s| op_s.and_then(|s| cusip_encode(cleaner.clean(s)))),
+        );
+        Ok(out.into_series())
+    })
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                b_builder.append_value(cusip.is_cins());
-            } else {
-                b_builder.append_null()
-            }
-        } else {
-            b_builder.append_null();
-        }
-    });
+#[polars_expr(output_type=String)]
+fn pl_cusip_from_u64(inputs: &[Series]) -> PolarsResult<Series> {
+    stats::record("pl_cusip_from_u64", Failures::Null, &inputs[0], || {
+        let s = inputs[0].cast(&DataType::UInt64)?;
+        let ca = s.u64()?;
+        let mut builder = StringChunkedBuilder::new("cusip".into(), ca.len());
+
+        ca.into_iter()
+            .for_each(|op_v| match op_v.and_then(cusip_decode) {
+                // Decoded CUSIPs are ASCII.
+                Some(b) => builder.append_value(std::str::from_utf8(&b).unwrap()),
+                None => builder.append_null(),
+            });
+        Ok(builder.finish().into_series())
+    })
+}
 
-    let out = b_builder.finish();
-    Ok(out.into_series())
+// A CUSIP has 9 characters.
+#[polars_expr(output_type=String)]
+fn pl_cusip_normalize(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_normalize", Failures::Null, &inputs[0], |ca| {
+        Ok(normalize::<9>(ca).into_series())
+    })
 }
 
-#[polars_expr(output_type=Boolean)]
-fn pl_cusip_is_cins_base(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+#[derive(Deserialize)]
+struct CusipToIsinKwargs {
+    country: String,
+    normalize: bool,
+}
 
-    let mut b_builder = BooleanChunkedBuilder::new("is_cins_base".into(), ca.len());
+// The ISIN of a CUSIP is the country code, the CUSIP and a check digit. CUSIPs with `*`, `@`
+// or `#` have no ISIN.
+fn cusip_to_isin_bytes(s: &str, country: [u8; 2]) -> Option<[u8; 12]> {
+    let b: &[u8; 9] = s.as_bytes().try_into().ok()?;
+    if !cusip_is_valid_bytes(b) {
+        return None;
+    }
+    let mut out = [0u8; 12];
+    out[..2].copy_from_slice(&country);
+    out[2..11].copy_from_slice(b);
+    out[11] = b'0' + isin_check_digit_of(&out[..11])?;
+    Some(out)
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                if let Some(cins) = cusip.as_cins() {
-                    b_builder.append_value(cins.is_base());
-                } else {
-                    b_builder.append_null();
-                }
-            } else {
-                b_builder.append_null();
+#[polars_expr(output_type=String)]
+fn pl_cusip_to_isin(inputs: &[Series], kwargs: CusipToIsinKwargs) -> PolarsResult<Series> {
+    let country = match kwargs.country.as_bytes() {
+        [a @ b'A'..=b'Z', b @ b'A'..=b'Z'] => [*a, *b],
+        _ => polars_bail!(InvalidOperation: "Invalid country code: {}", kwargs.country),
+    };
+    dictionary_apply("pl_cusip_to_isin", Failures::Null, &inputs[0], |ca| {
+        let mut builder = StringChunkedBuilder::new("isin".into(), ca.len());
+        let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+
+        ca.into_iter().for_each(|op_s| {
+            match op_s.and_then(|s| cusip_to_isin_bytes(cleaner.clean(s), country)) {
+                // ISINs are ASCII.
+                Some(b) => builder.append_value(std::str::from_utf8(&b).unwrap()),
+                None => builder.append_null(),
             }
-        } else {
-            b_builder.append_null();
-        }
-    });
-
-    let out = b_builder.finish();
-    Ok(out.into_series())
+        });
+        Ok(builder.finish().into_series())
+    })
 }
 
-#[polars_expr(output_type=Boolean)]
-fn pl_cusip_is_cins_extended(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+// Reasons returned by cusip_check. The codes are positions in this list, which is also the
+// order of the categories of the Enum on the Python side.
+static CUSIP_CHECKS: [&str; 4] = [
+    "ok",
+    "Invalid length",
+    "Invalid character",
+    "Invalid checksum",
+];
+
+fn cusip_check_code(s: &str) -> u32 {
+    let Ok(b) = <&[u8; 9]>::try_from(s.as_bytes()) else {
+        return 1;
+    };
+    match cusip_check_digit_of(&b[..8]) {
+        None => 2,
+        Some(_) if !b[8].is_ascii_digit() => 2,
+        Some(d) if d == b[8] - b'0' => 0,
+        Some(_) => 3,
+    }
+}
 
-    let mut b_builder = BooleanChunkedBuilder::new("is_cins_extended".into(), ca.len());
+#[polars_expr(output_type=String)]
+fn pl_cusip_check(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_check", Failures::NotOk, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+        let out = StringChunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter().map(|op_s| {
+                op_s.map(|s| CUSIP_CHECKS[cusip_check_code(cleaner.clean(s)) as usize])
+            }),
+        );
+        Ok(out.into_series())
+    })
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(cusip) = CUSIP::parse(s) {
-                if let Some(cins) = cusip.as_cins() {
-                    b_builder.append_value(cins.is_extended());
-                } else {
-                    b_builder.append_null();
-                }
-            } else {
-                b_builder.append_null()
-            }
-        } else {
-            b_builder.append_null();
-        }
-    });
+#[polars_expr(output_type=UInt32)]
+fn pl_cusip_check_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_check_enum", Failures::NotOk, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 9);
+        let out = UInt32Chunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter()
+                .map(|op_s| op_s.map(|s| cusip_check_code(cleaner.clean(s)))),
+        );
+        Ok(out.into_series())
+    })
+}
 
-    let out = b_builder.finish();
-    Ok(out.into_series())
+// CUSIPs in free text are whole alphanumeric tokens of 9 characters with a valid check
+// digit. `*`, `@` and `#` separate tokens, as in "CUSIP#303075105", so the rare CUSIPs that
+// contain them are not found.
+#[polars_expr(output_type_func=find_all_output)]
+fn pl_cusip_find_all(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_cusip_find_all", Failures::Empty, &inputs[0], |ca| {
+        let out = find_all(ca, |s, matches| {
+            matches.extend(token_ranges(s, |c| c.is_ascii_alphanumeric()).filter(
+                |&(start, end)| {
+                    end - start == 9
+                        && cusip_is_valid_bytes(s.as_bytes()[start..end].try_into().unwrap())
+                },
+            ))
+        });
+        Ok(out.into_series())
+    })
 }
@@ -1,195 +1,509 @@
+use crate::utils::stats::Failures;
+use crate::utils::{
+    check_columns, check_fields, country_code_index, dictionary_apply, dictionary_counts, find_all,
+    find_all_output, normalize, par_fold, stats, Cleaner, NormalizeKwargs,
+};
 use iban::{Iban, IbanLike};
 use polars::prelude::*;
 use pyo3_polars::derive::polars_expr;
+use serde::Deserialize;
 use std::str::FromStr;
+use std::sync::atomic::{AtomicU64, Ordering};
+
+mod registry;
+
+// Rows with the wrong length for their country are rejected before the mod 97 check.
+fn parse_iban(s: &str) -> Option<Iban> {
+    if registry::has_expected_length(s) {
+        Iban::from_str(s).ok()
+    } else {
+        None
+    }
+}
+
+#[derive(Deserialize)]
+struct ExtractKwargs {
+    with_check: bool,
+    normalize: bool,
+}
 
 // Using Builder seems to be the fastest way.
-fn iban_full_output(_: &[Field]) -> PolarsResult<Field> {
+fn iban_full_output(_: &[Field], kwargs: ExtractKwargs) -> PolarsResult<Field> {
     let cc = Field::new("country_code".into(), DataType::String);
     let cd = Field::new("check_digits".into(), DataType::String);
     let bban = Field::new("bban".into(), DataType::String);
     let bank = Field::new("bank_id".into(), DataType::String);
     let branch = Field::new("branch_id".into(), DataType::String);
-    let v: Vec<Field> = vec![cc, cd, bban, bank, branch];
+    let mut v: Vec<Field> = vec![cc, cd, bban, bank, branch];
+    if kwargs.with_check {
+        v.extend(check_fields());
+    }
     Ok(Field::new("".into(), DataType::Struct(v)))
 }
 
-#[polars_expr(output_type_func=iban_full_output)]
-fn pl_iban_extract_all(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-
-    let mut cc_builder = StringChunkedBuilder::new("country_code".into(), ca.len());
-    let mut cd_builder = StringChunkedBuilder::new("check_digits".into(), ca.len());
-    let mut bban_builder = StringChunkedBuilder::new("bban".into(), ca.len());
-    let mut bank_builder = StringChunkedBuilder::new("bank_id".into(), ca.len());
-    let mut branch_builder = StringChunkedBuilder::new("branch_id".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(iban) = Iban::from_str(s) {
-                cc_builder.append_value(iban.country_code());
-                cd_builder.append_value(iban.check_digits_str());
-                bban_builder.append_value(iban.bban());
-                bank_builder.append_option(iban.bank_identifier());
-                branch_builder.append_option(iban.branch_identifier());
-            } else {
-                cc_builder.append_null();
-                cd_builder.append_null();
-                bban_builder.append_null();
-                bank_builder.append_null();
-                branch_builder.append_null();
-            }
-        } else {
-            cc_builder.append_null();
-            cd_builder.append_null();
-            bban_builder.append_null();
-            bank_builder.append_null();
-            branch_builder.append_null();
-        }
-    });
+#[polars_expr(output_type_func_with_kwargs=iban_full_output)]
+fn pl_iban_extract_all(inputs: &[Series], kwargs: ExtractKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_iban_extract_all",
+        Failures::Field("country_code"),
+        &inputs[0],
+        |ca| {
+            let mut cc_builder = StringChunkedBuilder::new("country_code".into(), ca.len());
+            let mut cd_builder = StringChunkedBuilder::new("check_digits".into(), ca.len());
+            let mut bban_builder = StringChunkedBuilder::new("bban".into(), ca.len());
+            let mut bank_builder = StringChunkedBuilder::new("bank_id".into(), ca.len());
+            let mut branch_builder = StringChunkedBuilder::new("branch_id".into(), ca.len());
+            // Check codes of the non-null rows, in order. The reason needs the full parse, so
+            // the length is not checked first.
+            let mut codes: Vec<u32> = Vec::new();
+            let mut cleaner = Cleaner::new(kwargs.normalize, 34);
 
-    let cc = cc_builder.finish().into_series().into_column();
-    let cd = cd_builder.finish().into_series().into_column();
-    let bban = bban_builder.finish().into_series().into_column();
-    let bank = bank_builder.finish().into_series().into_column();
-    let branch = branch_builder.finish().into_series().into_column();
+            ca.into_iter().for_each(|op_s| {
+                if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                    let parsed = if kwargs.with_check {
+                        let parsed = Iban::from_str(s);
+                        codes.push(parsed.as_ref().map_or_else(iban_error_code, |_| 0));
+                        parsed.ok()
+                    } else {
+                        parse_iban(s)
+                    };
+                    if let Some(iban) = parsed {
+                        cc_builder.append_value(iban.country_code());
+                        cd_builder.append_value(iban.check_digits_str());
+                        bban_builder.append_value(iban.bban());
+                        bank_builder.append_option(iban.bank_identifier());
+                        branch_builder.append_option(iban.branch_identifier());
+                    } else {
+                        cc_builder.append_null();
+                        cd_builder.append_null();
+                        bban_builder.append_null();
+                        bank_builder.append_null();
+                        branch_builder.append_null();
+                    }
+                } else {
+                    cc_builder.append_null();
+                    cd_builder.append_null();
+                    bban_builder.append_null();
+                    bank_builder.append_null();
+                    branch_builder.append_null();
+                }
+            });
+
+            let cc = cc_builder.finish().into_series().into_column();
+            let cd = cd_builder.finish().into_series().into_column();
+            let bban = bban_builder.finish().into_series().into_column();
+            let bank = bank_builder.finish().into_series().into_column();
+            let branch = branch_builder.finish().into_series().into_column();
 
-    let out = StructChunked::from_columns(
-        "iban".into(), 
-        cc.len(),
-        &[cc, cd, bban, bank, branch]
-    )?;
-    Ok(out.into_series())
+            let mut columns = vec![cc, cd, bban, bank, branch];
+            if kwargs.with_check {
+                columns.extend(check_columns(ca, codes));
+            }
+
+            let out = StructChunked::from_columns("iban".into(), ca.len(), &columns)?;
+            Ok(out.into_series())
+        },
+    )
 }
 
 #[polars_expr(output_type=String)]
-fn pl_iban_country_code(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut cc_builder = StringChunkedBuilder::new("country_code".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(iban) = Iban::from_str(s) {
-                cc_builder.append_value(iban.country_code());
+fn pl_iban_country_code(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_country_code", Failures::Null, &inputs[0], |ca| {
+        let mut cc_builder = StringChunkedBuilder::new("country_code".into(), ca.len());
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                if let Some(iban) = parse_iban(s) {
+                    cc_builder.append_value(iban.country_code());
+                } else {
+                    cc_builder.append_null();
+                }
             } else {
                 cc_builder.append_null();
             }
-        } else {
-            cc_builder.append_null();
-        }
-    });
-    let out = cc_builder.finish();
-    Ok(out.into_series())
+        });
+        let out = cc_builder.finish();
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=String)]
-fn pl_iban_check_digits(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut cc_builder = StringChunkedBuilder::new("check_digits".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(iban) = Iban::from_str(s) {
-                cc_builder.append_value(iban.check_digits_str());
+fn pl_iban_check_digits(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_check_digits", Failures::Null, &inputs[0], |ca| {
+        let mut cc_builder = StringChunkedBuilder::new("check_digits".into(), ca.len());
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                if let Some(iban) = parse_iban(s) {
+                    cc_builder.append_value(iban.check_digits_str());
+                } else {
+                    cc_builder.append_null();
+                }
             } else {
                 cc_builder.append_null();
             }
-        } else {
-            cc_builder.append_null();
-        }
-    });
-    let out = cc_builder.finish();
-    Ok(out.into_series())
+        });
+        let out = cc_builder.finish();
+        Ok(out.into_series())
+    })
+}
+
+// The *_enum kernels return the position of the value in the categories of the
+// corresponding Enum, which is cast on the Python side.
+#[polars_expr(output_type=UInt32)]
+fn pl_iban_country_code_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_iban_country_code_enum",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+            let out = UInt32Chunked::from_iter_options(
+                "country_code".into(),
+                ca.into_iter().map(|op_s| {
+                    op_s.and_then(|s| parse_iban(cleaner.clean(s)))
+                        .and_then(|iban| country_code_index(iban.country_code()))
+                }),
+            );
+            Ok(out.into_series())
+        },
+    )
+}
+
+fn country_counts_output(_: &[Field]) -> PolarsResult<Field> {
+    let cc = Field::new("country_code".into(), DataType::UInt32);
+    let count = Field::new("count".into(), DataType::UInt32);
+    Ok(Field::new("".into(), DataType::Struct(vec![cc, count])))
+}
+
+// Counts the valid IBANs of each country while parsing, in a table by the position of the
+// country code, which is cast to the Enum on the Python side. Countries without valid IBANs
+// are left out. The rows that are not counted are the failures in the stats.
+#[polars_expr(output_type_func=country_counts_output)]
+fn pl_iban_country_counts(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    let failed = AtomicU64::new(0);
+    stats::record(
+        "pl_iban_country_counts",
+        Failures::Counted(&failed),
+        &inputs[0],
+        || {
+            let (ca, weights) = dictionary_counts(&inputs[0])?;
+            let counts = par_fold(
+                &ca,
+                |ca, offset| {
+                    let mut counts = vec![0u64; 676];
+                    let mut failures = 0;
+                    let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+                    for (i, op_s) in ca.into_iter().enumerate() {
+                        let Some(s) = op_s else {
+                            continue;
+                        };
+                        let weight = weights.as_ref().map_or(1, |w| w[offset + i]);
+                        let cc = parse_iban(cleaner.clean(s))
+                            .and_then(|iban| country_code_index(iban.country_code()));
+                        match cc {
+                            Some(cc) => counts[cc as usize] += weight,
+                            None => failures += weight,
+                        }
+                    }
+                    failed.fetch_add(failures, Ordering::Relaxed);
+                    counts
+                },
+                |mut a, b| {
+                    a.iter_mut().zip(b).for_each(|(x, y)| *x += y);
+                    a
+                },
+            );
+
+            let (codes, counts): (Vec<u32>, Vec<u32>) = counts
+                .into_iter()
+                .enumerate()
+                .filter(|&(_, n)| n > 0)
+                .map(|(i, n)| (i as u32, n as u32))
+                .unzip();
+            let cc = UInt32Chunked::from_vec("country_code".into(), codes)
+                .into_series()
+                .into_column();
+            let count = UInt32Chunked::from_vec("count".into(), counts)
+                .into_series()
+                .into_column();
+
+            let out = StructChunked::from_columns(ca.name().clone(), cc.len(), &[cc, count])?;
+            Ok(out.into_series())
+        },
+    )
+}
+
+// Check digits range from "00" to "99", so their value is their position.
+#[polars_expr(output_type=UInt32)]
+fn pl_iban_check_digits_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_iban_check_digits_enum",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+            let out = UInt32Chunked::from_iter_options(
+                "check_digits".into(),
+                ca.into_iter().map(|op_s| {
+                    op_s.and_then(|s| parse_iban(cleaner.clean(s)))
+                        .map(|iban| iban.check_digits() as u32)
+                }),
+            );
+            Ok(out.into_series())
+        },
+    )
 }
 
 #[polars_expr(output_type=String)]
-fn pl_iban_bank_identifier(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut ba_builder = StringChunkedBuilder::new("bank_id".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(iban) = Iban::from_str(s) {
-                ba_builder.append_option(iban.bank_identifier());
-            } else {
-                ba_builder.append_null();
-            }
-        } else {
-            ba_builder.append_null();
-        }
-    });
-    let out = ba_builder.finish();
-    Ok(out.into_series())
+fn pl_iban_bank_identifier(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_iban_bank_identifier",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut ba_builder = StringChunkedBuilder::new("bank_id".into(), ca.len());
+            let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+
+            ca.into_iter().for_each(|op_s| {
+                if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                    if let Some(iban) = parse_iban(s) {
+                        ba_builder.append_option(iban.bank_identifier());
+                    } else {
+                        ba_builder.append_null();
+                    }
+                } else {
+                    ba_builder.append_null();
+                }
+            });
+            let out = ba_builder.finish();
+            Ok(out.into_series())
+        },
+    )
 }
 
 #[polars_expr(output_type=String)]
-fn pl_iban_branch_identifier(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut br_builder = StringChunkedBuilder::new("branch_id".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(iban) = Iban::from_str(s) {
-                br_builder.append_option(iban.branch_identifier());
-            } else {
-                br_builder.append_null();
-            }
-        } else {
-            br_builder.append_null();
-        }
-    });
-    let out = br_builder.finish();
-    Ok(out.into_series())
+fn pl_iban_branch_identifier(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_iban_branch_identifier",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut br_builder = StringChunkedBuilder::new("branch_id".into(), ca.len());
+            let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+
+            ca.into_iter().for_each(|op_s| {
+                if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                    if let Some(iban) = parse_iban(s) {
+                        br_builder.append_option(iban.branch_identifier());
+                    } else {
+                        br_builder.append_null();
+                    }
+                } else {
+                    br_builder.append_null();
+                }
+            });
+            let out = br_builder.finish();
+            Ok(out.into_series())
+        },
+    )
 }
 
-#[polars_expr(output_type=Boolean)]
-fn pl_iban_bban(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut cc_builder = StringChunkedBuilder::new("bban".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(iban) = Iban::from_str(s) {
-                cc_builder.append_value(iban.bban());
+#[polars_expr(output_type=String)]
+fn pl_iban_bban(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_bban", Failures::Null, &inputs[0], |ca| {
+        let mut cc_builder = StringChunkedBuilder::new("bban".into(), ca.len());
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s.map(|s| cleaner.clean(s)) {
+                if let Some(iban) = parse_iban(s) {
+                    cc_builder.append_value(iban.bban());
+                } else {
+                    cc_builder.append_null();
+                }
             } else {
                 cc_builder.append_null();
             }
-        } else {
-            cc_builder.append_null();
-        }
-    });
-    let out = cc_builder.finish();
-    Ok(out.into_series())
+        });
+        let out = cc_builder.finish();
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=Boolean)]
-fn pl_iban_is_valid(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let out: BooleanChunked = ca.apply_nonnull_values_generic(
-        DataType::Boolean, 
-        |s| s.parse::<Iban>().is_ok()
-    );
-    Ok(out.into_series())
+fn pl_iban_is_valid(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_is_valid", Failures::NotTrue, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+        let out = BooleanChunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter()
+                .map(|op_s| op_s.map(|s| parse_iban(cleaner.clean(s)).is_some())),
+        );
+        Ok(out.into_series())
+    })
+}
+
+// Reasons returned by iban_check. The codes are positions in this list, which is also the
+// order of the categories of the Enum on the Python side.
+static IBAN_CHECKS: [&str; 5] = [
+    "ok",
+    "Invalid format (len/char)",
+    "Invalid checksum",
+    "Invalid Bban",
+    "Invalid country code",
+];
+
+fn iban_error_code(e: &iban::ParseIbanError) -> u32 {
+    match e {
+        iban::ParseIbanError::InvalidBaseIban { source } => match source {
+            iban::ParseBaseIbanError::InvalidFormat => 1,
+            iban::ParseBaseIbanError::InvalidChecksum => 2,
+        },
+        iban::ParseIbanError::InvalidBban(_) => 3,
+        iban::ParseIbanError::UnknownCountry(_) => 4,
+    }
+}
+
+fn iban_check_code(s: &str) -> u32 {
+    Iban::from_str(s).map_or_else(|e| iban_error_code(&e), |_| 0)
 }
 
 #[polars_expr(output_type=String)]
-fn pl_iban_check(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let out = ca.apply_values(|s| {
-        match Iban::from_str(s) {
-            Ok(_) => "ok".into(),
-            Err(e) => match e {
-                iban::ParseIbanError::InvalidBaseIban { source } => match source {
-                    iban::ParseBaseIbanError::InvalidFormat => {
-                        "Invalid format (len/char)".into()
-                    }
-                    iban::ParseBaseIbanError::InvalidChecksum => "Invalid checksum".into(),
-                },
-                iban::ParseIbanError::InvalidBban(_) => "Invalid Bban".into(),
-                iban::ParseIbanError::UnknownCountry(_) => "Invalid country code".into(),
-            },
+fn pl_iban_check(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_check", Failures::NotOk, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+        let out = StringChunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter()
+                .map(|op_s| op_s.map(|s| IBAN_CHECKS[iban_check_code(cleaner.clean(s)) as usize])),
+        );
+        Ok(out.into_series())
+    })
+}
+
+#[polars_expr(output_type=UInt32)]
+fn pl_iban_check_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_check_enum", Failures::NotOk, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+        let out = UInt32Chunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter()
+                .map(|op_s| op_s.map(|s| iban_check_code(cleaner.clean(s)))),
+        );
+        Ok(out.into_series())
+    })
+}
+
+// An IBAN has at most 34 characters.
+#[polars_expr(output_type=String)]
+fn pl_iban_normalize(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_normalize", Failures::Null, &inputs[0], |ca| {
+        Ok(normalize::<34>(ca).into_series())
+    })
+}
+
+#[polars_expr(output_type=UInt8)]
+fn pl_iban_expected_length(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_iban_expected_length",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+            let out = UInt8Chunked::from_iter_options(
+                "expected_length".into(),
+                ca.into_iter()
+                    .map(|op_s| op_s.and_then(|s| registry::lookup(cleaner.clean(s))))
+                    .map(|op_c| op_c.map(|c| c.length)),
+            );
+            Ok(out.into_series())
+        },
+    )
+}
+
+#[polars_expr(output_type=String)]
+fn pl_iban_country_name(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_country_name", Failures::Null, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+        let out = StringChunked::from_iter_options(
+            "country_name".into(),
+            ca.into_iter()
+                .map(|op_s| op_s.and_then(|s| registry::lookup(cleaner.clean(s))))
+                .map(|op_c| op_c.map(|c| c.name)),
+        );
+        Ok(out.into_series())
+    })
+}
+
+#[polars_expr(output_type=Boolean)]
+fn pl_iban_is_sepa(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_is_sepa", Failures::Null, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 34);
+        let out = BooleanChunked::from_iter_options(
+            "is_sepa".into(),
+            ca.into_iter()
+                .map(|op_s| op_s.and_then(|s| registry::lookup(cleaner.clean(s))))
+                .map(|op_c| op_c.map(|c| c.sepa)),
+        );
+        Ok(out.into_series())
+    })
+}
+
+// End of the valid IBAN that starts at byte i of the text, in electronic or print format.
+// The length of the country's IBANs tells where an IBAN in print format ends, so a word
+// after it is not taken as its last group. IBANs of countries that are not in the registry
+// are only found in electronic format.
+fn iban_match_end(s: &str, i: usize) -> Option<usize> {
+    let b = s.as_bytes();
+    let Some(country) = registry::lookup(&s[i..]) else {
+        let end = i + b[i..]
+            .iter()
+            .take_while(|c| c.is_ascii_alphanumeric())
+            .count();
+        return Iban::from_str(&s[i..end]).is_ok().then_some(end);
+    };
+
+    let len = country.length as usize;
+    let (mut j, mut n) = (i, 0);
+    while n < len && j < b.len() {
+        if b[j].is_ascii_alphanumeric() {
+            n += 1;
+        } else if b[j] != b' ' || n % 4 != 0 {
+            // Print format only has spaces between groups of 4 characters.
+            break;
         }
+        j += 1;
+    }
+    if n < len || b.get(j).is_some_and(u8::is_ascii_alphanumeric) {
+        return None;
+    }
+    Iban::from_str(&s[i..j]).is_ok().then_some(j)
+}
 
-    });
-    Ok(out.into_series())
+// IBANs in free text start with a country code and check digits at the start of a word.
+#[polars_expr(output_type_func=find_all_output)]
+fn pl_iban_find_all(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_iban_find_all", Failures::Empty, &inputs[0], |ca| {
+        let out = find_all(ca, |s, matches| {
+            let b = s.as_bytes();
+            let mut i = 0;
+            while i + 4 <= b.len() {
+                let starts = (i == 0 || !b[i - 1].is_ascii_alphanumeric())
+                    && b[i].is_ascii_uppercase()
+                    && b[i + 1].is_ascii_uppercase()
+                    && b[i + 2].is_ascii_digit()
+                    && b[i + 3].is_ascii_digit();
+                if let Some(end) = starts.then(|| iban_match_end(s, i)).flatten() {
+                    matches.push((i, end));
+                    i = end;
+                } else {
+                    i += 1;
+                }
+            }
+        });
+        Ok(out.into_series())
+    })
 }
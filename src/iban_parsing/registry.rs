@@ -0,0 +1,141 @@
+use crate::utils::country_code_index;
+
+pub struct IbanCountry {
+    pub code: &'static str,
+    pub name: &'static str,
+    pub length: u8,
+    pub sepa: bool,
+}
+
+const fn country(code: &'static str, name: &'static str, length: u8, sepa: bool) -> IbanCountry {
+    IbanCountry {
+        code,
+        name,
+        length,
+        sepa,
+    }
+}
+
+// Countries of the SWIFT IBAN registry with the length of their IBANs, and whether they are
+// in the SEPA scheme. Countries that are not listed are left to the iban crate.
+const COUNTRIES: [IbanCountry; 85] = [
+    country("AD", "Andorra", 24, true),
+    country("AE", "United Arab Emirates", 23, false),
+    country("AL", "Albania", 28, true),
+    country("AT", "Austria", 20, true),
+    country("AZ", "Azerbaijan", 28, false),
+    country("BA", "Bosnia and Herzegovina", 20, false),
+    country("BE", "Belgium", 16, true),
+    country("BG", "Bulgaria", 22, true),
+    country("BH", "Bahrain", 22, false),
+    country("BR", "Brazil", 29, false),
+    country("BY", "Belarus", 28, false),
+    country("CH", "Switzerland", 21, true),
+    country("CR", "Costa Rica", 22, false),
+    country("CY", "Cyprus", 28, true),
+    country("CZ", "Czechia", 24, true),
+    country("DE", "Germany", 22, true),
+    country("DJ", "Djibouti", 27, false),
+    country("DK", "Denmark", 18, true),
+    country("DO", "Dominican Republic", 28, false),
+    country("EE", "Estonia", 20, true),
+    country("EG", "Egypt", 29, false),
+    country("ES", "Spain", 24, true),
+    country("FI", "Finland", 18, true),
+    country("FK", "Falkland Islands", 18, false),
+    country("FO", "Faroe Islands", 18, false),
+    country("FR", "France", 27, true),
+    country("GB", "United Kingdom", 22, true),
+    country("GE", "Georgia", 22, false),
+    country("GI", "Gibraltar", 23, true),
+    country("GL", "Greenland", 18, false),
+    country("GR", "Greece", 27, true),
+    country("GT", "Guatemala", 28, false),
+    country("HR", "Croatia", 21, true),
+    country("HU", "Hungary", 28, true),
+    country("IE", "Ireland", 22, true),
+    country("IL", "Israel", 23, false),
+    country("IQ", "Iraq", 23, false),
+    country("IS", "Iceland", 26, true),
+    country("IT", "Italy", 27, true),
+    country("JO", "Jordan", 30, false),
+    country("KW", "Kuwait", 30, false),
+    country("KZ", "Kazakhstan", 20, false),
+    country("LB", "Lebanon", 28, false),
+    country("LC", "Saint Lucia", 32, false),
+    country("LI", "Liechtenstein", 21, true),
+    country("LT", "Lithuania", 20, true),
+    country("LU", "Luxembourg", 20, true),
+    country("LV", "Latvia", 21, true),
+    country("LY", "Libya", 25, false),
+    country("MC", "Monaco", 27, true),
+    country("MD", "Moldova", 24, true),
+    country("ME", "Montenegro", 22, true),
+    country("MK", "North Macedonia", 19, true),
+    country("MN", "Mongolia", 20, false),
+    country("MR", "Mauritania", 27, false),
+    country("MT", "Malta", 31, true),
+    country("MU", "Mauritius", 30, false),
+    country("NI", "Nicaragua", 28, false),
+    country("NL", "Netherlands", 18, true),
+    country("NO", "Norway", 15, true),
+    country("OM", "Oman", 23, false),
+    country("PK", "Pakistan", 24, false),
+    country("PL", "Poland", 28, true),
+    country("PS", "Palestine", 29, false),
+    country("PT", "Portugal", 25, true),
+    country("QA", "Qatar", 29, false),
+    country("RO", "Romania", 24, true),
+    country("RS", "Serbia", 22, false),
+    country("RU", "Russia", 33, false),
+    country("SA", "Saudi Arabia", 24, false),
+    country("SC", "Seychelles", 31, false),
+    country("SD", "Sudan", 18, false),
+    country("SE", "Sweden", 24, true),
+    country("SI", "Slovenia", 19, true),
+    country("SK", "Slovakia", 24, true),
+    country("SM", "San Marino", 27, true),
+    country("SO", "Somalia", 23, false),
+    country("ST", "Sao Tome and Principe", 25, false),
+    country("SV", "El Salvador", 28, false),
+    country("TL", "Timor-Leste", 23, false),
+    country("TN", "Tunisia", 24, false),
+    country("TR", "Turkey", 26, false),
+    country("UA", "Ukraine", 29, false),
+    country("VA", "Vatican City", 22, true),
+    country("XK", "Kosovo", 20, false),
+];
+
+// Position + 1 of each country in COUNTRIES by the index of its code, or 0 if not listed.
+const fn registry_index() -> [u8; 676] {
+    let mut table = [0u8; 676];
+    let mut i = 0;
+    while i < COUNTRIES.len() {
+        let cc = COUNTRIES[i].code.as_bytes();
+        table[(cc[0] - b'A') as usize * 26 + (cc[1] - b'A') as usize] = i as u8 + 1;
+        i += 1;
+    }
+    table
+}
+
+static REGISTRY: [IbanCountry; 85] = COUNTRIES;
+static INDEX: [u8; 676] = registry_index();
+
+/// The registry entry of the country code at the start of `s`, which can be an IBAN or a
+/// country code.
+pub fn lookup(s: &str) -> Option<&'static IbanCountry> {
+    let i = country_code_index(s.get(0..2)?)? as usize;
+    match INDEX[i] {
+        0 => None,
+        k => Some(&REGISTRY[k as usize - 1]),
+    }
+}
+
+/// False if the IBAN, in electronic or print format, cannot have the right length for its
+/// country. This is much cheaper than the mod 97 check.
+pub fn has_expected_length(s: &str) -> bool {
+    match lookup(s) {
+        Some(c) => s.bytes().filter(|&b| b != b' ').count() == c.length as usize,
+        None => true,
+    }
+}
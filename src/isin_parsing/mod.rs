@@ -1,131 +1,412 @@
+use crate::cusip_parsing::cusip_is_valid_bytes;
+use crate::utils::stats::Failures;
+use crate::utils::{
+    check_columns, check_fields, country_code_index, dictionary_apply, digit_index, find_all,
+    find_all_output, normalize, stats, substring_views, token_ranges, validate_inline, Cleaner,
+    NormalizeKwargs,
+};
 use polars::prelude::*;
 use pyo3_polars::derive::polars_expr;
+use serde::Deserialize;
 
-fn isin_full_output(_: &[Field]) -> PolarsResult<Field> {
+#[derive(Deserialize)]
+struct ExtractKwargs {
+    with_check: bool,
+    normalize: bool,
+}
+
+fn isin_full_output(_: &[Field], kwargs: ExtractKwargs) -> PolarsResult<Field> {
     let cc = Field::new("country_code".into(), DataType::String);
     let id = Field::new("security_id".into(), DataType::String);
     let cd = Field::new("check_digit".into(), DataType::String);
 
-    let v: Vec<Field> = vec![cc, id, cd];
+    let mut v: Vec<Field> = vec![cc, id, cd];
+    if kwargs.with_check {
+        v.extend(check_fields());
+    }
     Ok(Field::new("".into(), DataType::Struct(v)))
 }
 
-#[polars_expr(output_type_func=isin_full_output)]
-fn pl_isin_full(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut cc_builder = StringChunkedBuilder::new("country_code".into(), ca.len());
-    let mut id_builder = StringChunkedBuilder::new("security_id".into(), ca.len());
-    let mut cd_builder = StringChunkedBuilder::new("check_digit".into(), ca.len());
+const fn luhn_double(d: u8) -> u8 {
+    if d < 5 {
+        2 * d
+    } else {
+        2 * d - 9
+    }
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(isin) = isin::parse(s) {
-                cc_builder.append_value(isin.prefix());
-                id_builder.append_value(isin.basic_code());
-                cd_builder.append_value(isin.check_digit().to_string());
+// Luhn contribution of each ISIN payload character, read right to left, depending on
+// whether its last digit is doubled. Letters expand to two digits (A = 10, ..., Z = 35).
+// 0xFF marks characters that are not allowed.
+const fn luhn_table(doubled: bool) -> [u8; 256] {
+    let mut table = [0xFF; 256];
+    let mut c: usize = 0;
+    while c < 256 {
+        let v = match c as u8 {
+            b'0'..=b'9' => c as u8 - b'0',
+            b'A'..=b'Z' => c as u8 - b'A' + 10,
+            _ => 0xFF,
+        };
+        if v < 10 {
+            table[c] = if doubled { luhn_double(v) } else { v };
+        } else if v != 0xFF {
+            let (hi, lo) = (v / 10, v % 10);
+            table[c] = if doubled {
+                luhn_double(lo) + hi
             } else {
-                cc_builder.append_null();
-                id_builder.append_null();
-                cd_builder.append_null();
-            }
-        } else {
-            cc_builder.append_null();
-            id_builder.append_null();
-            cd_builder.append_null();
+                lo + luhn_double(hi)
+            };
         }
-    });
+        c += 1;
+    }
+    table
+}
+
+static LUHN: [[u8; 256]; 2] = [luhn_table(false), luhn_table(true)];
 
-    let cc = cc_builder.finish().into_series().into_column();
-    let id = id_builder.finish().into_series().into_column();
-    let cd = cd_builder.finish().into_series().into_column();
+// Luhn check digit of an ISIN payload (country code and security id), or None if it has
+// characters that are not allowed.
+pub(crate) fn isin_check_digit_of(payload: &[u8]) -> Option<u8> {
+    // The rightmost payload digit is doubled. Letters are two digits, so they keep the
+    // parity for the next character.
+    let mut doubled = true;
+    let mut sum = 0u32;
+    for &c in payload.iter().rev() {
+        let v = LUHN[doubled as usize][c as usize];
+        if v == 0xFF {
+            return None;
+        }
+        sum += v as u32;
+        doubled ^= c.is_ascii_digit();
+    }
+    Some(((10 - sum % 10) % 10) as u8)
+}
 
-    let out = StructChunked::from_columns("isin".into(), cc.len(), &[cc, id, cd])?;
-    Ok(out.into_series())
+// Validates the format and the check digit of an ISIN with lookup tables, without
+// constructing an ISIN.
+fn isin_is_valid_bytes(b: &[u8; 12]) -> bool {
+    b[0].is_ascii_uppercase()
+        && b[1].is_ascii_uppercase()
+        && isin_check_digit_of(&b[..11]) == Some(b[11].wrapping_sub(b'0'))
 }
 
-#[polars_expr(output_type=String)]
-fn pl_isin_country_code(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+// A valid ISIN is exactly 12 ASCII characters, so its parts always sit at the same
+// offsets: country code, security id, check digit.
+const ISIN_RANGES: [Option<(usize, usize)>; 3] = [Some((0, 2)), Some((2, 11)), Some((11, 12))];
+
+fn isin_parts(s: &str) -> [Option<(usize, usize)>; 3] {
+    if s.len() == 12 && isin_is_valid_bytes(s.as_bytes().try_into().unwrap()) {
+        ISIN_RANGES
+    } else {
+        [None; 3]
+    }
+}
 
-    let mut builder = StringChunkedBuilder::new("country_code".into(), ca.len());
+#[polars_expr(output_type_func_with_kwargs=isin_full_output)]
+fn pl_isin_full(inputs: &[Series], kwargs: ExtractKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_isin_full",
+        Failures::Field("country_code"),
+        &inputs[0],
+        |ca| {
+            // Check codes of the non-null rows, in order, when the parts are split by the check.
+            let mut codes: Vec<u32> = Vec::new();
+            let cleaner = Cleaner::new(kwargs.normalize, 12);
+            let [cc, id, cd] = substring_views(
+                ca,
+                cleaner,
+                ["country_code", "security_id", "check_digit"],
+                |s| {
+                    if kwargs.with_check {
+                        let code = isin_check_code(s);
+                        codes.push(code);
+                        if code == 0 {
+                            ISIN_RANGES
+                        } else {
+                            [None; 3]
+                        }
+                    } else {
+                        isin_parts(s)
+                    }
+                },
+            );
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(isin) = isin::parse(s) {
-                builder.append_value(isin.prefix());
-            } else {
-                builder.append_null();
+            let mut columns = vec![
+                cc.into_series().into_column(),
+                id.into_series().into_column(),
+                cd.into_series().into_column(),
+            ];
+            if kwargs.with_check {
+                columns.extend(check_columns(ca, codes));
             }
-        } else {
-            builder.append_null();
-        }
-    });
 
-    let out = builder.finish();
-    Ok(out.into_series())
+            let out = StructChunked::from_columns("isin".into(), ca.len(), &columns)?;
+            Ok(out.into_series())
+        },
+    )
 }
 
 #[polars_expr(output_type=String)]
-fn pl_isin_security_id(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+fn pl_isin_country_code(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_country_code", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 12);
+        let [out] = substring_views(ca, cleaner, ["country_code"], |s| [isin_parts(s)[0]]);
+        Ok(out.into_series())
+    })
+}
 
-    let mut builder = StringChunkedBuilder::new("security_id".into(), ca.len());
+#[polars_expr(output_type=String)]
+fn pl_isin_security_id(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_security_id", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 12);
+        let [out] = substring_views(ca, cleaner, ["security_id"], |s| [isin_parts(s)[1]]);
+        Ok(out.into_series())
+    })
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(isin) = isin::parse(s) {
-                builder.append_value(isin.basic_code());
-            } else {
-                builder.append_null();
-            }
-        } else {
-            builder.append_null();
-        }
-    });
+#[polars_expr(output_type=String)]
+fn pl_isin_check_digit(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_check_digit", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 12);
+        let [out] = substring_views(ca, cleaner, ["check_digit"], |s| [isin_parts(s)[2]]);
+        Ok(out.into_series())
+    })
+}
 
-    let out = builder.finish();
-    Ok(out.into_series())
+// The *_enum kernels return the position of the value in the categories of the
+// corresponding Enum, which is cast on the Python side.
+#[polars_expr(output_type=UInt32)]
+fn pl_isin_country_code_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_isin_country_code_enum",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut cleaner = Cleaner::new(kwargs.normalize, 12);
+            let out = UInt32Chunked::from_iter_options(
+                "country_code".into(),
+                ca.into_iter().map(|op_s| {
+                    op_s.map(|s| cleaner.clean(s))
+                        .filter(|s| isin_parts(s)[0].is_some())
+                        .and_then(|s| country_code_index(&s[0..2]))
+                }),
+            );
+            Ok(out.into_series())
+        },
+    )
 }
 
-#[polars_expr(output_type=String)]
-fn pl_isin_check_digit(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+#[polars_expr(output_type=UInt32)]
+fn pl_isin_check_digit_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_isin_check_digit_enum",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let mut cleaner = Cleaner::new(kwargs.normalize, 12);
+            let out = UInt32Chunked::from_iter_options(
+                "check_digit".into(),
+                ca.into_iter().map(|op_s| {
+                    op_s.map(|s| cleaner.clean(s))
+                        .filter(|s| isin_parts(s)[0].is_some())
+                        .and_then(|s| digit_index(s.as_bytes()[11]))
+                }),
+            );
+            Ok(out.into_series())
+        },
+    )
+}
 
-    let mut builder = StringChunkedBuilder::new("check_digit".into(), ca.len());
+#[polars_expr(output_type=Boolean)]
+fn pl_isin_is_valid(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_is_valid", Failures::NotTrue, &inputs[0], |ca| {
+        Ok(validate_inline(ca, kwargs.normalize, isin_is_valid_bytes).into_series())
+    })
+}
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(isin) = isin::parse(s) {
-                builder.append_value(isin.check_digit().to_string());
-            } else {
-                builder.append_null();
-            }
+const ALNUM: &[u8; 36] = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ";
+// Number of distinct security ids.
+const SECURITY_ID_RADIX: u64 = 36u64.pow(9);
+
+// Packs a valid ISIN into an integer: the index of the country code times 36^9 plus the
+// security id in base 36. The check digit follows from the rest, so it is not stored.
+fn isin_encode(s: &str) -> Option<u64> {
+    let b: &[u8; 12] = s.as_bytes().try_into().ok()?;
+    if !isin_is_valid_bytes(b) {
+        return None;
+    }
+    let cc = country_code_index(&s[0..2])? as u64;
+    let id = b[2..11].iter().fold(0u64, |acc, &c| {
+        let v = if c.is_ascii_digit() {
+            c - b'0'
         } else {
-            builder.append_null();
-        }
+            c - b'A' + 10
+        };
+        acc * 36 + v as u64
     });
+    Some(cc * SECURITY_ID_RADIX + id)
+}
 
-    let out = builder.finish();
-    Ok(out.into_series())
+fn isin_decode(v: u64) -> Option<[u8; 12]> {
+    if v >= 676 * SECURITY_ID_RADIX {
+        return None;
+    }
+    let (cc, mut id) = (v / SECURITY_ID_RADIX, v % SECURITY_ID_RADIX);
+    let mut b = [0u8; 12];
+    b[0] = b'A' + (cc / 26) as u8;
+    b[1] = b'A' + (cc % 26) as u8;
+    for c in b[2..11].iter_mut().rev() {
+        *c = ALNUM[(id % 36) as usize];
+        id /= 36;
+    }
+    b[11] = b'0' + isin_check_digit_of(&b[..11])?;
+    Some(b)
 }
 
-#[polars_expr(output_type=Boolean)]
-fn pl_isin_is_valid(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
+#[polars_expr(output_type=UInt64)]
+fn pl_isin_to_u64(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_to_u64", Failures::Null, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 12);
+        let out = UInt64Chunked::from_iter_options(
+            "isin".into(),
+            ca.into_iter()
+                .map(|op_s| op_s.and_then(|s| isin_encode(cleaner.clean(s)))),
+        );
+        Ok(out.into_series())
+    })
+}
 
-    let mut builder = BooleanChunkedBuilder::new("isin_valid".into(), ca.len());
+#[polars_expr(output_type=String)]
+fn pl_isin_from_u64(inputs: &[Series]) -> PolarsResult<Series> {
+    stats::record("pl_isin_from_u64", Failures::Null, &inputs[0], || {
+        let s = inputs[0].cast(&DataType::UInt64)?;
+        let ca = s.u64()?;
+        let mut builder = StringChunkedBuilder::new("isin".into(), ca.len());
 
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            builder.append_value(match isin::validate(s) {
-                Ok(_) => true,
-                Err(_) => false,
+        ca.into_iter()
+            .for_each(|op_v| match op_v.and_then(isin_decode) {
+                // Decoded ISINs are ASCII.
+                Some(b) => builder.append_value(std::str::from_utf8(&b).unwrap()),
+                None => builder.append_null(),
             });
-        } else {
-            builder.append_value(false);
-        }
-    });
+        Ok(builder.finish().into_series())
+    })
+}
+
+// An ISIN has 12 characters.
+#[polars_expr(output_type=String)]
+fn pl_isin_normalize(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_normalize", Failures::Null, &inputs[0], |ca| {
+        Ok(normalize::<12>(ca).into_series())
+    })
+}
+
+// For countries that number securities with CUSIPs (e.g. US, CA), the security id of the
+// ISIN is the CUSIP.
+#[polars_expr(output_type=String)]
+fn pl_isin_to_cusip(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_to_cusip", Failures::Null, &inputs[0], |ca| {
+        let cleaner = Cleaner::new(kwargs.normalize, 12);
+        let [out] = substring_views(ca, cleaner, ["cusip"], |s| {
+            [isin_parts(s)[1].filter(|&(start, end)| {
+                // Cannot fail since a security id has 9 characters.
+                cusip_is_valid_bytes(s.as_bytes()[start..end].try_into().unwrap())
+            })]
+        });
+        Ok(out.into_series())
+    })
+}
+
+static DIGITS: [&str; 10] = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"];
+
+// The payload is the country code and the security id, i.e. an ISIN without its check
+// digit.
+#[polars_expr(output_type=String)]
+fn pl_isin_compute_check_digit(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply(
+        "pl_isin_compute_check_digit",
+        Failures::Null,
+        &inputs[0],
+        |ca| {
+            let out = StringChunked::from_iter_options(
+                "check_digit".into(),
+                ca.into_iter().map(|op_s| {
+                    op_s.map(str::as_bytes)
+                        .filter(|b| {
+                            b.len() == 11 && b[0].is_ascii_uppercase() && b[1].is_ascii_uppercase()
+                        })
+                        .and_then(isin_check_digit_of)
+                        .map(|d| DIGITS[d as usize])
+                }),
+            );
+            Ok(out.into_series())
+        },
+    )
+}
+
+// Reasons returned by isin_check. The codes are positions in this list, which is also the
+// order of the categories of the Enum on the Python side.
+static ISIN_CHECKS: [&str; 5] = [
+    "ok",
+    "Invalid length",
+    "Invalid country code",
+    "Invalid character",
+    "Invalid checksum",
+];
+
+fn isin_check_code(s: &str) -> u32 {
+    let Ok(b) = <&[u8; 12]>::try_from(s.as_bytes()) else {
+        return 1;
+    };
+    if !(b[0].is_ascii_uppercase() && b[1].is_ascii_uppercase()) {
+        return 2;
+    }
+    match isin_check_digit_of(&b[..11]) {
+        None => 3,
+        Some(_) if !b[11].is_ascii_digit() => 3,
+        Some(d) if d == b[11] - b'0' => 0,
+        Some(_) => 4,
+    }
+}
+
+#[polars_expr(output_type=String)]
+fn pl_isin_check(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_check", Failures::NotOk, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 12);
+        let out = StringChunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter()
+                .map(|op_s| op_s.map(|s| ISIN_CHECKS[isin_check_code(cleaner.clean(s)) as usize])),
+        );
+        Ok(out.into_series())
+    })
+}
+
+#[polars_expr(output_type=UInt32)]
+fn pl_isin_check_enum(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_check_enum", Failures::NotOk, &inputs[0], |ca| {
+        let mut cleaner = Cleaner::new(kwargs.normalize, 12);
+        let out = UInt32Chunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter()
+                .map(|op_s| op_s.map(|s| isin_check_code(cleaner.clean(s)))),
+        );
+        Ok(out.into_series())
+    })
+}
 
-    let out = builder.finish();
-    Ok(out.into_series())
+// ISINs in free text are whole alphanumeric tokens of 12 characters with a valid check digit.
+#[polars_expr(output_type_func=find_all_output)]
+fn pl_isin_find_all(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_isin_find_all", Failures::Empty, &inputs[0], |ca| {
+        let out = find_all(ca, |s, matches| {
+            matches.extend(token_ranges(s, |c| c.is_ascii_alphanumeric()).filter(
+                |&(start, end)| {
+                    end - start == 12
+                        && isin_is_valid_bytes(s.as_bytes()[start..end].try_into().unwrap())
+                },
+            ))
+        });
+        Ok(out.into_series())
+    })
 }
@@ -3,7 +3,7 @@ mod iban_parsing;
 mod isin_parsing;
 mod url_parsing;
 mod utils;
-use pyo3::{pymodule, types::{PyModule, PyModuleMethods}, Bound, PyResult, Python};
+use pyo3::{pymodule, types::{PyModule, PyModuleMethods}, wrap_pyfunction, Bound, PyResult, Python};
 
 use pyo3_polars::PolarsAllocator;
 #[global_allocator]
@@ -11,6 +11,12 @@ static ALLOC: PolarsAllocator = PolarsAllocator::new();
 
 #[pymodule]
 #[pyo3(name = "_polars_istr")]
-fn _polars_istr(_py: Python<'_>, _m: &Bound<'_, PyModule>) -> PyResult<()> {
+fn _polars_istr(_py: Python<'_>, m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_function(wrap_pyfunction!(url_parsing::cache::cache_enable, m)?)?;
+    m.add_function(wrap_pyfunction!(url_parsing::cache::cache_clear, m)?)?;
+    m.add_function(wrap_pyfunction!(url_parsing::cache::cache_info, m)?)?;
+    m.add_function(wrap_pyfunction!(utils::stats::stats_enable, m)?)?;
+    m.add_function(wrap_pyfunction!(utils::stats::stats, m)?)?;
+    m.add_function(wrap_pyfunction!(utils::stats::stats_reset, m)?)?;
     Ok(())
 }
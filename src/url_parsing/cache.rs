@@ -0,0 +1,161 @@
+// An opt-in, process-wide cache of parsed URLs for repeated queries over mostly the same
+// values. It is an LRU keyed by the input string (the map hashes it, and the stored key rules
+// out collisions) and bounded by an estimate of its size in bytes. Failed parses are cached
+// too. It is off by default, and then parse only costs an atomic load. The cache is split into
+// shards by the hash of the key, each with its own lock and an equal part of the size, so
+// threads that look up different values rarely wait for each other.
+
+use lru::LruCache;
+use pyo3::pyfunction;
+use std::hash::{DefaultHasher, Hash, Hasher};
+use std::ops::Deref;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Arc, LazyLock, Mutex, MutexGuard};
+use url::Url;
+
+// Estimate of the size of an entry besides the input and the serialization of the URL: the
+// Url struct, the Arc and the LRU node.
+const ENTRY_OVERHEAD: usize = 128;
+
+struct Cache {
+    entries: LruCache<Box<str>, Option<Arc<Url>>>,
+    bytes: usize,
+    hits: u64,
+    misses: u64,
+}
+
+impl Cache {
+    fn new() -> Self {
+        Self {
+            entries: LruCache::unbounded(),
+            bytes: 0,
+            hits: 0,
+            misses: 0,
+        }
+    }
+
+    fn evict_to(&mut self, max_bytes: usize) {
+        while self.bytes > max_bytes {
+            match self.entries.pop_lru() {
+                Some((k, v)) => self.bytes -= entry_bytes(&k, &v),
+                None => break,
+            }
+        }
+    }
+}
+
+fn entry_bytes(s: &str, u: &Option<Arc<Url>>) -> usize {
+    s.len() + u.as_ref().map_or(0, |u| u.as_str().len()) + ENTRY_OVERHEAD
+}
+
+// 0 if the cache is off.
+static MAX_BYTES: AtomicUsize = AtomicUsize::new(0);
+
+const SHARDS: usize = 16;
+
+static CACHE: LazyLock<[Mutex<Cache>; SHARDS]> =
+    LazyLock::new(|| std::array::from_fn(|_| Mutex::new(Cache::new())));
+
+fn lock(shard: &'static Mutex<Cache>) -> MutexGuard<'static, Cache> {
+    // The cache is consistent after every statement, so a panic in another thread does not
+    // leave it broken.
+    shard.lock().unwrap_or_else(|e| e.into_inner())
+}
+
+fn shard_of(s: &str) -> &'static Mutex<Cache> {
+    let mut hasher = DefaultHasher::new();
+    s.hash(&mut hasher);
+    &CACHE[hasher.finish() as usize % SHARDS]
+}
+
+/// A parsed URL, which is shared with the cache if it came from there.
+pub enum CachedUrl {
+    Owned(Url),
+    Shared(Arc<Url>),
+}
+
+impl Deref for CachedUrl {
+    type Target = Url;
+
+    fn deref(&self) -> &Url {
+        match self {
+            Self::Owned(u) => u,
+            Self::Shared(u) => u,
+        }
+    }
+}
+
+/// Url::parse, through the cache if it is on.
+pub fn parse(s: &str) -> Option<CachedUrl> {
+    let max_bytes = MAX_BYTES.load(Ordering::Relaxed);
+    if max_bytes == 0 {
+        return Url::parse(s).ok().map(CachedUrl::Owned);
+    }
+    let max_bytes = max_bytes / SHARDS;
+    let shard = shard_of(s);
+
+    {
+        let mut cache = lock(shard);
+        if let Some(u) = cache.entries.get(s).cloned() {
+            cache.hits += 1;
+            return u.map(CachedUrl::Shared);
+        }
+        cache.misses += 1;
+    }
+
+    // Parse without holding the lock, so other threads can use the cache meanwhile.
+    let u = Url::parse(s).ok().map(Arc::new);
+    let bytes = entry_bytes(s, &u);
+    if bytes <= max_bytes {
+        let mut cache = lock(shard);
+        // Another thread may have inserted the same value meanwhile.
+        if let Some(old) = cache.entries.put(s.into(), u.clone()) {
+            cache.bytes -= entry_bytes(s, &old);
+        }
+        cache.bytes += bytes;
+        cache.evict_to(max_bytes);
+    }
+    u.map(CachedUrl::Shared)
+}
+
+/// Turns the cache on with the given size in bytes, or off if it is 0, which also clears it.
+/// Shrinking it evicts the least recently used entries.
+#[pyfunction]
+pub fn cache_enable(max_bytes: usize) {
+    MAX_BYTES.store(max_bytes, Ordering::Relaxed);
+    for shard in CACHE.iter() {
+        lock(shard).evict_to(max_bytes / SHARDS);
+    }
+}
+
+/// Removes all entries and resets the hit and miss counts.
+#[pyfunction]
+pub fn cache_clear() {
+    for shard in CACHE.iter() {
+        let mut cache = lock(shard);
+        cache.entries.clear();
+        cache.bytes = 0;
+        cache.hits = 0;
+        cache.misses = 0;
+    }
+}
+
+/// (hits, misses, max_bytes, bytes, entries) of the cache, summed over the shards.
+#[pyfunction]
+pub fn cache_info() -> (u64, u64, usize, usize, usize) {
+    let (mut hits, mut misses, mut bytes, mut entries) = (0, 0, 0, 0);
+    for shard in CACHE.iter() {
+        let cache = lock(shard);
+        hits += cache.hits;
+        misses += cache.misses;
+        bytes += cache.bytes;
+        entries += cache.entries.len();
+    }
+    (
+        hits,
+        misses,
+        MAX_BYTES.load(Ordering::Relaxed),
+        bytes,
+        entries,
+    )
+}
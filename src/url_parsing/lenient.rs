@@ -0,0 +1,124 @@
+// A splitter for the plain ASCII http(s) URLs that make up most of the URLs in logs. It only
+// accepts URLs that url::Url::parse would leave as they are, so both give the same parts, and
+// returns None for anything else (non-ASCII, userinfo, IP hosts, percent-encoded or dot
+// segments, uppercase, ...), which is then left to the full parser.
+
+pub struct UrlParts<'a> {
+    pub scheme: &'a str,
+    pub host: &'a str,
+    pub port: Option<u16>,
+    pub path: &'a str,
+    pub query: Option<&'a str>,
+    pub fragment: Option<&'a str>,
+}
+
+// Bytes that are never percent-encoded or normalized in the path, query or fragment of a
+// http(s) URL.
+const fn allowed_table() -> [bool; 256] {
+    let mut table = [false; 256];
+    let mut c = 0;
+    while c < 256 {
+        let b = c as u8;
+        table[c] = b.is_ascii_alphanumeric()
+            || matches!(
+                b,
+                b'-' | b'.'
+                    | b'_'
+                    | b'~'
+                    | b'!'
+                    | b'$'
+                    | b'&'
+                    | b'('
+                    | b')'
+                    | b'*'
+                    | b'+'
+                    | b','
+                    | b';'
+                    | b'='
+                    | b':'
+                    | b'@'
+                    | b'/'
+                    | b'%'
+                    | b'?'
+                    | b'#'
+            );
+        c += 1;
+    }
+    table
+}
+
+static ALLOWED: [bool; 256] = allowed_table();
+
+const DOT_SEGMENTS: [&str; 6] = [".", "..", "%2e", ".%2e", "%2e.", "%2e%2e"];
+
+// Lowercase domains with non-empty labels, which are not punycode and do not end in a label
+// starting with a digit (which would make them an IPv4 address).
+fn is_plain_host(host: &str) -> bool {
+    host.split('.').all(|label| {
+        !label.is_empty()
+            && !label.starts_with("xn--")
+            && label
+                .bytes()
+                .all(|c| c.is_ascii_lowercase() || c.is_ascii_digit() || c == b'-')
+    }) && host
+        .rsplit('.')
+        .next()
+        .is_some_and(|label| label.as_bytes()[0].is_ascii_lowercase())
+}
+
+pub fn split(s: &str) -> Option<UrlParts<'_>> {
+    let (scheme, rest) = if let Some(rest) = s.strip_prefix("https://") {
+        ("https", rest)
+    } else {
+        ("http", s.strip_prefix("http://")?)
+    };
+    if !rest.bytes().all(|c| ALLOWED[c as usize]) {
+        return None;
+    }
+
+    let (rest, fragment) = match rest.split_once('#') {
+        Some((r, f)) => (r, Some(f)),
+        None => (rest, None),
+    };
+    let (rest, query) = match rest.split_once('?') {
+        Some((r, q)) => (r, Some(q)),
+        None => (rest, None),
+    };
+    let (authority, path) = match rest.find('/') {
+        Some(i) => rest.split_at(i),
+        None => (rest, "/"),
+    };
+
+    if authority.contains('@') {
+        return None;
+    }
+    let (host, port) = match authority.split_once(':') {
+        Some((h, p)) => {
+            if p.is_empty() || !p.bytes().all(|c| c.is_ascii_digit()) {
+                return None;
+            }
+            let port: u16 = p.parse().ok()?;
+            let default = if scheme == "https" { 443 } else { 80 };
+            (h, (port != default).then_some(port))
+        }
+        None => (authority, None),
+    };
+    if !is_plain_host(host) {
+        return None;
+    }
+    if path
+        .split('/')
+        .any(|seg| DOT_SEGMENTS.iter().any(|d| seg.eq_ignore_ascii_case(d)))
+    {
+        return None;
+    }
+
+    Some(UrlParts {
+        scheme,
+        host,
+        port,
+        path,
+        query,
+        fragment,
+    })
+}
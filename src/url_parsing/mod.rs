@@ -1,155 +1,849 @@
+use crate::utils::stats::Failures;
+use crate::utils::{
+    dictionary_apply, dictionary_counts, dictionary_eval, dictionary_eval_serial, find_all,
+    find_all_output, fnv1a, par_fold, stats, HyperLogLog, StringOutputBuilder,
+};
 use polars::prelude::*;
+use polars_arrow::array::LargeListArray;
+use polars_arrow::bitmap::MutableBitmap;
+use polars_arrow::offset::Offsets;
 use pyo3_polars::derive::polars_expr;
-use url::Url;
+use serde::Deserialize;
+use std::sync::atomic::{AtomicU64, Ordering};
+use url::{form_urlencoded, Position, Url};
 
-#[polars_expr(output_type=String)]
-fn pl_url_host(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut builder = StringChunkedBuilder::new("host".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(u) = Url::parse(s) {
-                builder.append_option(u.host_str())
-            } else {
-                builder.append_null();
+pub(crate) mod cache;
+mod lenient;
+
+// A URL that was either split by the lenient splitter or fully parsed.
+enum ParsedUrl<'a> {
+    Split(lenient::UrlParts<'a>),
+    Full(cache::CachedUrl),
+}
+
+impl ParsedUrl<'_> {
+    fn scheme(&self) -> &str {
+        match self {
+            Self::Split(p) => p.scheme,
+            Self::Full(u) => u.scheme(),
+        }
+    }
+
+    fn username(&self) -> &str {
+        match self {
+            Self::Split(_) => "",
+            Self::Full(u) => u.username(),
+        }
+    }
+
+    fn password(&self) -> Option<&str> {
+        match self {
+            Self::Split(_) => None,
+            Self::Full(u) => u.password(),
+        }
+    }
+
+    fn host_str(&self) -> Option<&str> {
+        match self {
+            Self::Split(p) => Some(p.host),
+            Self::Full(u) => u.host_str(),
+        }
+    }
+
+    fn domain(&self) -> Option<&str> {
+        match self {
+            Self::Split(p) => Some(p.host),
+            Self::Full(u) => u.domain(),
+        }
+    }
+
+    fn port(&self) -> Option<u16> {
+        match self {
+            Self::Split(p) => p.port,
+            Self::Full(u) => u.port(),
+        }
+    }
+
+    fn path(&self) -> &str {
+        match self {
+            Self::Split(p) => p.path,
+            Self::Full(u) => u.path(),
+        }
+    }
+
+    fn query(&self) -> Option<&str> {
+        match self {
+            Self::Split(p) => p.query,
+            Self::Full(u) => u.query(),
+        }
+    }
+
+    fn fragment(&self) -> Option<&str> {
+        match self {
+            Self::Split(p) => p.fragment,
+            Self::Full(u) => u.fragment(),
+        }
+    }
+
+    fn is_special(&self) -> bool {
+        match self {
+            Self::Split(_) => true,
+            Self::Full(u) => u.is_special(),
+        }
+    }
+
+    // Same as Url::query_pairs.
+    fn query_pairs(&self) -> form_urlencoded::Parse<'_> {
+        form_urlencoded::parse(self.query().unwrap_or("").as_bytes())
+    }
+}
+
+// If not strict, plain http(s) URLs are split without allocating and only the others are
+// fully parsed.
+fn parse_url(s: &str, strict: bool) -> Option<ParsedUrl<'_>> {
+    if !strict {
+        if let Some(parts) = lenient::split(s) {
+            return Some(ParsedUrl::Split(parts));
+        }
+    }
+    cache::parse(s).map(ParsedUrl::Full)
+}
+
+#[derive(Deserialize)]
+struct StrictKwargs {
+    strict: bool,
+}
+
+#[derive(Clone, Copy)]
+enum UrlField {
+    Scheme,
+    Username,
+    Password,
+    Host,
+    Domain,
+    RegisteredDomain,
+    PublicSuffix,
+    Port,
+    Path,
+    Query,
+    Fragment,
+    IsSpecial,
+}
+
+impl UrlField {
+    fn from_name(name: &str) -> PolarsResult<Self> {
+        match name {
+            "scheme" => Ok(Self::Scheme),
+            "username" => Ok(Self::Username),
+            "password" => Ok(Self::Password),
+            "host" => Ok(Self::Host),
+            "domain" => Ok(Self::Domain),
+            "registered_domain" => Ok(Self::RegisteredDomain),
+            "public_suffix" => Ok(Self::PublicSuffix),
+            "port" => Ok(Self::Port),
+            "path" => Ok(Self::Path),
+            "query" => Ok(Self::Query),
+            "fragment" => Ok(Self::Fragment),
+            "is_special" => Ok(Self::IsSpecial),
+            _ => polars_bail!(InvalidOperation: "Unknown URL field: {}", name),
+        }
+    }
+
+    fn dtype(&self) -> DataType {
+        match self {
+            Self::Port => DataType::UInt16,
+            Self::IsSpecial => DataType::Boolean,
+            _ => DataType::String,
+        }
+    }
+}
+
+// Only the builders for the requested fields are allocated.
+enum UrlFieldBuilder {
+    Str(StringChunkedBuilder),
+    U16(PrimitiveChunkedBuilder<UInt16Type>),
+    Bool(BooleanChunkedBuilder),
+}
+
+impl UrlFieldBuilder {
+    fn new(name: &str, field: UrlField, capacity: usize) -> Self {
+        match field.dtype() {
+            DataType::UInt16 => Self::U16(PrimitiveChunkedBuilder::new(name.into(), capacity)),
+            DataType::Boolean => Self::Bool(BooleanChunkedBuilder::new(name.into(), capacity)),
+            _ => Self::Str(StringChunkedBuilder::new(name.into(), capacity)),
+        }
+    }
+
+    fn append_null(&mut self) {
+        match self {
+            Self::Str(b) => b.append_null(),
+            Self::U16(b) => b.append_null(),
+            Self::Bool(b) => b.append_null(),
+        }
+    }
+
+    fn append_url(&mut self, field: UrlField, u: &ParsedUrl) {
+        match (self, field) {
+            (Self::Str(b), UrlField::Scheme) => b.append_value(u.scheme()),
+            (Self::Str(b), UrlField::Username) => b.append_value(u.username()),
+            (Self::Str(b), UrlField::Password) => b.append_option(u.password()),
+            (Self::Str(b), UrlField::Host) => b.append_option(u.host_str()),
+            (Self::Str(b), UrlField::Domain) => b.append_option(u.domain()),
+            (Self::Str(b), UrlField::RegisteredDomain) => {
+                b.append_option(u.domain().and_then(psl::domain_str))
             }
-        } else {
-            builder.append_null();
+            (Self::Str(b), UrlField::PublicSuffix) => {
+                b.append_option(u.domain().and_then(psl::suffix_str))
+            }
+            (Self::Str(b), UrlField::Path) => b.append_value(u.path()),
+            (Self::Str(b), UrlField::Query) => b.append_option(u.query()),
+            (Self::Str(b), UrlField::Fragment) => b.append_option(u.fragment()),
+            (Self::U16(b), UrlField::Port) => b.append_option(u.port()),
+            (Self::Bool(b), UrlField::IsSpecial) => b.append_value(u.is_special()),
+            (b, _) => b.append_null(),
         }
-    });
-    let out = builder.finish();
-    Ok(out.into_series())
+    }
+
+    fn finish(self) -> Column {
+        match self {
+            Self::Str(b) => b.finish().into_series().into_column(),
+            Self::U16(b) => b.finish().into_series().into_column(),
+            Self::Bool(b) => b.finish().into_series().into_column(),
+        }
+    }
 }
 
-#[polars_expr(output_type=String)]
-fn pl_url_domain(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut builder = StringChunkedBuilder::new("domain".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(u) = Url::parse(s) {
-                builder.append_option(u.domain())
+#[derive(Deserialize)]
+struct UrlExtractKwargs {
+    fields: Vec<String>,
+    strict: bool,
+}
+
+fn url_extract_output(_: &[Field], kwargs: UrlExtractKwargs) -> PolarsResult<Field> {
+    let v = kwargs
+        .fields
+        .iter()
+        .map(|name| UrlField::from_name(name).map(|f| Field::new(name.into(), f.dtype())))
+        .collect::<PolarsResult<Vec<Field>>>()?;
+    Ok(Field::new("".into(), DataType::Struct(v)))
+}
+
+#[polars_expr(output_type_func_with_kwargs=url_extract_output)]
+fn pl_url_extract_all(inputs: &[Series], kwargs: UrlExtractKwargs) -> PolarsResult<Series> {
+    polars_ensure!(
+        !kwargs.fields.is_empty(),
+        InvalidOperation: "At least one URL field must be requested."
+    );
+    // The struct row of a URL that cannot be parsed is kept, with null fields, so the kernel
+    // counts its failures, once per distinct value of a Categorical input.
+    let failed = AtomicU64::new(0);
+    dictionary_apply(
+        "pl_url_extract_all",
+        Failures::Counted(&failed),
+        &inputs[0],
+        |ca| {
+            let fields = kwargs
+                .fields
+                .iter()
+                .map(|name| UrlField::from_name(name))
+                .collect::<PolarsResult<Vec<UrlField>>>()?;
+            let mut builders: Vec<UrlFieldBuilder> = kwargs
+                .fields
+                .iter()
+                .zip(fields.iter())
+                .map(|(name, f)| UrlFieldBuilder::new(name, *f, ca.len()))
+                .collect();
+
+            let mut failures = 0;
+            ca.into_iter().for_each(|op_s| {
+                if let Some(u) = op_s.and_then(|s| parse_url(s, kwargs.strict)) {
+                    for (b, f) in builders.iter_mut().zip(fields.iter()) {
+                        b.append_url(*f, &u);
+                    }
+                } else {
+                    failures += op_s.is_some() as u64;
+                    builders.iter_mut().for_each(|b| b.append_null());
+                }
+            });
+            failed.fetch_add(failures, Ordering::Relaxed);
+
+            let columns: Vec<Column> = builders.into_iter().map(|b| b.finish()).collect();
+            let out = StructChunked::from_columns("url".into(), ca.len(), &columns)?;
+            Ok(out.into_series())
+        },
+    )
+}
+
+#[derive(Deserialize)]
+struct InternKwargs {
+    categorical: bool,
+    strict: bool,
+}
+
+fn intern_output(input_fields: &[Field], kwargs: InternKwargs) -> PolarsResult<Field> {
+    Ok(Field::new(
+        input_fields[0].name().clone(),
+        StringOutputBuilder::dtype(kwargs.categorical),
+    ))
+}
+
+// Hosts and domains repeat a lot, so they can be interned into a Categorical.
+fn url_domain_part<F>(
+    kernel: &'static str,
+    inputs: &[Series],
+    name: &str,
+    kwargs: InternKwargs,
+    part: F,
+) -> PolarsResult<Series>
+where
+    F: for<'a, 'b> Fn(&'a ParsedUrl<'b>) -> Option<&'a str> + Sync,
+{
+    let apply = |ca: &StringChunked| {
+        let mut builder = StringOutputBuilder::new(name, ca.len(), kwargs.categorical);
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(u) = op_s.and_then(|s| parse_url(s, kwargs.strict)) {
+                builder.append_option(part(&u));
             } else {
                 builder.append_null();
             }
+        });
+        Ok(builder.finish())
+    };
+    stats::record(kernel, Failures::Null, &inputs[0], || {
+        // Parts evaluated in parallel would have different categories, so interned outputs
+        // are built in a single pass.
+        if kwargs.categorical {
+            dictionary_eval_serial(&inputs[0], apply)
         } else {
-            builder.append_null();
+            dictionary_eval(&inputs[0], apply)
         }
-    });
-    let out = builder.finish();
-    Ok(out.into_series())
+    })
+}
+
+#[polars_expr(output_type_func_with_kwargs=intern_output)]
+fn pl_url_host(inputs: &[Series], kwargs: InternKwargs) -> PolarsResult<Series> {
+    url_domain_part("pl_url_host", inputs, "host", kwargs, |u| u.host_str())
+}
+
+#[polars_expr(output_type_func_with_kwargs=intern_output)]
+fn pl_url_domain(inputs: &[Series], kwargs: InternKwargs) -> PolarsResult<Series> {
+    url_domain_part("pl_url_domain", inputs, "domain", kwargs, |u| u.domain())
+}
+
+// The public suffix list is compiled into the binary by the psl crate.
+#[polars_expr(output_type_func_with_kwargs=intern_output)]
+fn pl_url_registered_domain(inputs: &[Series], kwargs: InternKwargs) -> PolarsResult<Series> {
+    url_domain_part(
+        "pl_url_registered_domain",
+        inputs,
+        "registered_domain",
+        kwargs,
+        |u| u.domain().and_then(psl::domain_str),
+    )
+}
+
+#[polars_expr(output_type_func_with_kwargs=intern_output)]
+fn pl_url_public_suffix(inputs: &[Series], kwargs: InternKwargs) -> PolarsResult<Series> {
+    url_domain_part(
+        "pl_url_public_suffix",
+        inputs,
+        "public_suffix",
+        kwargs,
+        |u| u.domain().and_then(psl::suffix_str),
+    )
 }
 
 #[polars_expr(output_type=String)]
-fn pl_url_fragment(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut builder = StringChunkedBuilder::new("fragment".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(u) = Url::parse(s) {
-                builder.append_option(u.fragment())
+fn pl_url_fragment(inputs: &[Series], kwargs: StrictKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_fragment", Failures::Null, &inputs[0], |ca| {
+        let mut builder = StringChunkedBuilder::new("fragment".into(), ca.len());
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s {
+                if let Some(u) = parse_url(s, kwargs.strict) {
+                    builder.append_option(u.fragment())
+                } else {
+                    builder.append_null();
+                }
             } else {
                 builder.append_null();
             }
-        } else {
-            builder.append_null();
-        }
-    });
-    let out = builder.finish();
-    Ok(out.into_series())
+        });
+        let out = builder.finish();
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=String)]
-fn pl_url_path(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut builder = StringChunkedBuilder::new("path".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(u) = Url::parse(s) {
-                builder.append_value(u.path())
+fn pl_url_path(inputs: &[Series], kwargs: StrictKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_path", Failures::Null, &inputs[0], |ca| {
+        let mut builder = StringChunkedBuilder::new("path".into(), ca.len());
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s {
+                if let Some(u) = parse_url(s, kwargs.strict) {
+                    builder.append_value(u.path())
+                } else {
+                    builder.append_null();
+                }
             } else {
                 builder.append_null();
             }
-        } else {
-            builder.append_null();
-        }
-    });
-    let out = builder.finish();
-    Ok(out.into_series())
+        });
+        let out = builder.finish();
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=String)]
-fn pl_url_query(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut builder = StringChunkedBuilder::new("query".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(u) = Url::parse(s) {
-                builder.append_option(u.query())
+fn pl_url_query(inputs: &[Series], kwargs: StrictKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_query", Failures::Null, &inputs[0], |ca| {
+        let mut builder = StringChunkedBuilder::new("query".into(), ca.len());
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s {
+                if let Some(u) = parse_url(s, kwargs.strict) {
+                    builder.append_option(u.query())
+                } else {
+                    builder.append_null();
+                }
             } else {
                 builder.append_null();
             }
-        } else {
-            builder.append_null();
+        });
+        let out = builder.finish();
+        Ok(out.into_series())
+    })
+}
+
+fn query_params_output(_: &[Field]) -> PolarsResult<Field> {
+    let key = Field::new("key".into(), DataType::String);
+    let value = Field::new("value".into(), DataType::String);
+    Ok(Field::new(
+        "".into(),
+        DataType::List(Box::new(DataType::Struct(vec![key, value]))),
+    ))
+}
+
+// Keys and values are written once into two flat builders and the rows are only offsets
+// into them.
+#[polars_expr(output_type_func=query_params_output)]
+fn pl_url_query_params(inputs: &[Series], kwargs: StrictKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_query_params", Failures::Null, &inputs[0], |ca| {
+        let mut key_builder = StringChunkedBuilder::new("key".into(), ca.len());
+        let mut value_builder = StringChunkedBuilder::new("value".into(), ca.len());
+        let mut offsets = Offsets::<i64>::with_capacity(ca.len());
+        let mut validity = MutableBitmap::with_capacity(ca.len());
+
+        for op_s in ca.into_iter() {
+            let mut n_pairs = 0;
+            if let Some(u) = op_s.and_then(|s| parse_url(s, kwargs.strict)) {
+                for (k, v) in u.query_pairs() {
+                    key_builder.append_value(&k);
+                    value_builder.append_value(&v);
+                    n_pairs += 1;
+                }
+                validity.push(true);
+            } else {
+                validity.push(false);
+            }
+            offsets.try_push(n_pairs)?;
         }
-    });
-    let out = builder.finish();
-    Ok(out.into_series())
+
+        let keys = key_builder.finish().into_series().into_column();
+        let values = value_builder.finish().into_series().into_column();
+        let pairs = StructChunked::from_columns("".into(), keys.len(), &[keys, values])?.rechunk();
+        let pairs = pairs.downcast_iter().next().unwrap().clone().boxed();
+
+        let arr = LargeListArray::new(
+            LargeListArray::default_datatype(pairs.dtype().clone()),
+            offsets.into(),
+            pairs,
+            validity.into(),
+        );
+        Ok(ListChunked::with_chunk("query_params".into(), arr).into_series())
+    })
+}
+
+#[derive(Deserialize)]
+struct QueryParamKwargs {
+    keys: Vec<String>,
+    strict: bool,
+}
+
+fn query_param_output(_: &[Field], kwargs: QueryParamKwargs) -> PolarsResult<Field> {
+    let v = kwargs
+        .keys
+        .iter()
+        .map(|k| Field::new(k.into(), DataType::String))
+        .collect();
+    Ok(Field::new("".into(), DataType::Struct(v)))
+}
+
+// Returns the first (percent-decoded) value of each key, in one pass over the query.
+#[polars_expr(output_type_func_with_kwargs=query_param_output)]
+fn pl_url_query_param(inputs: &[Series], kwargs: QueryParamKwargs) -> PolarsResult<Series> {
+    polars_ensure!(
+        !kwargs.keys.is_empty(),
+        InvalidOperation: "At least one query key must be requested."
+    );
+    dictionary_apply("pl_url_query_param", Failures::Null, &inputs[0], |ca| {
+        let mut builders: Vec<StringChunkedBuilder> = kwargs
+            .keys
+            .iter()
+            .map(|k| StringChunkedBuilder::new(k.into(), ca.len()))
+            .collect();
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(u) = op_s.and_then(|s| parse_url(s, kwargs.strict)) {
+                let mut found = vec![None; builders.len()];
+                for (k, v) in u.query_pairs() {
+                    if let Some(i) = kwargs.keys.iter().position(|key| *key == k) {
+                        if found[i].is_none() {
+                            found[i] = Some(v);
+                        }
+                    }
+                }
+                for (b, v) in builders.iter_mut().zip(found) {
+                    b.append_option(v.as_deref());
+                }
+            } else {
+                builders.iter_mut().for_each(|b| b.append_null());
+            }
+        });
+
+        let columns: Vec<Column> = builders
+            .into_iter()
+            .map(|b| b.finish().into_series().into_column())
+            .collect();
+        let out = StructChunked::from_columns("query_param".into(), ca.len(), &columns)?;
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=Boolean)]
-fn pl_url_is_special(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let mut builder = BooleanChunkedBuilder::new("is_special".into(), ca.len());
-
-    ca.into_iter().for_each(|op_s| {
-        if let Some(s) = op_s {
-            if let Ok(u) = Url::parse(s) {
-                builder.append_value(u.is_special());
+fn pl_url_is_special(inputs: &[Series], kwargs: StrictKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_is_special", Failures::Null, &inputs[0], |ca| {
+        let mut builder = BooleanChunkedBuilder::new("is_special".into(), ca.len());
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(s) = op_s {
+                if let Some(u) = parse_url(s, kwargs.strict) {
+                    builder.append_value(u.is_special());
+                } else {
+                    builder.append_null();
+                }
             } else {
                 builder.append_null();
             }
-        } else {
-            builder.append_null();
-        }
-    });
-    let out = builder.finish();
-    Ok(out.into_series())
+        });
+        let out = builder.finish();
+        Ok(out.into_series())
+    })
 }
 
 #[polars_expr(output_type=Boolean)]
 fn pl_url_is_valid(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-    let out: BooleanChunked = ca.apply_nonnull_values_generic(DataType::Boolean, |s| s.parse::<Url>().is_ok());
-    Ok(out.into_series())
+    dictionary_apply("pl_url_is_valid", Failures::NotTrue, &inputs[0], |ca| {
+        let out: BooleanChunked = ca.apply_nonnull_values_generic(DataType::Boolean, |s| s.parse::<Url>().is_ok());
+        Ok(out.into_series())
+    })
+}
+
+// Reasons returned by url_check. The codes are positions in this list, which is also the
+// order of the categories of the Enum on the Python side.
+static URL_CHECKS: [&str; 12] = [
+    "ok",
+    "empty host",
+    "invalid international domain name",
+    "invalid port number",
+    "invalid IPv4 address",
+    "invalid IPv6 address",
+    "invalid domain character",
+    "relative URL without a base",
+    "relative URL with a cannot-be-a-base base",
+    "a cannot-be-a-base URL doesn’t have a host to set",
+    "URLs more than 4 GB are not supported",
+    "unknown error",
+];
+
+fn url_check_code(s: &str) -> u32 {
+    match Url::parse(s) {
+        Ok(_) => 0,
+        Err(e) => match e {
+            url::ParseError::EmptyHost => 1,
+            url::ParseError::IdnaError => 2,
+            url::ParseError::InvalidPort => 3,
+            url::ParseError::InvalidIpv4Address => 4,
+            url::ParseError::InvalidIpv6Address => 5,
+            url::ParseError::InvalidDomainCharacter => 6,
+            url::ParseError::RelativeUrlWithoutBase => 7,
+            url::ParseError::RelativeUrlWithCannotBeABaseBase => 8,
+            url::ParseError::SetHostOnCannotBeABaseUrl => 9,
+            url::ParseError::Overflow => 10,
+            _ => 11,
+        },
+    }
 }
 
 #[polars_expr(output_type=String)]
 fn pl_url_check(inputs: &[Series]) -> PolarsResult<Series> {
-    let ca = inputs[0].str()?;
-
-    let out = ca.apply_values(|s| 
-        match Url::parse(s) {
-            Ok(_) => "ok".into(),
-            Err(e) => match e {
-                url::ParseError::EmptyHost => "empty host".into(),
-                url::ParseError::IdnaError => "invalid international domain name".into(),
-                url::ParseError::InvalidPort => "invalid port number".into(),
-                url::ParseError::InvalidIpv4Address => "invalid IPv4 address".into(),
-                url::ParseError::InvalidIpv6Address => "invalid IPv6 address".into(),
-                url::ParseError::InvalidDomainCharacter => "invalid domain character".into(),
-                url::ParseError::RelativeUrlWithoutBase => "relative URL without a base".into(),
-                url::ParseError::RelativeUrlWithCannotBeABaseBase => "relative URL with a cannot-be-a-base base".into(),
-                url::ParseError::SetHostOnCannotBeABaseUrl => "a cannot-be-a-base URL doesn’t have a host to set".into(),
-                url::ParseError::Overflow => "URLs more than 4 GB are not supported".into(),
-                _ => "unknown error".into()
-            },
+    dictionary_apply("pl_url_check", Failures::NotOk, &inputs[0], |ca| {
+        let out = ca.apply_values(|s| URL_CHECKS[url_check_code(s) as usize].into());
+        Ok(out.into_series())
+    })
+}
+
+#[polars_expr(output_type=UInt32)]
+fn pl_url_check_enum(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_check_enum", Failures::NotOk, &inputs[0], |ca| {
+        let out: UInt32Chunked = ca.apply_nonnull_values_generic(DataType::UInt32, url_check_code);
+        Ok(out.into_series())
+    })
+}
+
+#[derive(Deserialize)]
+struct NUniqueKwargs {
+    approx: bool,
+    strict: bool,
+}
+
+// HyperLogLog sketch of the hosts of the URLs in ca, where the strings have the row counts
+// in weights. The rows of the URLs that cannot be parsed are added to failed.
+fn host_hll(
+    ca: &StringChunked,
+    weights: Option<&[u64]>,
+    strict: bool,
+    failed: &AtomicU64,
+) -> HyperLogLog {
+    let weight = |offset: usize, i: usize| weights.map_or(1, |w| w[offset + i]);
+    par_fold(
+        ca,
+        |ca, offset| {
+            let mut hll = HyperLogLog::new();
+            let mut failures = 0;
+            for (i, op_s) in ca.into_iter().enumerate() {
+                let Some(s) = op_s else {
+                    continue;
+                };
+                let Some(u) = parse_url(s, strict) else {
+                    failures += weight(offset, i);
+                    continue;
+                };
+                if let Some(host) = u.host_str() {
+                    hll.insert(host);
+                }
+            }
+            failed.fetch_add(failures, Ordering::Relaxed);
+            hll
+        },
+        HyperLogLog::merge,
+    )
+}
+
+// Counts the distinct hosts while parsing, without building the host column. URLs without
+// a host are not counted. The URLs that cannot be parsed are the failures in the stats.
+#[polars_expr(output_type=UInt64)]
+fn pl_url_host_n_unique(inputs: &[Series], kwargs: NUniqueKwargs) -> PolarsResult<Series> {
+    let failed = AtomicU64::new(0);
+    stats::record(
+        "pl_url_host_n_unique",
+        Failures::Counted(&failed),
+        &inputs[0],
+        || {
+            let (ca, weights) = dictionary_counts(&inputs[0])?;
+            let strict = kwargs.strict;
+            let weight = |offset: usize, i: usize| weights.as_ref().map_or(1, |w| w[offset + i]);
+
+            let n = if kwargs.approx {
+                host_hll(&ca, weights.as_deref(), strict, &failed).count()
+            } else {
+                let hosts = par_fold(
+                    &ca,
+                    |ca, offset| {
+                        let mut hosts: PlHashSet<String> = PlHashSet::new();
+                        let mut failures = 0;
+                        for (i, op_s) in ca.into_iter().enumerate() {
+                            let Some(s) = op_s else {
+                                continue;
+                            };
+                            let Some(u) = parse_url(s, strict) else {
+                                failures += weight(offset, i);
+                                continue;
+                            };
+                            if let Some(host) = u.host_str() {
+                                if !hosts.contains(host) {
+                                    hosts.insert(host.to_string());
+                                }
+                            }
+                        }
+                        failed.fetch_add(failures, Ordering::Relaxed);
+                        hosts
+                    },
+                    |mut a, b| {
+                        a.extend(b);
+                        a
+                    },
+                );
+                hosts.len() as u64
+            };
+            Ok(UInt64Chunked::from_slice(ca.name().clone(), &[n]).into_series())
+        },
+    )
+}
+
+// The sketch that url_host_n_unique counts with approx, as the bytes of its registers, so
+// that sketches of partitions or days can be stored and merged by hll_merge.
+#[polars_expr(output_type=Binary)]
+fn pl_url_host_hll(inputs: &[Series], kwargs: StrictKwargs) -> PolarsResult<Series> {
+    let failed = AtomicU64::new(0);
+    stats::record(
+        "pl_url_host_hll",
+        Failures::Counted(&failed),
+        &inputs[0],
+        || {
+            let (ca, weights) = dictionary_counts(&inputs[0])?;
+            let hll = host_hll(&ca, weights.as_deref(), kwargs.strict, &failed);
+            Ok(BinaryChunked::from_slice(ca.name().clone(), &[hll.as_bytes()]).into_series())
+        },
+    )
+}
+
+#[derive(Deserialize)]
+struct NormalizeKwargs {
+    sort_query: bool,
+    drop_fragment: bool,
+}
+
+// Writes the normalized form of u into out. The parser already lowercases the host of
+// special URLs, drops their default port and resolves the dot segments of the path, so only
+// the query and fragment are left to do.
+fn write_normalized(u: &Url, kwargs: &NormalizeKwargs, out: &mut String) {
+    out.clear();
+    out.push_str(&u[..Position::AfterPath]);
+    if let Some(q) = u.query() {
+        if kwargs.sort_query {
+            // The pairs are sorted by key as they are, without decoding them, so that the
+            // result is still a valid query. The sort is stable, since the order of the values
+            // of a repeated key can matter. Empty pairs are dropped.
+            let mut pairs: Vec<&str> = q.split('&').filter(|p| !p.is_empty()).collect();
+            fn key(p: &str) -> &str {
+                p.split_once('=').map_or(p, |(k, _)| k)
+            }
+            pairs.sort_by(|a, b| key(a).cmp(key(b)));
+            if !pairs.is_empty() {
+                out.push('?');
+                out.push_str(&pairs.join("&"));
+            }
+        } else {
+            out.push('?');
+            out.push_str(q);
         }
-    );
-    Ok(out.into_series())
+    }
+    if !kwargs.drop_fragment {
+        if let Some(f) = u.fragment() {
+            out.push('#');
+            out.push_str(f);
+        }
+    }
+}
+
+#[polars_expr(output_type=String)]
+fn pl_url_normalize(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_normalize", Failures::Null, &inputs[0], |ca| {
+        let mut builder = StringChunkedBuilder::new(ca.name().clone(), ca.len());
+        let mut buf = String::new();
+
+        ca.into_iter().for_each(|op_s| {
+            if let Some(u) = op_s.and_then(cache::parse) {
+                write_normalized(&u, &kwargs, &mut buf);
+                builder.append_value(&buf);
+            } else {
+                builder.append_null();
+            }
+        });
+        Ok(builder.finish().into_series())
+    })
+}
+
+#[polars_expr(output_type=UInt64)]
+fn pl_url_fingerprint(inputs: &[Series], kwargs: NormalizeKwargs) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_fingerprint", Failures::Null, &inputs[0], |ca| {
+        let mut buf = String::new();
+        let out = UInt64Chunked::from_iter_options(
+            ca.name().clone(),
+            ca.into_iter().map(|op_s| {
+                let u = op_s.and_then(cache::parse)?;
+                write_normalized(&u, &kwargs, &mut buf);
+                Some(fnv1a(&buf))
+            }),
+        );
+        Ok(out.into_series())
+    })
+}
+
+// Bytes that end a URL in free text: whitespace, controls and the characters that RFC 3986
+// (appendix C) suggests as delimiters around URLs.
+fn ends_url(c: u8) -> bool {
+    c.is_ascii_whitespace()
+        || c.is_ascii_control()
+        || matches!(
+            c,
+            b'<' | b'>' | b'"' | b'`' | b'{' | b'}' | b'|' | b'\\' | b'^'
+        )
+}
+
+// http(s) URLs in free text, found from their "://". Punctuation at the end belongs to the
+// sentence around the URL, and so does a closing bracket that is not opened in the URL, as in
+// "(see https://example.com)".
+fn url_matches(s: &str, matches: &mut Vec<(usize, usize)>) {
+    let b = s.as_bytes();
+    let mut from = 0;
+    while let Some(k) = s[from..].find("://") {
+        let sep = from + k;
+        let scheme_len = b[..sep]
+            .iter()
+            .rev()
+            .take_while(|c| c.is_ascii_alphabetic())
+            .count();
+        let start = sep - scheme_len;
+        let mut end = sep + 3 + b[sep + 3..].iter().take_while(|&&c| !ends_url(c)).count();
+        from = end;
+
+        let scheme = &s[start..sep];
+        let is_http = scheme.eq_ignore_ascii_case("http") || scheme.eq_ignore_ascii_case("https");
+        if !is_http || (start > 0 && b[start - 1].is_ascii_alphanumeric()) {
+            continue;
+        }
+        while end > sep + 3 {
+            let url = &b[start..end];
+            let unbalanced = |open, close| {
+                url.iter().filter(|&&c| c == open).count()
+                    < url.iter().filter(|&&c| c == close).count()
+            };
+            let trailing = match b[end - 1] {
+                b'.' | b',' | b';' | b':' | b'!' | b'?' | b'\'' => true,
+                b')' => unbalanced(b'(', b')'),
+                b']' => unbalanced(b'[', b']'),
+                _ => false,
+            };
+            if !trailing {
+                break;
+            }
+            end -= 1;
+        }
+
+        let url = &s[start..end];
+        if parse_url(url, false).is_some_and(|u| u.host_str().is_some_and(|h| !h.is_empty())) {
+            matches.push((start, end));
+        }
+    }
+}
+
+#[polars_expr(output_type_func=find_all_output)]
+fn pl_url_find_all(inputs: &[Series]) -> PolarsResult<Series> {
+    dictionary_apply("pl_url_find_all", Failures::Empty, &inputs[0], |ca| {
+        Ok(find_all(ca, url_matches).into_series())
+    })
 }
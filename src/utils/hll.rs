@@ -0,0 +1,77 @@
+// A HyperLogLog sketch for approximate distinct counts. With 2^14 one byte registers it
+// takes 16 KiB and its standard error is about 0.8%. Sketches of parts of the input are
+// merged by taking the max of each register. The registers are also the serialized form of
+// a sketch, which Python sees as Binary. Values are hashed by FNV-1a and a fixed mixer, which
+// never change, so stored sketches can be merged with the sketches of later versions.
+
+use super::fnv1a;
+
+const P: u32 = 14;
+const M: usize = 1 << P;
+
+// The finalizer of MurmurHash3. The high bits of FNV-1a depend little on the last bytes of
+// short strings, and the first P bits pick the register, so they are mixed into every bit.
+fn mix(mut h: u64) -> u64 {
+    h ^= h >> 33;
+    h = h.wrapping_mul(0xff51afd7ed558ccd);
+    h ^= h >> 33;
+    h = h.wrapping_mul(0xc4ceb9fe1a85ec53);
+    h ^ (h >> 33)
+}
+
+pub struct HyperLogLog {
+    registers: Vec<u8>,
+}
+
+impl HyperLogLog {
+    pub fn new() -> Self {
+        Self {
+            registers: vec![0; M],
+        }
+    }
+
+    pub fn insert(&mut self, s: &str) {
+        let hash = mix(fnv1a(s));
+
+        // The first P bits pick the register, which keeps the largest position of the first
+        // 1 bit in the rest. The sentinel bit caps it when the rest is all zeros.
+        let idx = (hash >> (64 - P)) as usize;
+        let rank = ((hash << P) | (1 << (P - 1))).leading_zeros() as u8 + 1;
+        if rank > self.registers[idx] {
+            self.registers[idx] = rank;
+        }
+    }
+
+    // The sketch with the registers in b, or None if b is not a serialized sketch.
+    pub fn from_bytes(b: &[u8]) -> Option<Self> {
+        (b.len() == M && b.iter().all(|&r| r as u32 <= 65 - P)).then(|| Self {
+            registers: b.to_vec(),
+        })
+    }
+
+    pub fn as_bytes(&self) -> &[u8] {
+        &self.registers
+    }
+
+    pub fn merge(mut self, other: Self) -> Self {
+        for (r, o) in self.registers.iter_mut().zip(other.registers) {
+            *r = (*r).max(o);
+        }
+        self
+    }
+
+    pub fn count(&self) -> u64 {
+        let m = M as f64;
+        let alpha = 0.7213 / (1.0 + 1.079 / m);
+        let sum: f64 = self.registers.iter().map(|&r| (-(r as f64)).exp2()).sum();
+        let estimate = alpha * m * m / sum;
+
+        // Small counts leave registers at zero, and linear counting is more accurate there.
+        let zeros = self.registers.iter().filter(|&&r| r == 0).count();
+        if estimate <= 2.5 * m && zeros > 0 {
+            (m * (m / zeros as f64).ln()).round() as u64
+        } else {
+            estimate.round() as u64
+        }
+    }
+}
@@ -1 +1,568 @@
+use polars::prelude::*;
+use polars_arrow::array::{Array, BooleanArray, Utf8ViewArray, View};
+use polars_arrow::bitmap::{Bitmap, MutableBitmap};
+use polars_arrow::datatypes::ArrowDataType;
+use pyo3_polars::derive::polars_expr;
+use pyo3_polars::export::polars_core::utils::split_offsets;
+use pyo3_polars::export::polars_core::POOL;
+use rayon::prelude::*;
+use serde::Deserialize;
 
+mod hll;
+pub mod stats;
+pub use hll::HyperLogLog;
+
+/// 64-bit FNV-1a. Unlike the hashers of std it is the same in every version and on every
+/// platform, so its hashes, e.g. URL fingerprints and HyperLogLog sketches, can be stored and
+/// combined across runs.
+pub fn fnv1a(s: &str) -> u64 {
+    s.bytes().fold(0xcbf29ce484222325, |h, b| {
+        (h ^ b as u64).wrapping_mul(0x100000001b3)
+    })
+}
+
+/// Extracts N substrings from every string in `ca`, after `cleaner` has cleaned it. `f`
+/// returns the byte range of each part in the cleaned string, or None if the part is null for
+/// that row.
+///
+/// The output arrays are views into the input: parts of at most 12 bytes are inlined into
+/// the view, longer ones point into the input's data buffers. Nothing is copied into new
+/// buffers and nothing is allocated per row. A cleaned string is not in the input's buffers,
+/// so its parts must be at most 12 bytes, which holds for the parts of ISINs and CUSIPs.
+pub fn substring_views<const N: usize, F>(
+    ca: &StringChunked,
+    mut cleaner: Cleaner,
+    names: [&str; N],
+    mut f: F,
+) -> [StringChunked; N]
+where
+    F: FnMut(&str) -> [Option<(usize, usize)>; N],
+{
+    let mut chunks: [Vec<Utf8ViewArray>; N] =
+        std::array::from_fn(|_| Vec::with_capacity(ca.chunks().len()));
+    let cleaning = cleaner.is_on();
+
+    for arr in ca.downcast_iter() {
+        let len = arr.len();
+        let mut views: [Vec<View>; N] = std::array::from_fn(|_| Vec::with_capacity(len));
+        let mut validity: [MutableBitmap; N] =
+            std::array::from_fn(|_| MutableBitmap::with_capacity(len));
+        let mut total_bytes_len = [0usize; N];
+
+        for (i, view) in arr.views().iter().enumerate() {
+            let (s, ranges) = if arr.is_valid(i) {
+                // SAFETY: i < arr.len()
+                let s = cleaner.clean(unsafe { arr.value_unchecked(i) });
+                (s, f(s))
+            } else {
+                ("", [None; N])
+            };
+            for (k, range) in ranges.into_iter().enumerate() {
+                if let Some((start, end)) = range {
+                    assert!(!cleaning || end - start <= 12);
+                    // Inline views ignore buffer_idx and offset, which hold string bytes
+                    // for short inputs, hence the wrapping add.
+                    views[k].push(View::new_from_bytes(
+                        &s.as_bytes()[start..end],
+                        view.buffer_idx,
+                        view.offset.wrapping_add(start as u32),
+                    ));
+                    validity[k].push(true);
+                    total_bytes_len[k] += end - start;
+                } else {
+                    views[k].push(View::default());
+                    validity[k].push(false);
+                }
+            }
+        }
+
+        for k in 0..N {
+            // SAFETY: every view is either inlined or points to a valid utf8 substring of
+            // one of the input's data buffers, which are shared with the output.
+            let out = unsafe {
+                Utf8ViewArray::new_unchecked(
+                    ArrowDataType::Utf8View,
+                    std::mem::take(&mut views[k]).into(),
+                    arr.data_buffers().clone(),
+                    std::mem::take(&mut validity[k]).into(),
+                    total_bytes_len[k],
+                    arr.total_buffer_len(),
+                )
+            };
+            chunks[k].push(out);
+        }
+    }
+
+    std::array::from_fn(|k| {
+        StringChunked::from_chunk_iter(names[k].into(), std::mem::take(&mut chunks[k]))
+    })
+}
+
+// The bytes of a string of at most 12 bytes, which are stored in the view itself.
+fn inline_bytes(view: &View) -> [u8; 12] {
+    let mut out = [0u8; 12];
+    out[0..4].copy_from_slice(&view.prefix.to_ne_bytes());
+    out[4..8].copy_from_slice(&view.buffer_idx.to_ne_bytes());
+    out[8..12].copy_from_slice(&view.offset.to_ne_bytes());
+    out
+}
+
+/// Runs `f` on every string of exactly `L` bytes. `L` is at most 12, so the strings are
+/// read straight from the contiguous views buffer and the data buffers are never touched.
+/// Nulls and strings of any other length are false. If `normalize`, every string is cleaned
+/// by a Cleaner first, since strings of any length may be cleaned to `L` bytes.
+pub fn validate_inline<const L: usize, F>(
+    ca: &StringChunked,
+    normalize: bool,
+    f: F,
+) -> BooleanChunked
+where
+    F: Fn(&[u8; L]) -> bool,
+{
+    assert!(L <= 12);
+    if normalize {
+        let mut cleaner = Cleaner::new(true, L);
+        return BooleanChunked::from_iter_values(
+            ca.name().clone(),
+            ca.into_iter().map(|op_s| {
+                op_s.map(|s| cleaner.clean(s))
+                    .is_some_and(|s| s.len() == L && f(s.as_bytes().try_into().unwrap()))
+            }),
+        );
+    }
+    let chunks = ca.downcast_iter().map(|arr| {
+        let values: Bitmap = arr
+            .views()
+            .iter()
+            .enumerate()
+            .map(|(i, view)| {
+                view.length as usize == L && arr.is_valid(i) && {
+                    let bytes = inline_bytes(view);
+                    // Cannot fail since L <= 12.
+                    f(bytes[..L].try_into().unwrap())
+                }
+            })
+            .collect();
+        BooleanArray::new(ArrowDataType::Boolean, values, None)
+    });
+    BooleanChunked::from_chunk_iter(ca.name().clone(), chunks)
+}
+
+// Inputs are only split if every thread gets at least this many rows.
+const PAR_MIN_ROWS: usize = 1 << 16;
+
+/// Evaluates `f` on contiguous row ranges of `ca` in parallel on the Polars thread pool and
+/// appends the results in order. Small inputs are evaluated in a single call. `f` must not
+/// return a Categorical, since the parts would have different categories.
+pub fn par_apply<F>(ca: &StringChunked, f: F) -> PolarsResult<Series>
+where
+    F: Fn(&StringChunked) -> PolarsResult<Series> + Sync,
+{
+    let n_parts = (ca.len() / PAR_MIN_ROWS).min(POOL.current_num_threads());
+    if n_parts <= 1 {
+        return f(ca);
+    }
+
+    let parts = POOL.install(|| {
+        split_offsets(ca.len(), n_parts)
+            .into_par_iter()
+            .map(|(offset, len)| f(&ca.slice(offset as i64, len)))
+            .collect::<PolarsResult<Vec<Series>>>()
+    })?;
+    let mut parts = parts.into_iter();
+    // n_parts > 1, so there is at least one part.
+    let mut out = parts.next().unwrap();
+    for part in parts {
+        out.append(&part)?;
+    }
+    Ok(out)
+}
+
+/// Folds contiguous row ranges of `ca` with `f` in parallel on the Polars thread pool, like
+/// par_apply, and merges the results with `merge`. `f` also gets the offset of its range.
+pub fn par_fold<T, F, M>(ca: &StringChunked, f: F, merge: M) -> T
+where
+    T: Send,
+    F: Fn(&StringChunked, usize) -> T + Sync,
+    M: Fn(T, T) -> T + Sync,
+{
+    let n_parts = (ca.len() / PAR_MIN_ROWS).min(POOL.current_num_threads());
+    if n_parts <= 1 {
+        return f(ca, 0);
+    }
+
+    POOL.install(|| {
+        split_offsets(ca.len(), n_parts)
+            .into_par_iter()
+            .map(|(offset, len)| f(&ca.slice(offset as i64, len), offset))
+            .reduce_with(merge)
+    })
+    // n_parts > 1, so there is at least one part.
+    .unwrap()
+}
+
+/// The strings of a String series, or of a Binary series reinterpreted as strings without
+/// copying. Binary values that are not valid UTF-8 become null. The identifiers are ASCII, for
+/// which the UTF-8 check is a word-at-a-time scan, and only an input with invalid values is
+/// copied.
+pub fn str_input(s: &Series) -> PolarsResult<StringChunked> {
+    match s.dtype() {
+        DataType::Binary => {
+            let ca = s.binary()?;
+            let is_utf8 = |b: &[u8]| std::str::from_utf8(b).is_ok();
+            // Values under nulls are checked too, since kernels may read them.
+            if ca.downcast_iter().all(|arr| arr.values_iter().all(is_utf8)) {
+                // SAFETY: every value was checked above.
+                Ok(unsafe { ca.to_string_unchecked() })
+            } else {
+                Ok(StringChunked::from_iter_options(
+                    s.name().clone(),
+                    ca.into_iter()
+                        .map(|op_b| op_b.and_then(|b| std::str::from_utf8(b).ok())),
+                ))
+            }
+        }
+        DataType::BinaryOffset => str_input(&s.cast(&DataType::Binary)?),
+        _ => Ok(s.str()?.clone()),
+    }
+}
+
+fn binary_to_string_output(input_fields: &[Field]) -> PolarsResult<Field> {
+    let dtype = match input_fields[0].dtype() {
+        DataType::Binary | DataType::BinaryOffset => DataType::String,
+        dtype => dtype.clone(),
+    };
+    Ok(Field::new(input_fields[0].name().clone(), dtype))
+}
+
+// Binary cannot be cast to Categorical, so dedup on the Python side goes through this first.
+// Other inputs are returned as they are.
+#[polars_expr(output_type_func=binary_to_string_output)]
+fn pl_binary_to_string(inputs: &[Series]) -> PolarsResult<Series> {
+    match inputs[0].dtype() {
+        DataType::Binary | DataType::BinaryOffset => Ok(str_input(&inputs[0])?.into_series()),
+        _ => Ok(inputs[0].clone()),
+    }
+}
+
+fn hll_sketch(b: &[u8]) -> PolarsResult<HyperLogLog> {
+    HyperLogLog::from_bytes(b)
+        .ok_or_else(|| polars_err!(ComputeError: "Invalid HyperLogLog sketch of {} bytes", b.len()))
+}
+
+// Merges the sketches of a column into one, which counts the union of their values. Nulls
+// are skipped.
+#[polars_expr(output_type=Binary)]
+fn pl_hll_merge(inputs: &[Series]) -> PolarsResult<Series> {
+    let ca = inputs[0].binary()?;
+    let hll = ca
+        .into_iter()
+        .flatten()
+        .try_fold(HyperLogLog::new(), |acc, b| Ok(acc.merge(hll_sketch(b)?)))?;
+    Ok(BinaryChunked::from_slice(ca.name().clone(), &[hll.as_bytes()]).into_series())
+}
+
+#[polars_expr(output_type=UInt64)]
+fn pl_hll_count(inputs: &[Series]) -> PolarsResult<Series> {
+    let ca = inputs[0].binary()?;
+    let counts = ca
+        .into_iter()
+        .map(|op_b| op_b.map(|b| Ok(hll_sketch(b)?.count())).transpose())
+        .collect::<PolarsResult<Vec<Option<u64>>>>()?;
+    let out = UInt64Chunked::from_iter_options(ca.name().clone(), counts.into_iter());
+    Ok(out.into_series())
+}
+
+/// Evaluates `f` on a String, Binary (see str_input), Categorical or Enum series. For
+/// Categorical and Enum inputs, `f` only sees the categories (plus a null if the input has nulls) and the result is
+/// gathered by the physical index, so each distinct value is parsed only once. Large inputs
+/// are evaluated in parallel by `par_apply`. The call is counted in the stats of the kernel
+/// `name`, with its failures counted as `failures` says.
+pub fn dictionary_apply<F>(
+    name: &'static str,
+    failures: stats::Failures,
+    s: &Series,
+    f: F,
+) -> PolarsResult<Series>
+where
+    F: Fn(&StringChunked) -> PolarsResult<Series> + Sync,
+{
+    stats::record(name, failures, s, || dictionary_eval(s, f))
+}
+
+/// dictionary_apply without the stats, for kernels that record them under another name.
+pub fn dictionary_eval<F>(s: &Series, f: F) -> PolarsResult<Series>
+where
+    F: Fn(&StringChunked) -> PolarsResult<Series> + Sync,
+{
+    dictionary_eval_serial(s, |ca| par_apply(ca, &f))
+}
+
+/// dictionary_eval, but `f` is called once on all the strings, in this thread, for outputs
+/// that cannot be built in parts, e.g. Categoricals.
+pub fn dictionary_eval_serial<F>(s: &Series, f: F) -> PolarsResult<Series>
+where
+    F: FnOnce(&StringChunked) -> PolarsResult<Series>,
+{
+    match s.dtype() {
+        DataType::Categorical(_, _) | DataType::Enum(_, _) => {
+            // Physical values of a global categorical are not positions in its categories.
+            let cat = s.categorical()?.to_local();
+            let mut categories = StringChunked::with_chunk(
+                s.name().clone(),
+                cat.get_rev_map().get_categories().clone(),
+            );
+            let idx = if cat.physical().null_count() > 0 {
+                let null_idx = categories.len() as IdxSize;
+                categories.append(&StringChunked::full_null(s.name().clone(), 1))?;
+                cat.physical().fill_null_with_values(null_idx)?
+            } else {
+                cat.physical().clone()
+            };
+            f(&categories)?.take(&idx)
+        }
+        _ => f(&str_input(s)?),
+    }
+}
+
+/// The strings of a String, Binary, Categorical or Enum series for the aggregations, which skip
+/// nulls. For Categorical and Enum inputs, these are the categories that occur in the series,
+/// with the number of rows each occurs in, so each distinct value is parsed only once.
+/// Otherwise every row counts once and there are no counts.
+pub fn dictionary_counts(s: &Series) -> PolarsResult<(StringChunked, Option<Vec<u64>>)> {
+    match s.dtype() {
+        DataType::Categorical(_, _) | DataType::Enum(_, _) => {
+            // Physical values of a global categorical are not positions in its categories.
+            let cat = s.categorical()?.to_local();
+            let categories = cat.get_rev_map().get_categories();
+            let mut counts = vec![0u64; categories.len()];
+            for idx in cat.physical().into_iter().flatten() {
+                counts[idx as usize] += 1;
+            }
+
+            let used: Vec<usize> = (0..counts.len()).filter(|&i| counts[i] > 0).collect();
+            let values = StringChunked::from_iter_values(
+                s.name().clone(),
+                used.iter().map(|&i| categories.value(i)),
+            );
+            Ok((values, Some(used.iter().map(|&i| counts[i]).collect())))
+        }
+        _ => Ok((str_input(s)?, None)),
+    }
+}
+
+/// The List(String) output of the *_find_all kernels, named like the input.
+pub fn find_all_output(input_fields: &[Field]) -> PolarsResult<Field> {
+    Ok(Field::new(
+        input_fields[0].name().clone(),
+        DataType::List(Box::new(DataType::String)),
+    ))
+}
+
+/// Collects the matches that `f` finds in every string into a List(String) column. `f` pushes
+/// the byte range of each match in the string onto the Vec, which is reused for every row.
+/// Null strings give null lists, and strings without matches empty lists.
+pub fn find_all<F>(ca: &StringChunked, f: F) -> ListChunked
+where
+    F: Fn(&str, &mut Vec<(usize, usize)>),
+{
+    let mut builder = ListStringChunkedBuilder::new(ca.name().clone(), ca.len(), ca.len());
+    let mut matches = Vec::new();
+
+    for op_s in ca.into_iter() {
+        match op_s {
+            Some(s) => {
+                matches.clear();
+                f(s, &mut matches);
+                builder.append_values_iter(matches.iter().map(|&(start, end)| &s[start..end]));
+            }
+            None => builder.append_null(),
+        }
+    }
+    builder.finish()
+}
+
+/// Byte ranges of the maximal runs of ASCII bytes for which `is_token` holds, e.g. the words
+/// of a text, in a single pass. Identifiers in text are only matched as whole tokens.
+pub fn token_ranges<'a, F>(s: &'a str, is_token: F) -> impl Iterator<Item = (usize, usize)> + 'a
+where
+    F: Fn(u8) -> bool + 'a,
+{
+    let b = s.as_bytes();
+    let mut i = 0;
+    std::iter::from_fn(move || {
+        while i < b.len() && !is_token(b[i]) {
+            i += 1;
+        }
+        if i == b.len() {
+            return None;
+        }
+        let start = i;
+        while i < b.len() && is_token(b[i]) {
+            i += 1;
+        }
+        Some((start, i))
+    })
+}
+
+/// Position of a two letter country code in the list of all codes from "AA" to "ZZ". This is
+/// the order of the categories of the country code Enum on the Python side.
+pub fn country_code_index(cc: &str) -> Option<u32> {
+    match cc.as_bytes() {
+        [a @ b'A'..=b'Z', b @ b'A'..=b'Z'] => Some((a - b'A') as u32 * 26 + (b - b'A') as u32),
+        _ => None,
+    }
+}
+
+/// Position of a single letter (CINS) country code in the list from "A" to "Z".
+pub fn letter_index(c: u8) -> Option<u32> {
+    c.is_ascii_uppercase().then(|| (c - b'A') as u32)
+}
+
+/// Value of a single check digit, which is also its position in the list from "0" to "9".
+pub fn digit_index(c: u8) -> Option<u32> {
+    c.is_ascii_digit().then(|| (c - b'0') as u32)
+}
+
+/// Builds a String column, or interns the values into a Categorical if `categorical`.
+pub enum StringOutputBuilder {
+    Str(StringChunkedBuilder),
+    Cat(CategoricalChunkedBuilder),
+}
+
+impl StringOutputBuilder {
+    pub fn new(name: &str, capacity: usize, categorical: bool) -> Self {
+        if categorical {
+            Self::Cat(CategoricalChunkedBuilder::new(
+                name.into(),
+                capacity,
+                CategoricalOrdering::Physical,
+            ))
+        } else {
+            Self::Str(StringChunkedBuilder::new(name.into(), capacity))
+        }
+    }
+
+    pub fn dtype(categorical: bool) -> DataType {
+        if categorical {
+            DataType::Categorical(None, CategoricalOrdering::Physical)
+        } else {
+            DataType::String
+        }
+    }
+
+    pub fn append_option(&mut self, v: Option<&str>) {
+        match self {
+            Self::Str(b) => b.append_option(v),
+            Self::Cat(b) => b.append(v),
+        }
+    }
+
+    pub fn append_null(&mut self) {
+        self.append_option(None)
+    }
+
+    pub fn finish(self) -> Series {
+        match self {
+            Self::Str(b) => b.finish().into_series(),
+            Self::Cat(b) => b.finish().into_series(),
+        }
+    }
+}
+
+// Longest value a Cleaner keeps, plus one byte that marks a value as too long.
+const CLEAN_CAPACITY: usize = 35;
+
+#[derive(Deserialize)]
+pub struct NormalizeKwargs {
+    pub normalize: bool,
+}
+
+/// Cleans values for the normalize option of the kernels, one at a time in a stack buffer,
+/// so no cleaned column is built. Whitespace and dashes are removed and ASCII letters
+/// uppercased, e.g. "de89 3704 0044" becomes "DE8937040044". A value that is still longer
+/// than `max_len` bytes, which cannot be a valid identifier, is cut to `max_len + 1` bytes:
+/// it stays a present value of an invalid length for the validators. If not on, values are
+/// returned as they are.
+pub struct Cleaner {
+    max_len: Option<usize>,
+    buf: [u8; CLEAN_CAPACITY],
+}
+
+impl Cleaner {
+    pub fn new(normalize: bool, max_len: usize) -> Self {
+        assert!(max_len < CLEAN_CAPACITY);
+        Self {
+            max_len: normalize.then_some(max_len),
+            buf: [0; CLEAN_CAPACITY],
+        }
+    }
+
+    pub fn is_on(&self) -> bool {
+        self.max_len.is_some()
+    }
+
+    pub fn clean<'a>(&'a mut self, s: &'a str) -> &'a str {
+        let Some(max_len) = self.max_len else {
+            return s;
+        };
+        let mut n = 0;
+        for &c in s.as_bytes() {
+            if c.is_ascii_whitespace() || c == b'-' {
+                continue;
+            }
+            self.buf[n] = c.to_ascii_uppercase();
+            n += 1;
+            if n > max_len {
+                // The cut may split a character, and the value is invalid anyway.
+                self.buf[..n]
+                    .iter_mut()
+                    .filter(|c| !c.is_ascii())
+                    .for_each(|c| *c = b'?');
+                break;
+            }
+        }
+        // SAFETY: only ASCII bytes were removed or changed, and a cut value is ASCII.
+        unsafe { std::str::from_utf8_unchecked(&self.buf[..n]) }
+    }
+}
+
+/// Cleans every string with a Cleaner. Values that are still longer than N bytes are null,
+/// since they cannot be valid identifiers.
+pub fn normalize<const N: usize>(ca: &StringChunked) -> StringChunked {
+    let mut builder = StringChunkedBuilder::new(ca.name().clone(), ca.len());
+    let mut cleaner = Cleaner::new(true, N);
+
+    for op_s in ca.into_iter() {
+        match op_s.map(|s| cleaner.clean(s)) {
+            Some(s) if s.len() <= N => builder.append_value(s),
+            _ => builder.append_null(),
+        }
+    }
+    builder.finish()
+}
+
+/// The is_valid and check fields that the struct outputs get with `with_check`. The check
+/// codes are cast to the Enum of reasons on the Python side.
+pub fn check_fields() -> [Field; 2] {
+    [
+        Field::new("is_valid".into(), DataType::Boolean),
+        Field::new("check".into(), DataType::UInt32),
+    ]
+}
+
+/// The is_valid and check columns from the check codes of the non-null rows of `ca`, in
+/// order, where 0 is valid. Both are null where `ca` is null.
+pub fn check_columns(ca: &StringChunked, codes: Vec<u32>) -> [Column; 2] {
+    let mut codes = codes.into_iter();
+    let check = UInt32Chunked::from_iter_options(
+        "check".into(),
+        ca.into_iter()
+            .map(|op_s| op_s.map(|_| codes.next().unwrap())),
+    );
+    let is_valid = check.equal(0).with_name("is_valid".into());
+    [
+        is_valid.into_series().into_column(),
+        check.into_series().into_column(),
+    ]
+}
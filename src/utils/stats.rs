@@ -0,0 +1,168 @@
+// Opt-in counters of the work done by each kernel, to feed job metrics. They are off by
+// default, and then a kernel call only costs an atomic load. They are turned on by
+// stats_enable, or by setting POLARS_ISTR_STATS=1 before the first kernel call. The counters
+// of each kernel are atomics, and the map of kernels is only locked once per call.
+
+use polars::prelude::*;
+use polars_arrow::array::Array;
+use pyo3::pyfunction;
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{Arc, LazyLock, RwLock};
+use std::time::Instant;
+
+#[derive(Default)]
+struct KernelStats {
+    calls: AtomicU64,
+    rows: AtomicU64,
+    nulls: AtomicU64,
+    failures: AtomicU64,
+    output_bytes: AtomicU64,
+    nanos: AtomicU64,
+}
+
+fn add(counter: &AtomicU64, n: usize) {
+    counter.fetch_add(n as u64, Ordering::Relaxed);
+}
+
+static ENABLED: LazyLock<AtomicBool> = LazyLock::new(|| {
+    let on = std::env::var("POLARS_ISTR_STATS").is_ok_and(|v| !v.is_empty() && v != "0");
+    AtomicBool::new(on)
+});
+
+static KERNELS: LazyLock<RwLock<PlHashMap<&'static str, Arc<KernelStats>>>> =
+    LazyLock::new(|| RwLock::new(PlHashMap::new()));
+
+fn kernel_stats(name: &'static str) -> Arc<KernelStats> {
+    // The counters are consistent after every statement, so a panic in another thread does
+    // not leave them broken.
+    if let Some(stats) = KERNELS.read().unwrap_or_else(|e| e.into_inner()).get(name) {
+        return stats.clone();
+    }
+    KERNELS
+        .write()
+        .unwrap_or_else(|e| e.into_inner())
+        .entry(name)
+        .or_default()
+        .clone()
+}
+
+/// How the failures of a kernel, the non-null inputs that it could not parse, are counted.
+/// Except for Counted, they are counted from the output after the call, and only if the stats
+/// are on.
+pub enum Failures<'a> {
+    /// Null outputs, for kernels that return null for the values they cannot parse. Values
+    /// that parse but lack an optional part, e.g. an IBAN without a branch id, count too.
+    Null,
+    /// Outputs that are not true, for the is_valid kernels.
+    NotTrue,
+    /// Outputs that are not "ok", or not code 0, for the check kernels.
+    NotOk,
+    /// Nulls in this field of the struct output, for the extract_all kernels that keep the
+    /// struct row of a failure.
+    Field(&'static str),
+    /// Empty lists, for the find_all kernels: texts in which nothing was found.
+    Empty,
+    /// Counted by the kernel while it runs, e.g. for aggregations, whose output rows are not
+    /// input rows.
+    Counted(&'a AtomicU64),
+}
+
+impl Failures<'_> {
+    fn count(&self, input: &Series, out: &Series) -> PolarsResult<usize> {
+        let present = input.len() - input.null_count();
+        let failures = match self {
+            Failures::Null => out.null_count().saturating_sub(input.null_count()),
+            Failures::NotTrue => {
+                let valid = out.bool()?.sum().unwrap_or(0) as usize;
+                present.saturating_sub(valid)
+            }
+            Failures::NotOk => {
+                let ok = match out.dtype() {
+                    DataType::String => out.str()?.equal("ok"),
+                    _ => out.u32()?.equal(0),
+                };
+                present.saturating_sub(ok.sum().unwrap_or(0) as usize)
+            }
+            Failures::Field(name) => {
+                let field = out.struct_()?.field_by_name(name)?;
+                field.null_count().saturating_sub(input.null_count())
+            }
+            Failures::Empty => out
+                .list()?
+                .downcast_iter()
+                .map(|arr| {
+                    arr.offsets()
+                        .lengths()
+                        .enumerate()
+                        .filter(|&(i, n)| n == 0 && arr.is_valid(i))
+                        .count()
+                })
+                .sum(),
+            Failures::Counted(n) => n.load(Ordering::Relaxed) as usize,
+        };
+        Ok(failures)
+    }
+}
+
+/// Runs the kernel `f` on `input` and, if the stats are on, adds the call to the counters of
+/// the kernel `name`, with its failures counted as `failures` says.
+pub fn record<F>(
+    name: &'static str,
+    failures: Failures,
+    input: &Series,
+    f: F,
+) -> PolarsResult<Series>
+where
+    F: FnOnce() -> PolarsResult<Series>,
+{
+    if !ENABLED.load(Ordering::Relaxed) {
+        return f();
+    }
+
+    let start = Instant::now();
+    let out = f()?;
+    let nanos = start.elapsed().as_nanos() as usize;
+
+    let stats = kernel_stats(name);
+    add(&stats.calls, 1);
+    add(&stats.rows, input.len());
+    add(&stats.nulls, input.null_count());
+    add(&stats.failures, failures.count(input, &out)?);
+    add(&stats.output_bytes, out.estimated_size());
+    add(&stats.nanos, nanos);
+    Ok(out)
+}
+
+/// Turns the counters on or off. They keep their values either way.
+#[pyfunction]
+pub fn stats_enable(on: bool) {
+    ENABLED.store(on, Ordering::Relaxed);
+}
+
+/// (kernel, calls, rows, nulls, failures, output_bytes, nanos) of every kernel called since
+/// the last reset while the counters were on.
+#[pyfunction]
+pub fn stats() -> Vec<(&'static str, u64, u64, u64, u64, u64, u64)> {
+    let kernels = KERNELS.read().unwrap_or_else(|e| e.into_inner());
+    let load = |counter: &AtomicU64| counter.load(Ordering::Relaxed);
+    kernels
+        .iter()
+        .map(|(&name, s)| {
+            (
+                name,
+                load(&s.calls),
+                load(&s.rows),
+                load(&s.nulls),
+                load(&s.failures),
+                load(&s.output_bytes),
+                load(&s.nanos),
+            )
+        })
+        .collect()
+}
+
+/// Removes the counters of all kernels.
+#[pyfunction]
+pub fn stats_reset() {
+    KERNELS.write().unwrap_or_else(|e| e.into_inner()).clear();
+}
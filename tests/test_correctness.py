@@ -1,6 +1,6 @@
 import polars as pl
 from polars.testing import assert_frame_equal
-from typing import List
+from typing import Dict, List
 import pytest
 from typing import Optional
 from polars_istr import *  # noqa: F403
@@ -336,3 +336,909 @@ def test_isin1(
 
     assert_frame_equal(test1, ans)
     assert_frame_equal(test2, ans)
+
+
+@pytest.mark.parametrize(
+    "df, fields, ans",
+    [
+        (
+            pl.DataFrame(
+                {
+                    "url": [
+                        "https://example.com/data.csv#row=4",
+                        "google.com",
+                        "https://example.com:8080/products?page=2&sort=desc",
+                        None,
+                    ]
+                }
+            ),
+            ["host", "port", "path", "query", "is_special"],
+            pl.DataFrame(
+                {
+                    "host": ["example.com", None, "example.com", None],
+                    "port": [None, None, 8080, None],
+                    "path": ["/data.csv", None, "/products", None],
+                    "query": [None, None, "page=2&sort=desc", None],
+                    "is_special": [True, None, True, None],
+                },
+                schema_overrides={"port": pl.UInt16},
+            ),
+        )
+    ],
+)
+def test_url_extract_all(df: pl.DataFrame, fields: List[str], ans: pl.DataFrame):
+    test1 = df.select(url_extract_all(pl.col("url"), fields=fields).alias("url")).unnest("url")
+    test2 = (
+        df.lazy()
+        .select(url_extract_all(pl.col("url"), fields=fields).alias("url"))
+        .unnest("url")
+        .collect()
+    )
+
+    assert_frame_equal(test1, ans)
+    assert_frame_equal(test2, ans)
+
+
+@pytest.mark.parametrize(
+    "df, parts",
+    [
+        (
+            pl.DataFrame(
+                {
+                    "id": [
+                        "US0378331005",
+                        "US0378331008",
+                        "DE44500105175407324931",
+                        None,
+                    ]
+                }
+            ),
+            {"isin": ["country_code", "check_digit"], "iban": ["bban"]},
+        )
+    ],
+)
+def test_extract(df: pl.DataFrame, parts: Dict[str, List[str]]):
+    test1 = extract(df, "id", parts)
+    test2 = extract(df.lazy(), pl.col("id"), parts).collect()
+
+    ans = df.with_columns(
+        isin_country_code(pl.col("id")).alias("isin_country_code"),
+        isin_check_digit(pl.col("id")).alias("isin_check_digit"),
+        iban_bban(pl.col("id")).alias("iban_bban"),
+    )
+
+    assert_frame_equal(test1, ans)
+    assert_frame_equal(test2, ans)
+
+
+def test_enum_outputs():
+    df = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "US0378331008", "XS1550212416", None],
+            "cusip": ["303075105", "G0052B105", "HELLOWORLD", None],
+            "iban": [
+                "DE44500105175407324931",
+                "AA110011123Z5678",
+                "AD1200012030200359100100",
+                None,
+            ],
+        }
+    )
+
+    test = df.select(
+        isin_country_code(pl.col("isin"), as_enum=True).alias("isin_cc"),
+        isin_check_digit(pl.col("isin"), as_enum=True).alias("isin_cd"),
+        cusip_country_code(pl.col("cusip"), as_enum=True).alias("cusip_cc"),
+        cusip_check_digit(pl.col("cusip"), as_enum=True).alias("cusip_cd"),
+        iban_country_code(pl.col("iban"), as_enum=True).alias("iban_cc"),
+        iban_check_digits(pl.col("iban"), as_enum=True).alias("iban_cd"),
+    )
+    ans = df.select(
+        isin_country_code(pl.col("isin")).alias("isin_cc"),
+        isin_check_digit(pl.col("isin")).alias("isin_cd"),
+        cusip_country_code(pl.col("cusip")).alias("cusip_cc"),
+        cusip_check_digit(pl.col("cusip")).alias("cusip_cd"),
+        iban_country_code(pl.col("iban")).alias("iban_cc"),
+        iban_check_digits(pl.col("iban")).alias("iban_cd"),
+    )
+
+    assert all(isinstance(dtype, pl.Enum) for dtype in test.dtypes)
+    assert_frame_equal(test.cast(pl.String), ans)
+
+    numeric = df.select(
+        isin_check_digit(pl.col("isin"), numeric=True).alias("isin_cd"),
+        cusip_check_digit(pl.col("cusip"), numeric=True).alias("cusip_cd"),
+        iban_check_digits(pl.col("iban"), numeric=True).alias("iban_cd"),
+    )
+    assert_frame_equal(numeric, ans.select("isin_cd", "cusip_cd", "iban_cd").cast(pl.UInt8))
+
+
+def test_dictionary_inputs():
+    df = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "US0378331008", None, "US0378331005", "XS1550212416"],
+            "cusip": ["303075105", "G0052B105", "HELLOWORLD", None, "303075105"],
+        }
+    )
+
+    def query(dedup: bool) -> List[pl.Expr]:
+        return [
+            isin_extract_all(pl.col("isin"), dedup=dedup).alias("isin"),
+            isin_is_valid(pl.col("isin"), dedup=dedup).alias("isin_valid"),
+            isin_country_code(pl.col("isin"), as_enum=True, dedup=dedup).alias("isin_cc"),
+            cusip_extract_all(pl.col("cusip"), dedup=dedup).alias("cusip"),
+            cusip_issuer_num(pl.col("cusip"), dedup=dedup).alias("cusip_issuer"),
+            cusip_is_cins(pl.col("cusip"), dedup=dedup).alias("cusip_is_cins"),
+        ]
+
+    ans = df.select(query(dedup=False))
+    test1 = df.select(query(dedup=True))
+    test2 = df.with_columns(pl.all().cast(pl.Categorical)).select(query(dedup=False))
+    test3 = (
+        df.with_columns(
+            pl.col("isin").cast(pl.Enum(["XS1550212416", "US0378331005", "US0378331008"])),
+            pl.col("cusip").cast(pl.Enum(["303075105", "G0052B105", "HELLOWORLD"])),
+        )
+        .lazy()
+        .select(query(dedup=False))
+        .collect()
+    )
+
+    assert_frame_equal(test1, ans)
+    assert_frame_equal(test2, ans)
+    assert_frame_equal(test3, ans)
+
+
+@pytest.mark.parametrize(
+    "df, is_valid",
+    [
+        (
+            pl.DataFrame(
+                {
+                    "cusip": [
+                        "303075105",
+                        "303075106",  # bad check digit
+                        "30307510",
+                        "G0052B105",
+                        "g0052b105",
+                        "HELLOWORLD",
+                        None,
+                    ]
+                }
+            ),
+            [True, False, False, True, False, False, False],
+        )
+    ],
+)
+def test_cusip_is_valid(df: pl.DataFrame, is_valid: List[bool]):
+    test1 = df.select(cusip_is_valid(pl.col("cusip")).alias("is_valid"))
+    test2 = df.lazy().select(cusip_is_valid(pl.col("cusip")).alias("is_valid")).collect()
+    ans = pl.DataFrame({"is_valid": is_valid})
+
+    assert_frame_equal(test1, ans)
+    assert_frame_equal(test2, ans)
+
+
+@pytest.mark.parametrize("new_streaming", [False, True])
+def test_streaming(tmp_path, new_streaming):
+    df = pl.DataFrame(
+        {
+            "iban": ["DE44500105175407324931", "AA110011123Z5678", None] * 1000,
+            "isin": ["US0378331005", None, "XS1550212416"] * 1000,
+            "cusip": ["G0052B105", "303075105", "HELLOWORLD"] * 1000,
+            "url": ["https://example.com/data.csv#row=4", "google.com", None] * 1000,
+        }
+    )
+    exprs = [
+        iban_extract_all(pl.col("iban")).alias("iban_parts"),
+        iban_is_valid(pl.col("iban")).alias("iban_valid"),
+        iban_bban(pl.col("iban")).alias("iban_bban"),
+        isin_extract_all(pl.col("isin")).alias("isin_parts"),
+        isin_extract_all(pl.col("isin"), with_check=True).alias("isin_checked"),
+        isin_is_valid(pl.col("isin")).alias("isin_valid"),
+        cusip_extract_all(pl.col("cusip"), dedup=True).alias("cusip_parts"),
+        url_extract_all(pl.col("url")).alias("url_parts"),
+        url_host(pl.col("url")).alias("url_host"),
+    ]
+    ans = df.with_columns(exprs)
+
+    src = tmp_path / "in.parquet"
+    dst = tmp_path / "out.parquet"
+    df.write_parquet(src, row_group_size=100)
+    lf = pl.scan_parquet(src).with_columns(exprs)
+    if new_streaming:
+        # The new streaming engine calls the kernels on morsels of the row groups, so each
+        # struct output is built chunk by chunk.
+        test = lf.collect(new_streaming=True)
+    else:
+        lf.sink_parquet(dst)
+        test = pl.read_parquet(dst)
+
+    assert_frame_equal(test, ans)
+
+
+@pytest.mark.parametrize(
+    "df, registered_domain, public_suffix",
+    [
+        (
+            pl.DataFrame(
+                {
+                    "url": [
+                        "https://news.bbc.co.uk/sport",
+                        "https://www.google.com/search?q=polars",
+                        "https://127.0.0.1/",
+                        "google.com",
+                        None,
+                    ]
+                }
+            ),
+            ["bbc.co.uk", "google.com", None, None, None],
+            ["co.uk", "com", None, None, None],
+        )
+    ],
+)
+def test_url_registered_domain(
+    df: pl.DataFrame,
+    registered_domain: List[Optional[str]],
+    public_suffix: List[Optional[str]],
+):
+    test1 = df.select(
+        url_registered_domain(pl.col("url")).alias("registered_domain"),
+        url_public_suffix(pl.col("url")).alias("public_suffix"),
+    )
+    test2 = (
+        df.lazy()
+        .select(
+            url_registered_domain(pl.col("url"), as_categorical=True).alias("registered_domain"),
+            url_public_suffix(pl.col("url"), as_categorical=True).alias("public_suffix"),
+        )
+        .collect()
+    )
+    ans = pl.DataFrame({"registered_domain": registered_domain, "public_suffix": public_suffix})
+
+    assert_frame_equal(test1, ans)
+    assert test2.dtypes == [pl.Categorical, pl.Categorical]
+    assert_frame_equal(test2.cast(pl.String), ans)
+
+
+def test_url_host_categorical_input():
+    df = pl.DataFrame(
+        {
+            "url": [
+                "https://www.google.com/search",
+                "not a url",
+                None,
+                "http://A.b.c/d",
+                "http://a.b.c/",
+            ]
+        }
+    )
+    ans = df.select(url_host(pl.col("url")).alias("host"))
+    for dtype in [pl.Categorical, pl.Enum(df["url"].drop_nulls().unique().sort())]:
+        test = df.select(url_host(pl.col("url").cast(dtype), as_categorical=True).alias("host"))
+        assert test.dtypes == [pl.Categorical]
+        assert_frame_equal(test.cast(pl.String), ans)
+
+
+def test_url_query_params():
+    df = pl.DataFrame(
+        {
+            "url": [
+                "https://example.com/?utm_source=news%20letter&gclid=abc&utm_source=x",
+                "https://example.com/path",
+                "https://example.com/?a+b=c+d",
+                "not a url",
+                None,
+            ]
+        }
+    )
+    pair = pl.Struct({"key": pl.String, "value": pl.String})
+    ans = pl.DataFrame(
+        {
+            "params": [
+                [
+                    {"key": "utm_source", "value": "news letter"},
+                    {"key": "gclid", "value": "abc"},
+                    {"key": "utm_source", "value": "x"},
+                ],
+                [],
+                [{"key": "a b", "value": "c d"}],
+                None,
+                None,
+            ],
+            "utm_source": ["news letter", None, None, None, None],
+            "gclid": ["abc", None, None, None, None],
+            "missing": [None, None, None, None, None],
+        },
+        schema={
+            "params": pl.List(pair),
+            "utm_source": pl.String,
+            "gclid": pl.String,
+            "missing": pl.String,
+        },
+    )
+
+    test = df.select(
+        url_query_params(pl.col("url")).alias("params"),
+        url_query_param(pl.col("url"), ["utm_source", "gclid", "missing"]).alias("keys"),
+    ).unnest("keys")
+    assert_frame_equal(test, ans)
+
+    single = df.select(url_query_param(pl.col("url"), "gclid"))
+    assert_frame_equal(single, ans.select("gclid"))
+
+
+def test_url_lenient():
+    # Plain URLs that take the fast path, and URLs that must fall back to the full parser.
+    df = pl.DataFrame(
+        {
+            "url": [
+                "https://www.google.com/search?q=polars#top",
+                "http://example.com",
+                "http://example.com:80/a?b",
+                "https://example.com:8443/a/b/",
+                "https://cdn.example.co.uk/img/x%20y.png?w=100&h=200",
+                "HTTPS://Example.COM/A",
+                "https://user:pw@example.com/",
+                "https://127.0.0.1/",
+                "https://example.com/a/../b/./c",
+                "https://example.com/a%2E/b",
+                "https://bücher.de/",
+                "https://xn--bcher-kva.de/",
+                "https://example.com./",
+                "https://example.com/a b",
+                "https://example.com:99999/",
+                "ftp://example.com/file",
+                "not a url",
+                None,
+            ]
+        }
+    )
+    for expr in [
+        lambda strict: url_extract_all(pl.col("url"), strict=strict),
+        lambda strict: url_host(pl.col("url"), strict=strict),
+        lambda strict: url_path(pl.col("url"), strict=strict),
+        lambda strict: url_query(pl.col("url"), strict=strict),
+        lambda strict: url_fragment(pl.col("url"), strict=strict),
+        lambda strict: url_query_params(pl.col("url"), strict=strict),
+    ]:
+        assert_frame_equal(df.select(expr(False)), df.select(expr(True)))
+
+
+def test_parallel():
+    # Large enough to be split into row ranges that are evaluated in parallel.
+    small = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "US0373831005", None, "AU0000XVGZA3"],
+            "iban": ["AL47212110090000000235698741", "GB82WEST12345698765432", "abc", None],
+            "url": ["https://www.google.com/search", "not a url", None, "http://a.b.c/d?e=f"],
+        }
+    )
+    n = 50_000
+    big = pl.concat([small] * n)
+    exprs = [
+        isin_extract_all(pl.col("isin")),
+        iban_extract_all(pl.col("iban")),
+        url_extract_all(pl.col("url")),
+        url_host(pl.col("url"), as_categorical=True).cast(pl.String).alias("host"),
+    ]
+    assert_frame_equal(big.select(exprs), pl.concat([small.select(exprs)] * n))
+
+
+def test_u64_keys():
+    df = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "AU0000XVGZA3", "US0378331008", None],
+            "cusip": ["303075105", "G0052B105", "HELLOWORLD", None],
+        }
+    )
+    keys = df.select(
+        isin_to_u64(pl.col("isin")).alias("isin"),
+        cusip_to_u64(pl.col("cusip")).alias("cusip"),
+    )
+    assert keys.dtypes == [pl.UInt64, pl.UInt64]
+
+    test = keys.select(
+        isin_from_u64(pl.col("isin")).alias("isin"),
+        cusip_from_u64(pl.col("cusip")).alias("cusip"),
+    )
+    ans = df.with_columns(
+        pl.when(isin_is_valid(pl.col("isin"))).then(pl.col("isin")),
+        pl.when(cusip_is_valid(pl.col("cusip"))).then(pl.col("cusip")),
+    )
+    assert_frame_equal(test, ans)
+
+    # Values that are too large to be packed identifiers.
+    out_of_range = pl.DataFrame({"x": [676 * 36**9, 2**64 - 1]}, schema={"x": pl.UInt64})
+    test = out_of_range.select(
+        isin_from_u64(pl.col("x")).alias("isin"),
+        cusip_from_u64(pl.col("x")).alias("cusip"),
+    )
+    assert test.null_count().row(0) == (2, 2)
+
+
+def test_normalize():
+    df = pl.DataFrame(
+        {
+            "isin": [" us0378331005 ", "US-0378331005", "US0378331005X", None],
+            "cusip": ["30307-510-5", "g0052b105", "3030751055", None],
+            "iban": [
+                "de44 5001 0517 5407 3249 31",
+                "DE44500105175407324931",
+                "DE44 5001 0517 5407 3249 31 0000 0000 0000 0000",
+                None,
+            ],
+        }
+    )
+    test = df.select(
+        isin_normalize(pl.col("isin")),
+        cusip_normalize(pl.col("cusip")),
+        iban_normalize(pl.col("iban")),
+    )
+    ans = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "US0378331005", None, None],
+            "cusip": ["303075105", "G0052B105", None, None],
+            "iban": ["DE44500105175407324931", "DE44500105175407324931", None, None],
+        }
+    )
+    assert_frame_equal(test, ans)
+
+    # The kernels clean each value while parsing. Values that are too long after cleaning
+    # are invalid, not null.
+    cleaned = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "US0378331005", "US0378331005X", None],
+            "cusip": ["303075105", "G0052B105", "3030751055", None],
+            "iban": [
+                "DE44500105175407324931",
+                "DE44500105175407324931",
+                "DE44500105175407324931" + "0" * 16,
+                None,
+            ],
+        }
+    )
+    for dedup in (False, True):
+        test = df.select(
+            isin_extract_all(pl.col("isin"), normalize=True, dedup=dedup, with_check=True),
+            isin_is_valid(pl.col("isin"), normalize=True, dedup=dedup).alias("isin_is_valid"),
+            isin_check(pl.col("isin"), normalize=True, dedup=dedup).alias("isin_check"),
+            cusip_check_digit(pl.col("cusip"), normalize=True, dedup=dedup),
+            cusip_check(pl.col("cusip"), normalize=True, dedup=dedup).alias("cusip_check"),
+            iban_is_valid(pl.col("iban"), normalize=True),
+            iban_check(pl.col("iban"), normalize=True).alias("iban_check"),
+            iban_extract_all(pl.col("iban"), normalize=True, with_check=True).alias("iban_all"),
+        )
+        ans = cleaned.select(
+            isin_extract_all(pl.col("isin"), with_check=True),
+            isin_is_valid(pl.col("isin")).alias("isin_is_valid"),
+            isin_check(pl.col("isin")).alias("isin_check"),
+            cusip_check_digit(pl.col("cusip")),
+            cusip_check(pl.col("cusip")).alias("cusip_check"),
+            iban_is_valid(pl.col("iban")),
+            iban_check(pl.col("iban")).alias("iban_check"),
+            iban_extract_all(pl.col("iban"), with_check=True).alias("iban_all"),
+        )
+        assert_frame_equal(test, ans)
+
+    assert test["isin_check"].to_list() == ["ok", "ok", "Invalid length", None]
+    assert test["isin"].struct.field("is_valid").to_list() == [True, True, False, None]
+    assert test["cusip_check"].to_list() == ["ok", "ok", "Invalid length", None]
+    assert test["iban"].to_list() == [True, True, False, None]
+    assert test["iban_all"].struct.field("is_valid").to_list() == [True, True, False, None]
+
+
+def test_isin_cusip_conversion():
+    df = pl.DataFrame(
+        {
+            "cusip": ["037833100", "303075105", "G0052B105", "03783310X", None],
+            "isin": ["US0378331005", "US3030751057", "KYG0052B1059", "AU0000XVGZA3", None],
+        }
+    )
+    test = df.select(
+        cusip_to_isin(pl.col("cusip")).alias("us"),
+        cusip_to_isin(pl.col("cusip"), country="KY").alias("ky"),
+        isin_to_cusip(pl.col("isin")).alias("cusip"),
+        isin_compute_check_digit(pl.col("isin").str.slice(0, 11)).alias("check_digit"),
+    )
+    ans = pl.DataFrame(
+        {
+            "us": ["US0378331005", "US3030751057", "USG0052B1055", None, None],
+            "ky": ["KY0378331009", "KY3030751051", "KYG0052B1059", None, None],
+            "cusip": ["037833100", "303075105", "G0052B105", None, None],
+            "check_digit": ["5", "7", "9", "3", None],
+        }
+    )
+    assert_frame_equal(test, ans)
+
+    with pytest.raises(ValueError):
+        cusip_to_isin(pl.col("cusip"), country="usa")
+
+
+def test_iban_registry():
+    df = pl.DataFrame(
+        {
+            "iban": [
+                "DE44500105175407324931",
+                "DE4450010517540732493",  # too short
+                "GB82WEST12345698765432",
+                "SA0380000000608010167519",
+                "CH",
+                "ZZ1234",
+                None,
+            ]
+        }
+    )
+    test = df.select(
+        iban_expected_length(pl.col("iban")).alias("length"),
+        iban_country_name(pl.col("iban")).alias("name"),
+        iban_is_sepa(pl.col("iban")).alias("sepa"),
+        iban_is_valid(pl.col("iban")).alias("valid"),
+    )
+    ans = pl.DataFrame(
+        {
+            "length": [22, 22, 22, 24, 21, None, None],
+            "name": [
+                "Germany",
+                "Germany",
+                "United Kingdom",
+                "Saudi Arabia",
+                "Switzerland",
+                None,
+                None,
+            ],
+            "sepa": [True, True, True, False, True, None, None],
+            "valid": [True, False, True, True, False, False, None],
+        },
+        schema_overrides={"length": pl.UInt8},
+    )
+    assert_frame_equal(test, ans)
+
+
+def test_check_codes():
+    df = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "US0378331008", "U10378331005", "US03783310*5", "US03", None],
+            "cusip": ["303075105", "303075106", "30307510*", "3030751", None, None],
+        }
+    )
+    test = df.select(isin_check(pl.col("isin")), cusip_check(pl.col("cusip")))
+    ans = pl.DataFrame(
+        {
+            "isin": [
+                "ok",
+                "Invalid checksum",
+                "Invalid country code",
+                "Invalid character",
+                "Invalid length",
+                None,
+            ],
+            "cusip": [
+                "ok",
+                "Invalid checksum",
+                "Invalid character",
+                "Invalid length",
+                None,
+                None,
+            ],
+        }
+    )
+    assert_frame_equal(test, ans)
+
+    df = df.with_columns(
+        iban=pl.Series(
+            ["DE44500105175407324931", "DE44500105175407324932", "AA11", "x", None, None]
+        ),
+        url=pl.Series(["https://a.com", "a.com", "https://[::1", "http://a:99999", None, None]),
+    )
+    exprs = [
+        (isin_check, "isin"),
+        (cusip_check, "cusip"),
+        (iban_check, "iban"),
+        (url_check, "url"),
+    ]
+    test = df.select(f(pl.col(c), code=True) for f, c in exprs)
+    assert all(isinstance(dtype, pl.Enum) for dtype in test.dtypes)
+    assert_frame_equal(test.cast(pl.String), df.select(f(pl.col(c)) for f, c in exprs))
+
+    # The options are keyword-only, so that they mean the same in every family.
+    for f, c in exprs:
+        with pytest.raises(TypeError):
+            f(pl.col(c), True)
+
+
+def test_extract_all_with_check():
+    df = pl.DataFrame(
+        {
+            "isin": ["US0378331005", "US0378331008", "U10378331005", "US03", None],
+            "cusip": ["303075105", "G0052B105", "303075106", "3030751", None],
+            "iban": [
+                "DE44500105175407324931",
+                "DE44500105175407324932",
+                "AA110011123Z5678",
+                "x",
+                None,
+            ],
+        }
+    )
+    exprs = [
+        (isin_extract_all, isin_check, "isin"),
+        (cusip_extract_all, cusip_check, "cusip"),
+        (iban_extract_all, iban_check, "iban"),
+    ]
+    for extract_all, check, c in exprs:
+        test = df.select(extract_all(pl.col(c), with_check=True)).unnest(c)
+        code = check(pl.col(c), code=True)
+        ans = pl.concat(
+            [
+                df.select(extract_all(pl.col(c))).unnest(c),
+                df.select(is_valid=code.eq("ok"), check=code),
+            ],
+            how="horizontal",
+        )
+        assert_frame_equal(test, ans)
+
+    test = extract(df, "isin", {"isin": ["country_code", "is_valid"]})
+    ans = df.with_columns(
+        isin_country_code(pl.col("isin")).alias("isin_country_code"),
+        isin_check(pl.col("isin"), code=True).eq("ok").alias("isin_is_valid"),
+    )
+    assert_frame_equal(test, ans)
+
+
+def test_aggregations():
+    urls = ["https://a.com/x", "http://a.com/y", "https://b.org", "c.com", "mailto:x@y.z", None]
+    df = pl.DataFrame({"g": [1, 1, 2, 2, 2, 2] * 1000, "url": urls * 1000})
+    ans = df.select(pl.col("url").str.extract(r"//([^/]+)").drop_nulls().n_unique()).item()
+    for approx in [True, False]:
+        for strict in [True, False]:
+            n = df.select(url_host_n_unique(pl.col("url"), approx=approx, strict=strict)).item()
+            assert n == ans
+
+    test = df.group_by("g").agg(url_host_n_unique(pl.col("url"), approx=False)).sort("g")
+    assert test["url"].to_list() == [1, 1]
+
+    # Merging the sketches of the groups gives the sketch of the whole column.
+    sketches = df.group_by("g").agg(url_host_hll(pl.col("url")))
+    assert sketches["url"].dtype == pl.Binary
+    assert sketches.select(hll_count(pl.col("url"))).sort("url")["url"].to_list() == [1, 1]
+    test = sketches.select(hll_count(hll_merge(pl.col("url")))).item()
+    assert test == df.select(url_host_n_unique(pl.col("url"), approx=True)).item() == ans
+
+    # Stored sketches must stay mergeable, so the hash of the hosts is pinned: FNV-1a mixed
+    # by the MurmurHash3 finalizer. A host sets the register picked by the first 14 bits of
+    # its hash to the position of the first 1 bit in the rest.
+    mask = 2**64 - 1
+    h = 0xCBF29CE484222325
+    for b in b"a.com":
+        h = ((h ^ b) * 0x100000001B3) & mask
+    for mul in [0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53]:
+        h = ((h ^ (h >> 33)) * mul) & mask
+    h ^= h >> 33
+    ans = bytearray(2**14)
+    ans[h >> 50] = 64 - (((h << 14) | (1 << 13)) & mask).bit_length() + 1
+    test = pl.DataFrame({"url": ["https://a.com/x"]}).select(url_host_hll(pl.col("url"))).item()
+    assert test == bytes(ans)
+
+    ibans = [
+        "DE44500105175407324931",
+        "DE44500105175407324932",
+        "AD1200012030200359100100",
+        "GB33BUKB20201555555555",
+        "DE44500105175407324931",
+        None,
+    ]
+    df = pl.DataFrame({"g": [1, 1, 1, 2, 2, 2], "iban": ibans})
+    ans = pl.DataFrame(
+        {"country_code": ["AD", "DE", "GB"], "count": [1, 2, 1]},
+        schema={"country_code": COUNTRY_CODE_ENUM, "count": pl.UInt32},
+    )
+    for x in [pl.col("iban"), pl.col("iban").cast(pl.Categorical)]:
+        test = df.select(iban_country_counts(x)).unnest("iban")
+        assert_frame_equal(test, ans)
+
+    test = df.group_by("g").agg(iban_country_counts(pl.col("iban"))).sort("g")
+    assert test["iban"].to_list() == [
+        [{"country_code": "AD", "count": 1}, {"country_code": "DE", "count": 1}],
+        [{"country_code": "DE", "count": 1}, {"country_code": "GB", "count": 1}],
+    ]
+
+
+def test_url_cache():
+    df = pl.DataFrame({"url": ["https://a.com/x?q=1", "https://b.org", "a.com", None] * 10})
+    exprs = [
+        url_host(pl.col("url")).alias("host"),
+        url_query_params(pl.col("url")).alias("params"),
+    ]
+    ans = df.select(exprs)
+
+    cache_enable()
+    try:
+        cache_clear()
+        for _ in range(2):
+            assert_frame_equal(df.select(exprs), ans)
+        info = cache_info()
+        # Three distinct values, including the one that fails to parse. The expressions can
+        # run at the same time, so both may miss a value before it is inserted.
+        assert info.entries == 3
+        assert info.hits + info.misses == 2 * 2 * 30 and info.misses <= 6
+        assert 0 < info.bytes <= info.max_bytes
+
+        cache_enable(1)
+        assert cache_info().entries == 0
+        assert_frame_equal(df.select(exprs), ans)
+    finally:
+        cache_disable()
+    assert cache_info().max_bytes == 0
+
+
+def test_lazy_exports():
+    import inspect
+
+    import polars_istr
+
+    for module in ["iban", "isin", "cusip", "url", "fused", "cache", "metrics"]:
+        mod = getattr(polars_istr, module)
+        public = {
+            name
+            for name, v in vars(mod).items()
+            if not name.startswith("_")
+            and (inspect.isfunction(v) or inspect.isclass(v))
+            and v.__module__ == mod.__name__
+        }
+        assert public <= set(polars_istr.__all__), public - set(polars_istr.__all__)
+
+    assert all(getattr(polars_istr, name) is not None for name in polars_istr.__all__)
+    with pytest.raises(AttributeError):
+        polars_istr.not_a_function
+
+
+def test_find_all():
+    df = pl.DataFrame(
+        {
+            "x": [
+                "Bought US0378331005 (CUSIP#303075105), not US0378331008. "
+                "See https://example.com/trade?id=1.",
+                "Pay DE44 5001 0517 5407 3249 31 EUR or GB82WEST12345698765432, "
+                "not DE44500105175407324932 (http://a.b/c_(d)).",
+                "nothing here",
+                None,
+            ]
+        }
+    )
+    test = df.select(
+        isin_find_all(pl.col("x")).alias("isin"),
+        cusip_find_all(pl.col("x")).alias("cusip"),
+        iban_find_all(pl.col("x")).alias("iban"),
+        url_find_all(pl.col("x")).alias("url"),
+    )
+    ans = pl.DataFrame(
+        {
+            "isin": [["US0378331005"], [], [], None],
+            "cusip": [["303075105"], [], [], None],
+            "iban": [[], ["DE44 5001 0517 5407 3249 31", "GB82WEST12345698765432"], [], None],
+            "url": [["https://example.com/trade?id=1"], ["http://a.b/c_(d)"], [], None],
+        },
+        schema={k: pl.List(pl.String) for k in ["isin", "cusip", "iban", "url"]},
+    )
+    assert_frame_equal(test, ans)
+
+
+def test_url_normalize():
+    def fnv1a(s: str) -> int:
+        h = 0xCBF29CE484222325
+        for b in s.encode():
+            h = ((h ^ b) * 0x100000001B3) % 2**64
+        return h
+
+    df = pl.DataFrame(
+        {
+            "url": [
+                "HTTP://Example.COM:80/a/./b/../c?b=2&a=1&&a=0#frag",
+                "http://example.com/a/c?a=0&b=2&a=1",
+                "https://x.org/?#f",
+                "not a url",
+                None,
+            ]
+        }
+    )
+    test = df.select(
+        url_normalize(pl.col("url")).alias("default"),
+        url_normalize(pl.col("url"), sort_query=False, drop_fragment=False).alias("kept"),
+        url_fingerprint(pl.col("url")).alias("fingerprint"),
+    )
+    # The values of a repeated key keep their order, so the first two differ.
+    normalized = [
+        "http://example.com/a/c?a=1&a=0&b=2",
+        "http://example.com/a/c?a=0&a=1&b=2",
+        "https://x.org/",
+        None,
+        None,
+    ]
+    ans = pl.DataFrame(
+        {
+            "default": normalized,
+            "kept": [
+                "http://example.com/a/c?b=2&a=1&&a=0#frag",
+                "http://example.com/a/c?a=0&b=2&a=1",
+                "https://x.org/?#f",
+                None,
+                None,
+            ],
+            "fingerprint": [None if s is None else fnv1a(s) for s in normalized],
+        },
+        schema={"default": pl.String, "kept": pl.String, "fingerprint": pl.UInt64},
+    )
+    assert_frame_equal(test, ans)
+
+
+def test_binary_input():
+    # The last row of each column is not valid UTF-8.
+    df = pl.DataFrame(
+        {
+            "isin": [b"US0378331005", b"US0378331008", None, b"US\xff0378331005"],
+            "url": [b"https://a.com/x", b"not a url", None, b"https://a.com/\xff"],
+        },
+        schema={"isin": pl.Binary, "url": pl.Binary},
+    )
+    test = df.select(
+        isin_is_valid(pl.col("isin")),
+        isin_is_valid(pl.col("isin"), dedup=True).alias("dedup"),
+        isin_country_code(pl.col("isin")).alias("country_code"),
+        url_host(pl.col("url")).alias("url"),
+    )
+    ans = pl.DataFrame(
+        {
+            "isin": [True, False, False, False],
+            "dedup": [True, False, False, False],
+            "country_code": ["US", None, None, None],
+            "url": ["a.com", None, None, None],
+        }
+    )
+    assert_frame_equal(test, ans)
+
+
+def test_stats():
+    df = pl.DataFrame({"url": ["https://a.com/x", "not a url", None]})
+    stats_enable()
+    try:
+        stats_reset()
+        df.select(url_path(pl.col("url")), url_host(pl.col("url")))
+        out = stats()
+        for kernel in ["pl_url_path", "pl_url_host"]:
+            s = out[kernel]
+            assert s.calls >= 1
+            assert (s.rows, s.nulls, s.failures) == (3 * s.calls, s.calls, s.calls)
+            assert s.output_bytes > 0 and s.nanos > 0
+
+        # Kernels whose outputs are not null for values that cannot be parsed.
+        stats_reset()
+        isin = pl.Series(["US0378331005", "US0378331006", None])
+        iban = pl.Series(["DE44500105175407324931", "DE44500105175407324932", None])
+        pl.select(
+            isin_is_valid(isin),
+            isin_check(isin).alias("check"),
+            isin_extract_all(isin, with_check=True).alias("all"),
+            isin_find_all(isin).alias("found"),
+        )
+        pl.select(iban_country_counts(iban))
+        df.select(url_extract_all(pl.col("url")))
+        out = stats()
+        for kernel in [
+            "pl_isin_is_valid",
+            "pl_isin_check",
+            "pl_isin_full",
+            "pl_isin_find_all",
+            "pl_iban_country_counts",
+            "pl_url_extract_all",
+        ]:
+            s = out[kernel]
+            assert (s.rows, s.failures) == (3 * s.calls, s.calls)
+
+        stats_disable()
+        df.select(url_extract_all(pl.col("url")))
+        assert stats()["pl_url_extract_all"] == out["pl_url_extract_all"]
+    finally:
+        stats_disable()
+        stats_reset()
+    assert stats() == {}